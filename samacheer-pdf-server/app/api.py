@@ -1,27 +1,148 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import asyncio
+import hmac
+import json
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import quote
+from typing import List, Literal, Optional
 
 from .models import (
     PDFRequest, 
     PDFResponse, 
     ErrorResponse,
-    FileInfo
+    FileInfo,
+    BatchRequest,
+    BatchItemResult,
+    BatchResponse,
+    JobSubmitResponse,
+    JobStatusResponse
 )
-from .processor import processor
-from .utils import get_file_size, generate_download_url, get_file_creation_time
+from .processor import (
+    run_process_request,
+    run_process_batch,
+    group_by_book,
+    NOT_FOUND,
+    INVALID_REQUEST,
+    UPSTREAM_ERROR,
+    PROCESSING_ERROR
+)
+from .services.worker_pool import worker_pool, WorkerPoolBusy
+from .services.document_pool import document_pool
+from .services.registry import registry
+from .services.jobs import job_manager, Job
+from .services.storage_manager import storage_manager
+from .services.remote_pdf import remote_pdfs
+from .services.warmup import warmup
+from .services.delivery import delivery
+from .services.ai_client import ai_client
+from .services.ai_cache import ai_cache
+from .services.text_normalizer import text_normalizer
+from .utils import get_file_size, generate_download_url, get_file_creation_time, resolve_download_path, iter_zip
 from .config import settings
 
 router = APIRouter()
 
+# Running /generate/stream requests (they finish even if the client disconnects)
+_stream_tasks = set()
+
+# HTTP status for each processor error code
+ERROR_STATUS = {
+    NOT_FOUND: 404,
+    INVALID_REQUEST: 400,
+    UPSTREAM_ERROR: 502,
+    PROCESSING_ERROR: 500,
+}
+
+
+def _request_details(request_data: dict) -> dict:
+    return {
+        "class": request_data["class_num"],
+        "subject": request_data["subject"],
+        "mode": request_data["mode"],
+        "format": request_data["output_format"]
+    }
+
+
+def _file_info(result: dict) -> Optional[FileInfo]:
+    """FileInfo for a successful processor result (None if the file is gone)"""
+    file_path = Path(result["file_path"])
+    if not file_path.exists():
+        return None
+    
+    size_info = get_file_size(file_path)
+    return FileInfo(
+        filename=result["filename"],
+        file_path=str(file_path),
+        file_size_bytes=size_info["bytes"],
+        file_size_mb=size_info["mb"],
+        download_url=generate_download_url(result["filename"]),
+        created_at=get_file_creation_time(file_path)
+    )
+
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Dependency of state-changing admin endpoints: Bearer ADMIN_TOKEN (disabled when unset)"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "status": "error",
+                "message": "Admin endpoints are disabled (set ADMIN_TOKEN)",
+                "error_code": "ADMIN_DISABLED"
+            }
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail={
+                "status": "error",
+                "message": "Missing or invalid admin token",
+                "error_code": "UNAUTHORIZED"
+            },
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def _processing_error(result: dict, headers: Optional[dict] = None) -> HTTPException:
+    """HTTPException for a failed processor result, by its error_code"""
+    error_code = result.get("error_code", PROCESSING_ERROR)
+    return HTTPException(
+        status_code=ERROR_STATUS.get(error_code, 500),
+        detail={
+            "status": "error",
+            "message": result["message"],
+            "error_code": error_code
+        },
+        headers=headers
+    )
+
+
+def _busy_error(e: WorkerPoolBusy) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={
+            "status": "error",
+            "message": str(e),
+            "error_code": "SERVER_BUSY"
+        }
+    )
+
+
 @router.post(
     "/generate",
     response_model=PDFResponse,
     responses={
         400: {"model": ErrorResponse},
         404: {"model": ErrorResponse},
-        500: {"model": ErrorResponse}
+        500: {"model": ErrorResponse},
+        502: {"model": ErrorResponse},
+        503: {"model": ErrorResponse}
     },
     summary="Generate PDF or TXT",
     description="Process request and generate PDF/TXT file from Samacheer Kalvi textbooks"
@@ -56,24 +177,20 @@ async def generate_pdf(request: PDFRequest):
     # Convert Pydantic model to dict
     request_data = request.model_dump()
     
-    # Process
-    result = processor.process_request(request_data)
+    # Process on the worker pool (downloads, PDF parsing and AI calls all block)
+    try:
+        result = await worker_pool.run(run_process_request, request_data)
+    except WorkerPoolBusy as e:
+        raise _busy_error(e)
     
     # Handle errors
     if result.get("error"):
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "status": "error",
-                "message": result["message"],
-                "error_code": "PROCESSING_ERROR"
-            }
-        )
+        raise _processing_error(result)
     
     # Get file info
-    file_path = Path(result["file_path"])
+    file_info = _file_info(result)
     
-    if not file_path.exists():
+    if file_info is None:
         raise HTTPException(
             status_code=500,
             detail={
@@ -84,47 +201,303 @@ async def generate_pdf(request: PDFRequest):
         )
     
     # Build response
-    size_info = get_file_size(file_path)
-    
-    file_info = FileInfo(
-        filename=result["filename"],
-        file_path=str(file_path),
-        file_size_bytes=size_info["bytes"],
-        file_size_mb=size_info["mb"],
-        download_url=generate_download_url(result["filename"]),
-        created_at=get_file_creation_time(file_path)
-    )
-    
     response = PDFResponse(
         status="success",
         message="File generated successfully",
-        request_details={
-            "class": request.class_num,
-            "subject": request.subject,
-            "mode": request.mode,
-            "format": request.output_format
-        },
+        request_details=_request_details(request_data),
         file_info=file_info
     )
     
     return response
 
 
+def _sse(event: str, data) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.post(
+    "/generate/stream",
+    responses={503: {"model": ErrorResponse}},
+    summary="Generate with Live Output",
+    description="Server-Sent Events: progress, markdown/html as the model writes them, then 'done' or 'error'"
+)
+async def generate_stream(request: PDFRequest):
+    """
+    Same body as /generate. Events:
+    - progress: {"stage", "status", "detail"}
+    - markdown: {"delta"} (md/html output: the lesson markdown as it is generated)
+    - html: {"html"} (html output: each block rendered as soon as it is complete)
+    - done: the /generate response (the saved, bridged file is the final version)
+    - error: {"message"}
+    
+    Example: curl -N -X POST http://localhost:8000/api/generate/stream -H 'Content-Type: application/json' -d '{...}'
+    
+    The file is still generated and saved if the client disconnects. With a
+    process worker pool only progress-free done/error events are sent.
+    """
+    if worker_pool.is_full():
+        raise _busy_error(WorkerPoolBusy("Worker pool is full, try again later"))
+    
+    request_data = request.model_dump()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def send(event: str, data):
+        # Called from the worker thread (and the AI background loop)
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+    
+    def progress(stage: str, status: str, detail: Optional[str] = None):
+        send("progress", {"stage": stage, "status": status, "detail": detail})
+    
+    def stream(event: str, data: str):
+        send(event, {"delta": data} if event == "markdown" else {"html": data})
+    
+    async def run():
+        # Callbacks can't cross process boundaries
+        callbacks = (progress, stream) if worker_pool.kind != "process" else (None, None)
+        try:
+            result = await worker_pool.run(run_process_request, request_data, *callbacks)
+        except WorkerPoolBusy as e:
+            result = {"error": True, "error_code": "SERVER_BUSY", "message": str(e)}
+        except Exception as e:
+            result = {"error": True, "error_code": PROCESSING_ERROR, "message": f"Processing error: {str(e)}"}
+        
+        file_info = None if result.get("error") else _file_info(result)
+        if file_info is None:
+            queue.put_nowait(("error", {
+                "message": result.get("message", "File was processed but not found"),
+                "error_code": result.get("error_code", "FILE_NOT_FOUND")
+            }))
+        else:
+            response = PDFResponse(
+                status="success",
+                message="File generated successfully",
+                request_details=_request_details(request_data),
+                file_info=file_info
+            )
+            queue.put_nowait(("done", response.model_dump_json()))
+    
+    task = asyncio.create_task(run())
+    
+    async def events():
+        yield ": stream open\n\n"  # Headers and a first byte go out immediately
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event, data)
+            if event in ("done", "error"):
+                return
+    
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post(
+    "/generate/batch",
+    response_model=BatchResponse,
+    summary="Generate Many Files",
+    description="Generate a list of lessons/books; items from the same book share one download and parse"
+)
+async def generate_batch(request: BatchRequest):
+    """
+    Items are grouped by source book. Each group runs as one worker-pool job,
+    groups for different books run in parallel.
+    
+    **Example:**
+```json
+    {
+        "items": [
+            {"class_num": 12, "subject": "english", "mode": "lesson", "unit": 1, "lesson_choice": 1, "output_format": "pdf"},
+            {"class_num": 12, "subject": "english", "mode": "lesson", "unit": 1, "lesson_choice": 2, "output_format": "txt"}
+        ],
+        "as_zip": false
+    }
+```
+    """
+    start_time = time.time()
+    items = [item.model_dump() for item in request.items]
+    results: List[Optional[dict]] = [None] * len(items)
+    
+    # One group per book; never queue more groups than the pool can run
+    limiter = asyncio.Semaphore(worker_pool.size)
+    
+    async def run_group(indexes: List[int]):
+        group = [items[i] for i in indexes]
+        async with limiter:
+            try:
+                group_results = await worker_pool.run(run_process_batch, group)
+            except WorkerPoolBusy as e:
+                group_results = [{"error": True, "error_code": "SERVER_BUSY", "message": str(e)} for _ in group]
+        for i, result in zip(indexes, group_results):
+            results[i] = result
+    
+    await asyncio.gather(*(run_group(indexes) for indexes in group_by_book(items).values()))
+    
+    item_results = []
+    for i, (item, result) in enumerate(zip(items, results)):
+        file_info = None if result.get("error") else _file_info(result)
+        item_results.append(BatchItemResult(
+            index=i,
+            status="success" if file_info else "error",
+            request_details=_request_details(item),
+            file_info=file_info,
+            error=None if file_info else result.get("message", "File was processed but not found"),
+            error_code=None if file_info else result.get("error_code", "FILE_NOT_FOUND")
+        ))
+    
+    succeeded = sum(1 for r in item_results if r.status == "success")
+    response = BatchResponse(
+        status="success" if succeeded == len(items) else ("partial" if succeeded else "error"),
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+        elapsed_seconds=round(time.time() - start_time, 2),
+        items=item_results
+    )
+    print(f"📦 Batch done: {succeeded}/{len(items)} in {response.elapsed_seconds}s")
+    
+    if not request.as_zip:
+        return response
+    
+    # Every generated file + manifest.json with the per-item results
+    files, seen = [], set()
+    for r in item_results:
+        if r.file_info and r.file_info.filename not in seen:
+            seen.add(r.file_info.filename)
+            files.append((r.file_info.filename, Path(r.file_info.file_path)))
+    
+    return StreamingResponse(
+        iter_zip(files, {"manifest.json": response.model_dump_json(indent=2)}),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="batch.zip"',
+            "X-Batch-Succeeded": str(succeeded),
+            "X-Batch-Failed": str(response.failed)
+        }
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=JobSubmitResponse,
+    status_code=202,
+    responses={503: {"model": ErrorResponse}},
+    summary="Start a Background Job",
+    description="Queue a /generate request and return a job id immediately"
+)
+async def submit_job(request: PDFRequest):
+    """
+    Same body as /generate. Poll GET /api/jobs/{job_id} or follow
+    GET /api/jobs/{job_id}/events (Server-Sent Events) for progress.
+    """
+    try:
+        job = job_manager.submit(request.model_dump())
+    except WorkerPoolBusy as e:
+        raise _busy_error(e)
+    
+    return JobSubmitResponse(
+        status="accepted",
+        job_id=job.id,
+        status_url=f"/api/jobs/{job.id}",
+        events_url=f"/api/jobs/{job.id}/events"
+    )
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "status": "error",
+                "message": f"Job not found: {job_id}",
+                "error_code": "JOB_NOT_FOUND"
+            }
+        )
+    return job
+
+
+def _job_status(job: Job, snapshot: dict) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=snapshot["job_id"],
+        state=snapshot["state"],
+        stage=snapshot["stage"],
+        stages=snapshot["stages"],
+        request_details=_request_details(job.request),
+        file_info=_file_info(snapshot["result"]) if snapshot["result"] else None,
+        error=snapshot["error"],
+        error_code=snapshot["error_code"],
+        created_at=snapshot["created_at"],
+        updated_at=snapshot["updated_at"]
+    )
+
+
 @router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    responses={404: {"model": ErrorResponse}},
+    summary="Job Status",
+    description="Current state, per-stage progress and (when done) the file info"
+)
+async def get_job(job_id: str):
+    job = _get_job(job_id)
+    return _job_status(job, job.snapshot())
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    responses={404: {"model": ErrorResponse}},
+    summary="Job Progress Stream",
+    description="Server-Sent Events: one 'progress' event per change, then 'done' or 'failed'"
+)
+async def job_events(job_id: str):
+    """
+    Example: curl -N http://localhost:8000/api/jobs/{job_id}/events
+    """
+    job = _get_job(job_id)
+    
+    async def stream():
+        async for snapshot in job_manager.events(job):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = snapshot["state"] if snapshot["state"] in ("done", "failed") else "progress"
+            payload = _job_status(job, snapshot).model_dump_json()
+            yield f"event: {event}\ndata: {payload}\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.api_route(
     "/download/{filename}",
+    methods=["GET", "HEAD"],
     response_class=FileResponse,
     summary="Download Generated File",
-    description="Download the generated PDF or TXT file"
+    description="Download the generated file. Supports ETag/If-None-Match, Range and gzip."
 )
-async def download_file(filename: str):
+async def download_file(filename: str, request: Request):
     """
-    Download file from temp storage
+    Download a generated file (or a full book straight from the cache)
     
     Example: GET /api/download/Class12-Unit6-Poem-IncidentoftheFrenchCamp.pdf
     """
-    file_path = settings.TEMP_DIR / filename
+    file_path = resolve_download_path(filename)
     
-    if not file_path.exists():
+    if file_path is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -134,11 +507,182 @@ async def download_file(filename: str):
             }
         )
     
-    # Determine media type
-    media_type = "application/pdf" if filename.endswith(".pdf") else "text/plain"
+    # Let nginx stream the file with sendfile instead of Python
+    if settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX:
+        area = "cache" if file_path.parent == settings.CACHE_DIR else "temp"
+        return Response(
+            headers={
+                # nginx decodes the URI: spaces, '#', '?' or non-ASCII must be escaped
+                "X-Accel-Redirect": f"{settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX}/{area}/{quote(filename)}",
+                "Content-Disposition": delivery.content_disposition(filename)
+            },
+            media_type=delivery.media_type(filename)
+        )
+    
+    # ETag/304, Range/206 and precompressed gzip
+    return await delivery.respond(request, file_path, filename)
+
+
+async def _resource(request: Request, **fields) -> Response:
+    """
+    Generate (or find) one output for a GET resource route and serve it cacheably.
+    Same pipeline as POST /generate; errors are never cached.
+    """
+    try:
+        request_data = PDFRequest(**fields).model_dump()
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    
+    try:
+        result = await worker_pool.run(run_process_request, request_data)
+    except WorkerPoolBusy as e:
+        error = _busy_error(e)
+        error.headers = {"Cache-Control": "no-store", "Retry-After": "5"}
+        raise error
+    
+    if result.get("error"):
+        raise _processing_error(result, headers={"Cache-Control": "no-store"})
+    
+    file_path = Path(result["file_path"])
+    if not file_path.exists():
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "File was processed but not found",
+                "error_code": "FILE_NOT_FOUND"
+            },
+            headers={"Cache-Control": "no-store"}
+        )
     
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type=media_type
-    )
\ No newline at end of file
+    # Same URL -> same output, so CDNs and browsers may keep it without revalidating
+    cache_control = f"public, max-age={settings.RESOURCE_CACHE_MAX_AGE}, immutable"
+    return await delivery.respond(request, file_path, result["filename"], cache_control)
+
+
+@router.api_route(
+    "/books/{class_num}/{subject}/{medium}/lessons/{unit}/{lesson}.{fmt}",
+    methods=["GET", "HEAD"],
+    response_class=FileResponse,
+    responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+    summary="Lesson Resource",
+    description="Cacheable GET for one lesson (generated on first request). Social Science takes ?discipline="
+)
+async def get_lesson(
+    request: Request,
+    class_num: int,
+    subject: str,
+    medium: Literal["english", "tamil"],
+    unit: int,
+    lesson: int,
+    fmt: Literal["pdf", "txt", "md", "html"],
+    term: int = 0,
+    discipline: Optional[str] = None
+):
+    """
+    Example: GET /api/books/10/english/english/lessons/1/1.txt
+    """
+    return await _resource(
+        request,
+        class_num=class_num, subject=subject, medium=medium, term=term, discipline=discipline,
+        mode="lesson", unit=unit, lesson_choice=lesson, output_format=fmt
+    )
+
+
+@router.api_route(
+    "/books/{class_num}/{subject}/{medium}/book.{fmt}",
+    methods=["GET", "HEAD"],
+    response_class=FileResponse,
+    responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+    summary="Book Resource",
+    description="Cacheable GET for a full book as PDF or TXT (classes 6-7 take ?term=1..3)"
+)
+async def get_book(
+    request: Request,
+    class_num: int,
+    subject: str,
+    medium: Literal["english", "tamil"],
+    fmt: Literal["pdf", "txt"],
+    term: int = 0
+):
+    """
+    Example: GET /api/books/10/english/english/book.pdf
+    """
+    return await _resource(
+        request,
+        class_num=class_num, subject=subject, medium=medium, term=term,
+        mode="full_book", output_format=fmt
+    )
+
+
+@router.get(
+    "/admin/stats",
+    summary="Runtime Statistics",
+    description="Worker pool usage and document pool hit/miss counts"
+)
+async def runtime_stats():
+    """
+    Example: GET /api/admin/stats
+    """
+    return {
+        "worker_pool": worker_pool.stats(),
+        "document_pool": document_pool.stats(),
+        "registry": registry.stats(),
+        "jobs": job_manager.stats(),
+        "remote_pdfs": remote_pdfs.stats(),
+        "warmup": warmup.stats(),
+        "ai": ai_client.stats(),
+        "ai_cache": ai_cache.stats(),
+        "text_normalizer": text_normalizer.stats()
+    }
+
+
+@router.get(
+    "/admin/storage",
+    summary="Storage Usage",
+    description="Disk usage vs budget per area, eviction counts, cache hit rates and pinned books"
+)
+async def storage_stats():
+    return await asyncio.to_thread(storage_manager.stats)
+
+
+@router.post(
+    "/admin/storage/reap",
+    summary="Enforce Storage Budgets Now",
+    description="Expire old temp files and evict until every area fits its budget",
+    dependencies=[Depends(require_admin)]
+)
+async def storage_reap():
+    return await asyncio.to_thread(storage_manager.reap)
+
+
+@router.post(
+    "/admin/storage/pin/{book_key}",
+    summary="Pin a Book",
+    description="Never evict this book from storage/cache (until unpinned; shared by all workers, kept across restarts)",
+    dependencies=[Depends(require_admin)]
+)
+async def storage_pin(book_key: str):
+    storage_manager.pin(book_key)
+    return {"status": "success", "pinned": sorted(storage_manager.pinned)}
+
+
+@router.delete(
+    "/admin/storage/pin/{book_key}",
+    summary="Unpin a Book",
+    dependencies=[Depends(require_admin)]
+)
+async def storage_unpin(book_key: str):
+    storage_manager.unpin(book_key)
+    return {"status": "success", "pinned": sorted(storage_manager.pinned)}
+
+
+@router.delete(
+    "/admin/ai-cache",
+    summary="Invalidate AI Conversions",
+    description="Delete cached AI conversions for a model and/or prompt version (no filter = all)",
+    dependencies=[Depends(require_admin)]
+)
+async def ai_cache_invalidate(model: Optional[str] = None, prompt_version: Optional[int] = None):
+    removed = await asyncio.to_thread(ai_cache.invalidate, model, prompt_version)
+    return {"status": "success", "removed": removed}
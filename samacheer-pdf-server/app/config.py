@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Dict, List
 
 class Settings(BaseSettings):
     """Application Configuration with Dynamic Multi-Subject Support"""
@@ -9,28 +10,126 @@ class Settings(BaseSettings):
     PORT: int = 8000
     DEBUG: bool = True
     
+    # 🔐 Admin endpoints that change state (AI cache purge, storage reap/pin) need
+    # "Authorization: Bearer <ADMIN_TOKEN>"; empty = those endpoints are disabled
+    ADMIN_TOKEN: str = ""
+    
     # Paths
     BASE_DIR: Path = Path(__file__).parent.parent
     DATA_DIR: Path = BASE_DIR / "data"
     CACHE_DIR: Path = BASE_DIR / "storage" / "cache"
     TEMP_DIR: Path = BASE_DIR / "storage" / "temp"
+    ARTIFACTS_DIR: Path = BASE_DIR / "storage" / "artifacts"
+    JOBS_DIR: Path = BASE_DIR / "storage" / "jobs"  # Background job state, shared by all workers
     
     # 🆕 NEW: Dynamic Data Directories
     CATALOGS_DIR: Path = DATA_DIR / "catalogs"
     CURRICULUM_DIR: Path = DATA_DIR / "curriculum"
     INDEXES_DIR: Path = DATA_DIR / "indexes"
     
+    # 🔄 Hot-reload data/ edits without a restart
+    REGISTRY_WATCH: bool = True
+    
     # 🗑️ DEPRECATED (kept for backward compatibility)
     CATALOG_URL: str = "https://raw.githubusercontent.com/tutorea-ai/samacheer-kalvi-extractor/main/src/book_catalog.json"
     
     # File Management
     TEMP_FILE_RETENTION_HOURS: int = 24
     
+    # 🧹 Storage Budgets (0 = unlimited) - enforced by an in-process reaper
+    STORAGE_CACHE_MAX_MB: int = 10240      # Downloaded books (+ their text stores)
+    STORAGE_TEMP_MAX_MB: int = 1024        # Published files for /api/download
+    STORAGE_ARTIFACTS_MAX_MB: int = 4096   # Derived lesson PDF/TXT/MD/HTML
+    STORAGE_PINNED_BOOKS: List[str] = []   # Never evicted, e.g. ["class-12-term0-english.pdf"]
+    STORAGE_REAP_INTERVAL_SECONDS: int = 300
+    STORAGE_MIN_AGE_SECONDS: int = 600     # Files used this recently are never evicted
+    STORAGE_LEASE_TIMEOUT: int = 3600      # In-use marks older than this count as leaked
+    STORAGE_SCORE_HALF_LIFE_HOURS: float = 24
+    STORAGE_PARTIAL_RETENTION_HOURS: float = 24  # Interrupted downloads nobody resumed are deleted after this
+    
+    # 📤 Downloads: when set, /api/download hands files to nginx via X-Accel-Redirect
+    # (zero-copy sendfile). Expects internal locations {prefix}/cache/ and {prefix}/temp/
+    DOWNLOAD_ACCEL_REDIRECT_PREFIX: str = ""
+    DOWNLOAD_CACHE_MAX_AGE: int = 3600   # Cache-Control max-age; clients/CDNs revalidate by ETag after
+    # 🔗 GET /api/books/... resources are served "immutable" for this long (purge the CDN after data edits)
+    RESOURCE_CACHE_MAX_AGE: int = 604800
+    
+    # ⚙️ Worker Pool (blocking PDF/AI work runs here, off the event loop)
+    WORKER_POOL_TYPE: str = "thread"   # "thread" or "process"
+    WORKER_POOL_SIZE: int = 4          # Max jobs running at once
+    WORKER_MAX_PENDING: int = 16       # Max jobs queued behind them (0 = unlimited)
+    
+    # 🧾 Background Jobs (/api/jobs)
+    JOB_RETENTION_MINUTES: int = 60    # How long finished jobs stay queryable
+    
+    # 📦 Book Cache
+    DOWNLOAD_LOCK_TIMEOUT: int = 900   # Seconds to wait for another worker's download
+    # ⬇️ Downloader ({file_id} = catalog Drive ID; point at scripts/fake_drive.py for local testing)
+    DOWNLOAD_URL_TEMPLATE: str = "https://drive.usercontent.google.com/download?id={file_id}&export=download&confirm=t"
+    DOWNLOAD_TIMEOUT: float = 60       # Seconds without data before a connection counts as dropped
+    DOWNLOAD_RETRIES: int = 5
+    DOWNLOAD_BACKOFF_SECONDS: float = 1.0
+    DOWNLOAD_MAX_PARALLEL: int = 4     # Books downloading at once (per process)
+    DOWNLOAD_MAX_SEGMENTS: int = 8     # Parallel byte ranges per book (1 = single stream)
+    DOWNLOAD_SEGMENT_MB: int = 8       # Target segment size: segment count adapts to the file
+    DOWNLOAD_SEGMENT_MIN_MB: int = 16  # Smaller files use a single stream
+    MATERIALIZE_ON_INGEST: bool = False  # Pre-cut every lesson PDF when a book is downloaded
+    
+    # 🌐 Lazy Remote Slicing: cut a lesson PDF from a not-yet-downloaded book via Range requests
+    LAZY_REMOTE_SLICING: bool = False
+    REMOTE_BLOCK_KB: int = 64          # Range request granularity
+    REMOTE_BLOCK_CACHE_MB: int = 64    # Shared LRU of fetched blocks
+    REMOTE_REVALIDATE_SECONDS: int = 60  # Re-probe an open remote book's ETag after this (0 = every request)
+    
+    # 🔥 Warmup: prefetch the most requested books (+ text stores) at startup
+    WARMUP_ENABLED: bool = True
+    WARMUP_BOOKS: int = 5              # Top books by request history (pinned books first)
+    WARMUP_TEXT_STORES: bool = True
+    WARMUP_READY_PERCENT: float = 100  # /ready answers 503 until this much has settled
+    WARMUP_HISTORY_HALF_LIFE_DAYS: float = 7
+    
+    # 📖 Document Pool (parsed PDFs kept open between requests)
+    DOCUMENT_POOL_MAX_DOCUMENTS: int = 8
+    DOCUMENT_POOL_MAX_MB: int = 1024   # Budget by source file size
+    
+    # 🗂️ Page Text Store (per-book extracted text, memory-mapped)
+    TEXT_STORE_ENABLED: bool = True
+    
+    # 🔤 Text Extraction Backend ("pdfplumber" = layout-faithful, "pypdfium2" = fast)
+    TEXT_BACKEND: str = "pdfplumber"
+    SUBJECT_TEXT_BACKENDS: Dict[str, str] = {}   # e.g. {"socialscience": "pypdfium2"}
+    
+    # ⚡ Parallel Text Extraction (process pool)
+    EXTRACTION_WORKERS: int = 0            # 0 = one per CPU core
+    PARALLEL_FULL_BOOK: bool = True        # Full-book TXT / text store builds
+    PARALLEL_LESSON_MIN_PAGES: int = 40    # Lesson ranges at least this long (0 = never)
+    
     # AI Keys
     KIMI_API_KEY: str = ""
     KIMI_BASE_URL: str = "https://api.moonshot.ai/v1"
     KIMI_MODEL: str = "kimi-k2-0905-preview"
     
+    # 🤖 AI Client (per process): provider quota + adaptive concurrency
+    AI_REQUESTS_PER_MINUTE: int = 60     # 0 = unlimited
+    AI_TOKENS_PER_MINUTE: int = 128000   # 0 = unlimited
+    AI_INITIAL_CONCURRENCY: int = 2
+    AI_MAX_CONCURRENCY: int = 8          # AIMD grows towards this, halves on 429/5xx
+    AI_TIMEOUT: float = 300              # Per call, retries and their waits included
+    AI_RETRIES: int = 5
+    AI_BACKOFF_SECONDS: float = 2.0
+    AI_RETRY_AFTER_MAX: float = 60       # Longer Retry-After answers are capped to this
+    AI_CHUNK_TOKENS: int = 6000          # Longer lessons are converted in parallel chunks (0 = never split)
+    AI_CHUNK_RETRIES: int = 2            # Extra rounds for failed chunks only
+    
+    # 💾 AI Conversion Cache (SQLite; keyed by prompt text, prompt version and model)
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_PATH: Path = BASE_DIR / "storage" / "ai_cache.sqlite3"
+    AI_CACHE_MAX_MB: int = 512         # Least recently used conversions go first (0 = unlimited)
+    
+    # 🧽 Text Normalization before the AI (running headers/footers, page numbers, separators)
+    TEXT_NORMALIZE_ENABLED: bool = True
+    TEXT_NORMALIZE_MIN_REPEAT: float = 0.3  # Edge lines on this share of a lesson's pages (3+) are removed
+    
     # Bridge Path
     CONTENT_SERVER_PATH: str = ""
     
@@ -91,6 +190,7 @@ settings = Settings()
 # Ensure directories exist
 settings.CACHE_DIR.mkdir(parents=True, exist_ok=True)
 settings.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+settings.ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 settings.CATALOGS_DIR.mkdir(parents=True, exist_ok=True)
 settings.CURRICULUM_DIR.mkdir(parents=True, exist_ok=True)
 settings.INDEXES_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 
 from .api import router
 from .models import HealthResponse
 from .config import settings
+from .services.worker_pool import worker_pool
+from .services.text_extraction import parallel_extractor
+from .services.registry import registry
+from .services.book_cache import book_cache
+from .services.splitter import splitter
+from .services.storage_manager import storage_manager
+from .services.warmup import warmup
 
 # Create FastAPI app
 app = FastAPI(
@@ -53,6 +61,15 @@ async def health_check():
         timestamp=datetime.now()
     )
 
+# Readiness probe (load balancers): 503 until cache warmup reaches its target
+@app.get("/ready")
+async def readiness_check():
+    """
+    Ready once WARMUP_READY_PERCENT of the warmup plan has settled
+    """
+    stats = warmup.stats()
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -63,9 +80,24 @@ async def startup_event():
     print("🚀 Samacheer PDF Extractor API Starting...")
     print(f"📁 Cache Directory: {settings.CACHE_DIR}")
     print(f"📁 Temp Directory: {settings.TEMP_DIR}")
+    print(f"⚙️ Worker Pool: {settings.WORKER_POOL_TYPE} x {settings.WORKER_POOL_SIZE}")
     print(f"🌐 Server: http://{settings.HOST}:{settings.PORT}")
     print(f"📚 API Docs: http://localhost:{settings.PORT}/docs")
     print("=" * 60)
+    
+    # Load data/ into memory and watch it for edits
+    registry.start()
+    
+    # New books get all their lesson PDFs cut in the background
+    if settings.MATERIALIZE_ON_INGEST:
+        book_cache.on_download(splitter.materialize_in_background)
+        print("✂️ Materialize on ingest: enabled")
+    
+    # Keep storage/ inside its byte budgets
+    storage_manager.start()
+    
+    # Prefetch the most requested books in the background
+    warmup.start()
 
 # Shutdown event
 @app.on_event("shutdown")
@@ -73,4 +105,10 @@ async def shutdown_event():
     """
     Run on server shutdown
     """
-    print("\n👋 Server shutting down...")
\ No newline at end of file
+    print("\n👋 Server shutting down...")
+    registry.stop()
+    warmup.stop()
+    storage_manager.stop()
+    splitter.shutdown()
+    worker_pool.shutdown()
+    parallel_extractor.shutdown()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class PDFRequest(BaseModel):
@@ -58,6 +58,11 @@ class PDFRequest(BaseModel):
         description="Output format: pdf, txt, md (markdown), or html"
     )
     
+    text_backend: Optional[Literal["pdfplumber", "pypdfium2"]] = Field(
+        None,
+        description="Text extraction backend (pdfplumber = layout-faithful, pypdfium2 = fast). Defaults to server config"
+    )
+    
     @field_validator('subject')
     @classmethod
     def subject_lowercase(cls, v: str) -> str:
@@ -102,6 +107,71 @@ class PDFResponse(BaseModel):
     file_info: FileInfo
 
 
+class BatchRequest(BaseModel):
+    """Request model for batch generation"""
+    
+    items: List[PDFRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Requests to generate (grouped by source book on the server)"
+    )
+    
+    as_zip: bool = Field(
+        False,
+        description="Stream every generated file back as one ZIP instead of JSON"
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Result for one item of a batch (same order as the request)"""
+    index: int
+    status: Literal["success", "error"]
+    request_details: dict
+    file_info: Optional[FileInfo] = None
+    error: Optional[str] = None
+    error_code: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    """Batch generation response"""
+    status: Literal["success", "partial", "error"]
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    items: List[BatchItemResult]
+
+
+class JobStage(BaseModel):
+    """One pipeline stage of a background job"""
+    name: Literal["download", "slice", "extract", "ai", "render", "bridge"]
+    status: Literal["pending", "running", "done", "skipped", "failed"]
+    detail: Optional[str] = None
+
+
+class JobSubmitResponse(BaseModel):
+    """Returned by POST /api/jobs"""
+    status: Literal["accepted"]
+    job_id: str
+    status_url: str
+    events_url: str
+
+
+class JobStatusResponse(BaseModel):
+    """Current state of a background job"""
+    job_id: str
+    state: Literal["queued", "running", "done", "failed"]
+    stage: Optional[str] = None
+    stages: List[JobStage]
+    request_details: dict
+    file_info: Optional[FileInfo] = None
+    error: Optional[str] = None
+    error_code: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     status: Literal["error"]
@@ -1,14 +1,41 @@
 import requests
-import os
-import json
-import PyPDF2
-import gdown
-import pdfplumber
-import shutil
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 from .services.ai_converter import ai_converter
+from .services.artifact_cache import artifact_cache
+from .services.book_cache import book_cache
+from .services.document_pool import document_pool
+from .services.lesson_index import LessonTable
+from .services.registry import registry
+from .services.remote_pdf import remote_pdfs
+from .services.splitter import split_pages
+from .services.storage_manager import storage_manager
+from .services.text_backends import resolve_backend_name
+from .services.text_extraction import extract_segments
+from .services.text_normalizer import text_normalizer
+from .services.text_store import text_store
+from .services.warmup import warmup
+from .services.worker_pool import in_pool_process
 from .config import settings
+from .utils import atomic_write_text
+
+# progress(stage, status, detail) - stages: download, slice, extract, ai, render, bridge
+ProgressCallback = Callable[[str, str, Optional[str]], None]
+
+# stream(event, data) - events: markdown (text delta), html (one rendered block)
+StreamCallback = Callable[[str, str], None]
+
+# Error codes of failed results (the API maps each to an HTTP status)
+NOT_FOUND = "NOT_FOUND"                # Catalog, book, index, term or lesson doesn't exist
+INVALID_REQUEST = "INVALID_REQUEST"    # Unsupported combination of request fields
+UPSTREAM_ERROR = "UPSTREAM_ERROR"      # Drive download or AI provider failed
+PROCESSING_ERROR = "PROCESSING_ERROR"  # Slicing/extraction/rendering failed here
+
+def _no_progress(stage: str, status: str, detail: Optional[str] = None):
+    pass
+
+def error_result(error_code: str, message: str) -> dict:
+    return {"error": True, "error_code": error_code, "message": message}
 
 class PDFProcessor:
     """
@@ -16,48 +43,34 @@ class PDFProcessor:
     """
     
     def __init__(self):
-        self.catalogs_cache = {}
         self.base_path = settings.BASE_DIR
         self.cache_dir = settings.CACHE_DIR
         self.temp_dir = settings.TEMP_DIR
         print("🚀 PDF Processor initialized with discipline support")
     
     def _load_catalog(self, subject: str, medium: str = "english") -> dict:
-        """Dynamic catalog loading based on subject and medium"""
-        cache_key = f"{subject}_{medium}"
-        if cache_key in self.catalogs_cache:
-            return self.catalogs_cache[cache_key]
-        
-        catalog_path = settings.get_catalog_path(subject, medium)
-        
-        if not catalog_path.exists():
-            print(f"❌ Catalog not found: {catalog_path}")
-            # Fallback for legacy English
-            if subject == "english" and medium == "english":
-                try:
-                    response = requests.get(settings.CATALOG_URL, timeout=10)
-                    if response.status_code == 200:
-                        return response.json()
-                except: pass
-            return {}
-        
-        try:
-            with open(catalog_path, 'r', encoding='utf-8') as f:
-                catalog_data = json.load(f)
-            self.catalogs_cache[cache_key] = catalog_data
+        """Catalog for a subject/medium from the in-memory registry"""
+        catalog_data = registry.catalog(subject, medium)
+        if catalog_data:
             return catalog_data
-        except Exception as e:
-            print(f"❌ Error loading catalog: {e}")
-            return {}
+        
+        print(f"❌ Catalog not found: {settings.get_catalog_path(subject, medium)}")
+        # Fallback for legacy English
+        if subject == "english" and medium == "english":
+            try:
+                response = requests.get(settings.CATALOG_URL, timeout=10)
+                if response.status_code == 200:
+                    return response.json()
+            except: pass
+        return {}
     
     def _load_unit_index(self, class_num: int, subject: str, medium: str = "english") -> dict:
-        """Dynamic index loading"""
-        index_path = settings.get_index_path(subject, class_num, medium)
-        if not index_path.exists(): return {}
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except: return {}
+        """Raw index data from the in-memory registry"""
+        return registry.index(subject, class_num, medium)
+    
+    def _load_lesson_table(self, class_num: int, subject: str, medium: str = "english") -> Optional[LessonTable]:
+        """Compiled lesson table (compiled by the registry when the index file loads)"""
+        return registry.lesson_table(subject, class_num, medium)
     
     def _generate_book_key(self, class_num: int, term: int, subject: str, medium: str) -> str:
         subject = subject.lower().strip()
@@ -66,136 +79,122 @@ class PDFProcessor:
         suffix = "" if subject in ["english", "tamil"] else f"-{medium}-medium"
         return f"class-{class_num}-term{term}-{subject}{suffix}.pdf"
     
-    def _download_file(self, file_id: str, output_path: Path) -> bool:
+    def _fetch_book(self, book_key: str, subject: str, medium: str) -> Tuple[Optional[Path], Optional[dict]]:
+        """Catalog lookup + cached download: (path, None) or (None, error result)"""
+        catalog = self._load_catalog(subject, medium)
+        if not catalog: return None, error_result(NOT_FOUND, "Catalog not found")
+        if book_key not in catalog: return None, error_result(NOT_FOUND, f"Book not found: {book_key}")
+        
+        # Single-flight per book, safe across workers
+        cached_file = book_cache.ensure(book_key, catalog[book_key])
+        if not cached_file: return None, error_result(UPSTREAM_ERROR, "Download failed")
+        return cached_file, None
+    
+    def _fetch_leased(self, book_key: str, subject: str, medium: str) -> Tuple[Optional[Path], Optional[dict]]:
+        """
+        _fetch_book with the storage lease taken first, so the reaper can't evict
+        the book between the download and its use (on success the caller releases
+        book_cache.path_for(book_key))
+        """
+        leased_book = book_cache.path_for(book_key)
+        storage_manager.acquire(leased_book)
         try:
-            url = f"https://drive.google.com/uc?id={file_id}"
-            gdown.download(url, str(output_path), quiet=False, fuzzy=True)
-            return output_path.exists()
-        except: return False
+            cached_file, error = self._fetch_book(book_key, subject, medium)
+        except BaseException:
+            storage_manager.release(leased_book)
+            raise
+        if error: storage_manager.release(leased_book)
+        return cached_file, error
+    
+    def _lesson_details(self, request_data: dict) -> Tuple[Optional[Tuple[str, int, int]], Optional[dict]]:
+        """Lesson lookup: ((filename_base, start_page, end_page), None) or (None, error result)"""
+        class_num = request_data["class_num"]
+        term = request_data.get("term", 0)
+        discipline = request_data.get("discipline")
+        lesson_choice = request_data.get("lesson_choice", 1) # Default to 1 if missing
+        
+        lesson_table = self._load_lesson_table(class_num, request_data["subject"], request_data.get("medium", "english"))
+        if not lesson_table: return None, error_result(NOT_FOUND, "Index not found")
+        
+        term_key = f"term{term}" if class_num in [6, 7] else "term0"
+        if term_key not in lesson_table.terms: return None, error_result(NOT_FOUND, f"Term {term} not found in index")
+        if term_key in lesson_table.discipline_terms and not discipline:
+            return None, error_result(INVALID_REQUEST, "'discipline' is required for this subject")
+        
+        # Pass Discipline Here!
+        details = lesson_table.lookup(term_key, request_data["unit"], lesson_choice, discipline)
+        if not details: return None, error_result(NOT_FOUND, "Invalid lesson selection")
+        return details, None
+    
+    def _slice_remote(
+        self, book_key: str, subject: str, medium: str, start_page: int, end_page: int, filename_base: str
+    ) -> Optional[Path]:
+        """Lesson PDF from the not-yet-downloaded book (None if the origin can't do ranges)"""
+        drive_id = self._load_catalog(subject, medium).get(book_key)
+        if not drive_id: return None
+        identity = remote_pdfs.identity(drive_id)
+        if not identity: return None
+        
+        # Keyed by the remote file's size/ETag: the content hash needs the whole book
+        pdf_key = artifact_cache.key(identity, start_page, end_page, "pdf")
+        artifact = artifact_cache.get(pdf_key, "pdf")
+        if not artifact:
+            artifact = artifact_cache.path(pdf_key, "pdf")
+            if not remote_pdfs.slice(drive_id, start_page, end_page, artifact, identity): return None
+        return artifact_cache.publish(artifact, f"{filename_base}.pdf")
     
     def _slice_pdf(self, source_pdf: Path, output_pdf: Path, start_page: int, end_page: int) -> bool:
+        # Pooled reader + temp file/rename (two requests for the same lesson share output_pdf)
         try:
-            with open(source_pdf, 'rb') as infile:
-                reader = PyPDF2.PdfReader(infile)
-                writer = PyPDF2.PdfWriter()
-                if end_page > len(reader.pages): return False
-                for i in range(start_page - 1, end_page):
-                    writer.add_page(reader.pages[i])
-                with open(output_pdf, 'wb') as outfile:
-                    writer.write(outfile)
-            return True
+            with document_pool.pypdf(source_pdf) as reader:
+                return split_pages(reader, [(start_page, end_page, output_pdf)])[output_pdf]
         except: return False
     
-    def _extract_text(self, pdf_file: Path, start_page: int, end_page: int, output_txt: Path) -> bool:
+    def _read_text(self, pdf_file: Path, start_page: int, end_page: int, backend: str = "") -> Optional[str]:
+        """Extract text for a page range (1-based, inclusive)"""
+        try:
+            # Fast path: a slice of the book's page-text store
+            if settings.TEXT_STORE_ENABLED:
+                text_content = text_store.read_range(pdf_file, start_page, end_page, backend)
+                if text_content is not None: return text_content
+                # Serve this range directly; the whole-book store is ready next time
+                text_store.ensure_in_background(pdf_file, backend)
+            return "".join(extract_segments(pdf_file, start_page, end_page, backend))
+        except: return None
+    
+    def _extract_text(self, pdf_file: Path, start_page: int, end_page: int, output_txt: Path, backend: str = "") -> bool:
         try:
-            text_content = ""
-            with pdfplumber.open(pdf_file) as pdf:
-                if end_page > len(pdf.pages): end_page = len(pdf.pages)
-                for page_num in range(start_page - 1, end_page):
-                    page = pdf.pages[page_num]
-                    text = page.extract_text()
-                    text_content += (text + "\n\n" + "="*50 + "\n\n") if text else ""
-            with open(output_txt, 'w', encoding='utf-8') as f:
-                f.write(text_content)
+            if settings.TEXT_STORE_ENABLED and text_store.write_range(pdf_file, start_page, end_page, output_txt, backend):
+                return True
+        except: pass
+        text_content = self._read_text(pdf_file, start_page, end_page, backend)
+        if text_content is None: return False
+        try:
+            atomic_write_text(output_txt, text_content)
             return True
         except: return False
 
-    def _get_lesson_details(self, index_data: dict, unit_num: int, lesson_choice: int, class_num: int, discipline: str = None):
-        """
-        Calculates start/end pages.
-        Now handles both 'units' (English) and 'disciplines' (Social Science).
-        """
-        meta = index_data.get("meta", {"prelim_pages": 0, "total_pdf_pages": 999})
-        offset = meta["prelim_pages"]
-
-        # --- STEP 1: Determine which list of lessons to use ---
-        target_units = []         # The list we select from (e.g. just History)
-        all_units_for_slicing = [] # ALL units in the book (History + Geo + Civics) for boundary calculation
-
-        if "disciplines" in index_data:
-            # Social Science Structure (Split Lists)
-            if not discipline:
-                print("❌ Error: 'discipline' parameter is missing for this subject.")
-                return None
-            
-            disc_key = discipline.lower()
-            if disc_key not in index_data["disciplines"]:
-                print(f"❌ Error: Discipline '{disc_key}' not found.")
-                return None
-            
-            target_units = index_data["disciplines"][disc_key]
-            
-            # Flatten ALL disciplines to ensure we find the correct 'next page' even across subjects
-            for d_list in index_data["disciplines"].values():
-                all_units_for_slicing.extend(d_list)
-                
-        else:
-            # English/Science Structure (Single List)
-            target_units = index_data.get("units", [])
-            all_units_for_slicing = target_units
-
-        # --- STEP 2: Validate Selection ---
-        if not target_units or unit_num > len(target_units):
-            return None
+    def _markdown_stream(self, stream: StreamCallback, output_format: str) -> Callable[[Optional[str]], None]:
+        """on_delta for the AI converter: markdown deltas, plus HTML blocks for html output"""
+        from .services.html_converter import html_converter
+        renderer = html_converter.stream_renderer() if output_format == "html" else None
         
-        # Note: Index is unit_num - 1
-        selected_unit_obj = target_units[unit_num - 1]
-
-        # --- STEP 3: Handle Internal Lesson Structure (Prose vs Direct) ---
-        # Case A: Social Science / Direct Structure ({ "page": 109, "title": "..." })
-        if "page" in selected_unit_obj:
-            start_pdf_page = selected_unit_obj["page"] + offset
-            clean_title = selected_unit_obj['title'].replace(' ', '')
-            filename = f"Class{class_num}-{discipline or 'Unit'}-{unit_num}-{clean_title}"
-            # For direct units, we don't use 'lesson_choice' (it's always 1 unit = 1 file)
-            selected_page_raw = selected_unit_obj["page"]
-
-        # Case B: English Structure ({ "prose": { "page": 88 }, ... })
-        else:
-            lessons = []
-            for cat in ["prose", "poem", "supplementary", "play"]:
-                if cat in selected_unit_obj:
-                    lessons.append({
-                        "type": cat, 
-                        "title": selected_unit_obj[cat]['title'], 
-                        "page": selected_unit_obj[cat]['page']
-                    })
-            
-            if lesson_choice > len(lessons): return None
-            selected_lesson = lessons[lesson_choice - 1]
-            start_pdf_page = selected_lesson["page"] + offset
-            clean_title = selected_lesson['title'].replace(' ', '')
-            filename = f"Class{class_num}-Unit{unit_num}-{selected_lesson['type'].capitalize()}-{clean_title}"
-            selected_page_raw = selected_lesson["page"]
-
-        # --- STEP 4: Calculate End Page (The Cut Boundary) ---
-        # We look at ALL units to find the next starting number
-        all_start_pages = []
-        for u in all_units_for_slicing:
-            # Check for direct page key
-            if "page" in u:
-                all_start_pages.append(u["page"])
-            # Check for nested keys (English)
+        def on_delta(delta: Optional[str]):
+            if delta is None:
+                # The markdown is complete: render the last block
+                blocks = renderer.close() if renderer else []
             else:
-                for cat in ["prose", "poem", "supplementary", "play"]:
-                    if cat in u:
-                        all_start_pages.append(u[cat]['page'])
-        
-        all_start_pages.sort()
-        
-        # Find the next start page that is greater than our current start page
-        next_pages = [p for p in all_start_pages if p > selected_page_raw]
-        
-        if next_pages:
-            # Stop 1 page before the next lesson starts
-            end_pdf_page = next_pages[0] + offset - 1
-        else:
-            # No next lesson? Go to end of PDF
-            end_pdf_page = meta["total_pdf_pages"]
-
-        return filename, start_pdf_page, end_pdf_page
+                stream("markdown", delta)
+                blocks = renderer.feed(delta) if renderer else []
+            for block in blocks:
+                stream("html", block)
+        return on_delta
 
-    def process_request(self, request_data: dict) -> dict:
+    def process_request(
+        self, request_data: dict, progress: Optional[ProgressCallback] = None, stream: Optional[StreamCallback] = None
+    ) -> dict:
+        report = progress or _no_progress
+        leased_book = None
         try:
             # 1. Extract Parameters
             class_num = request_data["class_num"]
@@ -206,103 +205,176 @@ class PDFProcessor:
             output_format = request_data["output_format"]
             # 🆕 Extract Discipline
             discipline = request_data.get("discipline")
+            # 🔤 Extraction backend: request > per-subject config > default
+            text_backend = resolve_backend_name(subject, request_data.get("text_backend"))
             
             print(f"📚 Processing: Class {class_num} | {subject} | {discipline or 'General'}")
             
-            # 2. Load Catalog
-            catalog = self._load_catalog(subject, medium)
-            if not catalog: return {"error": True, "message": "Catalog not found"}
-            
-            # 3. Generate Key & Get Drive ID
+            # 2-4. Catalog -> Book Key -> Download/Cache
             book_key = self._generate_book_key(class_num, term, subject, medium)
-            if book_key not in catalog: return {"error": True, "message": f"Book not found: {book_key}"}
-            
-            drive_id = catalog[book_key]
-            
-            # 4. Download/Cache
-            cached_file = self.cache_dir / book_key
-            if not cached_file.exists():
-                if not self._download_file(drive_id, cached_file):
-                    return {"error": True, "message": "Download failed"}
+            warmup.record(book_key)
+            # 🌐 Cold book + lesson PDF: cut it over Range requests instead of downloading the book
+            lazy_remote = (
+                settings.LAZY_REMOTE_SLICING and mode == "lesson" and output_format == "pdf"
+                and not book_cache.path_for(book_key).exists()
+            )
+            if lazy_remote:
+                cached_file = None
+                report("download", "skipped", "remote slicing")
+            else:
+                report("download", "running", book_key)
+                # The storage reaper must not evict the book while we read it
+                cached_file, error = self._fetch_leased(book_key, subject, medium)
+                if error: return error
+                leased_book = book_cache.path_for(book_key)
+                report("download", "done", book_key)
 
             # === FULL BOOK MODE ===
             if mode == "full_book":
                 if output_format == "pdf":
-                    output_file = self.temp_dir / book_key
-                    shutil.copy(cached_file, output_file)
-                    return {"error": False, "filename": output_file.name, "file_path": str(output_file)}
+                    # Served straight from storage/cache by /api/download (no 100 MB copy into temp)
+                    return {"error": False, "filename": cached_file.name, "file_path": str(cached_file)}
                 # TXT Handling
                 elif output_format == "txt":
-                    output_file = self.temp_dir / book_key.replace('.pdf', '.txt')
-                    with open(cached_file, 'rb') as f: 
-                        total = len(PyPDF2.PdfReader(f).pages)
-                    self._extract_text(cached_file, 1, total, output_file)
+                    book_hash = book_cache.content_hash(cached_file)
+                    with document_pool.pypdf(cached_file) as reader:
+                        total = len(reader.pages)
+                    txt_key = artifact_cache.key(book_hash, 1, total, "txt", {"backend": text_backend})
+                    artifact = artifact_cache.get(txt_key, "txt")
+                    report("extract", "running", f"pages 1-{total}")
+                    if not artifact:
+                        # The whole book is needed anyway: build its text store once and slice it
+                        if settings.TEXT_STORE_ENABLED:
+                            text_store.ensure(cached_file, text_backend)
+                        artifact = artifact_cache.path(txt_key, "txt")
+                        if not self._extract_text(cached_file, 1, total, artifact, text_backend):
+                            return error_result(PROCESSING_ERROR, "Text extraction failed")
+                        report("extract", "done", f"pages 1-{total}")
+                    else:
+                        report("extract", "done", "cached")
+                    output_file = artifact_cache.publish(artifact, book_key.replace('.pdf', '.txt'))
                     return {"error": False, "filename": output_file.name, "file_path": str(output_file)}
                 else:
-                    return {"error": True, "message": "Full book only supports PDF/TXT formats"}
+                    return error_result(INVALID_REQUEST, "Full book only supports PDF/TXT formats")
 
             # === LESSON MODE ===
             unit_num = request_data["unit"]
             lesson_choice = request_data.get("lesson_choice", 1) # Default to 1 if missing
             
-            # 5. Load Index
-            index_data = self._load_unit_index(class_num, subject, medium)
-            if not index_data: return {"error": True, "message": "Index not found"}
-            
-            term_key = f"term{term}" if class_num in [6, 7] else "term0"
-            if term_key not in index_data: return {"error": True, "message": f"Term {term} not found in index"}
-            
-            # 6. Get Details (Pass Discipline Here!)
-            details = self._get_lesson_details(index_data[term_key], unit_num, lesson_choice, class_num, discipline)
-            
-            if not details: return {"error": True, "message": "Invalid lesson selection"}
+            # 5-6. Compiled Index -> Lesson Pages
+            details, error = self._lesson_details(request_data)
+            if error: return error
             
             filename_base, start_page, end_page = details
             print(f"📄 Cutting Pages: {start_page} to {end_page}")
 
+            if lazy_remote:
+                output_file = self._slice_remote(book_key, subject, medium, start_page, end_page, filename_base)
+                if output_file:
+                    report("slice", "done", "remote")
+                    return {"error": False, "filename": output_file.name, "file_path": str(output_file)}
+                # Origin can't serve ranges: fall back to the full download
+                report("download", "running", book_key)
+                cached_file, error = self._fetch_leased(book_key, subject, medium)
+                if error: return error
+                leased_book = book_cache.path_for(book_key)
+                report("download", "done", book_key)
+
+            # 7. Derived-artifact cache: same book bytes + pages + format = same output
+            book_hash = book_cache.content_hash(cached_file)
+            text_variant = {"backend": text_backend}
+            ai_variant = {
+                "backend": text_backend,
+                "model": ai_converter.model,
+                "prompt": ai_converter.prompt_version,
+                "normalize": text_normalizer.version if settings.TEXT_NORMALIZE_ENABLED else 0,
+                "lesson_title": filename_base,
+                "class": class_num,
+                "subject": subject,
+                "unit": unit_num,
+                "discipline": discipline
+            }
+
             # === OUTPUT HANDLERS ===
             if output_format == "pdf":
-                output_file = self.temp_dir / f"{filename_base}.pdf"
-                self._slice_pdf(cached_file, output_file, start_page, end_page)
+                pdf_key = artifact_cache.key(book_hash, start_page, end_page, "pdf")
+                artifact = artifact_cache.get(pdf_key, "pdf")
+                report("slice", "running", f"pages {start_page}-{end_page}")
+                if not artifact:
+                    artifact = artifact_cache.path(pdf_key, "pdf")
+                    if not self._slice_pdf(cached_file, artifact, start_page, end_page):
+                        return error_result(PROCESSING_ERROR, "PDF slicing failed")
+                    report("slice", "done", f"pages {start_page}-{end_page}")
+                else:
+                    report("slice", "done", "cached")
+                output_file = artifact_cache.publish(artifact, f"{filename_base}.pdf")
                 return {"error": False, "filename": output_file.name, "file_path": str(output_file)}
             
             elif output_format == "txt":
-                output_file = self.temp_dir / f"{filename_base}.txt"
-                self._extract_text(cached_file, start_page, end_page, output_file)
+                txt_key = artifact_cache.key(book_hash, start_page, end_page, "txt", text_variant)
+                artifact = artifact_cache.get(txt_key, "txt")
+                report("extract", "running", f"pages {start_page}-{end_page}")
+                if not artifact:
+                    artifact = artifact_cache.path(txt_key, "txt")
+                    if not self._extract_text(cached_file, start_page, end_page, artifact, text_backend):
+                        return error_result(PROCESSING_ERROR, "Text extraction failed")
+                    report("extract", "done", f"pages {start_page}-{end_page}")
+                else:
+                    report("extract", "done", "cached")
+                output_file = artifact_cache.publish(artifact, f"{filename_base}.txt")
                 return {"error": False, "filename": output_file.name, "file_path": str(output_file)}
 
             # === 💎 AI / MD / HTML LOGIC RESTORED HERE ===
             elif output_format in ["md", "html"]:
-                print(f"🤖 AI Processing: Converting lesson...")
-                
-                # Step 1: Extract Text
-                temp_txt = self.temp_dir / f"{filename_base}_temp.txt"
-                if not self._extract_text(cached_file, start_page, end_page, temp_txt):
-                    return {"error": True, "message": "Text extraction failed"}
+                md_key = artifact_cache.key(book_hash, start_page, end_page, "md", ai_variant)
+                md_artifact = artifact_cache.get(md_key, "md")
+                on_delta = self._markdown_stream(stream, output_format) if stream else None
                 
-                with open(temp_txt, 'r', encoding='utf-8') as f: 
-                    raw_text = f.read()
-                temp_txt.unlink(missing_ok=True)
+                if md_artifact:
+                    print(f"♻️ Markdown cache hit: {filename_base}")
+                    report("extract", "done", "cached")
+                    report("ai", "done", "cached")
+                    with open(md_artifact, 'r', encoding='utf-8') as f:
+                        markdown_content = f.read()
+                    if on_delta:
+                        on_delta(markdown_content)
+                else:
+                    print(f"🤖 AI Processing: Converting lesson...")
+                    
+                    # Step 1: Extract Text (in memory - no shared temp file between requests)
+                    report("extract", "running", f"pages {start_page}-{end_page}")
+                    raw_text = self._read_text(cached_file, start_page, end_page, text_backend)
+                    if raw_text is None:
+                        return error_result(PROCESSING_ERROR, "Text extraction failed")
+                    if settings.TEXT_NORMALIZE_ENABLED:
+                        raw_text = text_normalizer.normalize(raw_text)
+                    report("extract", "done", f"pages {start_page}-{end_page}")
 
-                # Step 2: AI Convert to Markdown
-                markdown_content = ai_converter.convert_to_markdown(
-                    text=raw_text,
-                    metadata={
-                        'class': class_num, 
-                        'subject': subject, 
-                        'unit': unit_num, 
-                        'lesson_title': filename_base,
-                        'discipline': discipline  # 🆕 Passed discipline to AI
-                    }
-                )
-                
-                if not markdown_content: 
-                    return {"error": True, "message": "AI conversion failed"}
+                    # Step 2: AI Convert to Markdown
+                    report("ai", "running", ai_converter.model)
+                    markdown_content = ai_converter.convert_to_markdown(
+                        text=raw_text,
+                        metadata={
+                            'class': class_num, 
+                            'subject': subject, 
+                            'unit': unit_num, 
+                            'lesson_title': filename_base,
+                            'discipline': discipline  # 🆕 Passed discipline to AI
+                        },
+                        on_delta=on_delta
+                    )
+                    
+                    if not markdown_content: 
+                        return error_result(UPSTREAM_ERROR, "AI conversion failed")
+                    
+                    md_artifact = artifact_cache.path(md_key, "md")
+                    atomic_write_text(md_artifact, markdown_content)
+                    report("ai", "done", ai_converter.model)
+                if on_delta:
+                    on_delta(None)
 
                 # Step 3: ALWAYS Save & Deploy Markdown (Mango #1)
-                md_file = self.temp_dir / f"{filename_base}.md"
-                with open(md_file, 'w', encoding='utf-8') as f: 
-                    f.write(markdown_content)
+                md_file = artifact_cache.publish(md_artifact, f"{filename_base}.md")
                 
                 print(f"✅ Markdown saved: {md_file.name}")
                 
@@ -317,43 +389,158 @@ class PDFProcessor:
                     "medium": medium,
                     "discipline": discipline # 🆕 Added to Bridge
                 }
+                report("bridge", "running", md_file.name)
                 bridge.deploy_content(md_file, bridge_meta, "md")
                 
                 final_output = md_file
 
                 # Step 4: If HTML Requested, Convert & Deploy HTML (Mango #2)
                 if output_format == "html":
-                    print(f"🎨 Converting Markdown to HTML (Server Mode)...")
-                    from .services.html_converter import html_converter
+                    html_key = artifact_cache.key(book_hash, start_page, end_page, "html", ai_variant)
+                    html_artifact = artifact_cache.get(html_key, "html")
+                    report("render", "running", "html")
                     
-                    html_content = html_converter.convert_to_html(
-                        markdown_content=markdown_content,
-                        metadata={
-                            'class': class_num, 
-                            'lesson_title': filename_base
-                        },
-                        mode="server"
-                    )
+                    if not html_artifact:
+                        print(f"🎨 Converting Markdown to HTML (Server Mode)...")
+                        from .services.html_converter import html_converter
+                        
+                        html_content = html_converter.convert_to_html(
+                            markdown_content=markdown_content,
+                            metadata={
+                                'class': class_num, 
+                                'lesson_title': filename_base
+                            },
+                            mode="server"
+                        )
+                        if not html_content:
+                            return error_result(PROCESSING_ERROR, "HTML conversion failed")
+                        
+                        html_artifact = artifact_cache.path(html_key, "html")
+                        atomic_write_text(html_artifact, html_content)
+                        report("render", "done", "html")
+                    else:
+                        report("render", "done", "cached")
                     
-                    html_file = self.temp_dir / f"{filename_base}.html"
-                    with open(html_file, 'w', encoding='utf-8') as f: 
-                        f.write(html_content)
+                    html_file = artifact_cache.publish(html_artifact, f"{filename_base}.html")
                     
                     print(f"✅ HTML saved: {html_file.name}")
                     
                     # Bridge HTML
+                    report("bridge", "running", html_file.name)
                     bridge.deploy_content(html_file, bridge_meta, "html")
                     final_output = html_file
+                
+                report("bridge", "done", final_output.name)
 
                 return {"error": False, "filename": final_output.name, "file_path": str(final_output)}
 
-            return {"error": True, "message": "Invalid format"}
+            return error_result(INVALID_REQUEST, "Invalid format")
 
         except Exception as e:
             print(f"❌ Processing error: {str(e)}")
             import traceback
             traceback.print_exc()
-            return {"error": True, "message": f"Processing error: {str(e)}"}
+            return error_result(PROCESSING_ERROR, f"Processing error: {str(e)}")
+        finally:
+            if leased_book:
+                storage_manager.release(leased_book)
+
+    def process_batch(self, items: List[dict]) -> List[dict]:
+        """
+        Process several requests for the SAME book (see group_by_book).
+        The book is fetched once, its parsed document stays leased for the whole
+        group, and the page-text store is built in one pass when several items need text.
+        """
+        first = items[0]
+        medium = first.get("medium", "english")
+        # Warmup history is recorded per item by process_request
+        book_key = self._generate_book_key(first["class_num"], first.get("term", 0), first["subject"], medium)
+        
+        cached_file, error = self._fetch_leased(book_key, first["subject"], medium)
+        if error:
+            return [dict(error) for _ in items]
+        
+        print(f"📦 Batch: {len(items)} items from {book_key}")
+        try:
+            with document_pool.lease(cached_file):
+                self._slice_lessons(cached_file, [item for item in items if item["output_format"] == "pdf"])
+                if settings.TEXT_STORE_ENABLED:
+                    text_items = [item for item in items if item["output_format"] != "pdf"]
+                    backends = {resolve_backend_name(item["subject"], item.get("text_backend")) for item in text_items}
+                    if len(text_items) > 1:
+                        for backend in backends:
+                            text_store.ensure(cached_file, backend)
+            
+                return [self.process_request(item) for item in items]
+        finally:
+            storage_manager.release(book_cache.path_for(book_key))
+
+    def _slice_lessons(self, cached_file: Path, items: List[dict]):
+        """
+        Write the lesson PDFs of several items into the artifact cache with one
+        split_pages pass over the book (process_request then finds them cached).
+        Items that fail the lookup are left to process_request for their error.
+        """
+        book_hash = book_cache.content_hash(cached_file)
+        jobs = {}
+        for item in items:
+            if item["mode"] != "lesson":
+                continue
+            details, _ = self._lesson_details(item)
+            if not details:
+                continue
+            _, start_page, end_page = details
+            pdf_key = artifact_cache.key(book_hash, start_page, end_page, "pdf")
+            if pdf_key not in jobs and not artifact_cache.get(pdf_key, "pdf"):
+                jobs[pdf_key] = (start_page, end_page, artifact_cache.path(pdf_key, "pdf"))
+        if not jobs:
+            return
+        
+        print(f"✂️ Batch: slicing {len(jobs)} lesson PDFs in one pass")
+        try:
+            with document_pool.pypdf(cached_file) as reader:
+                split_pages(reader, list(jobs.values()))
+        except Exception as e:
+            print(f"⚠️ Batch slicing failed, slicing per item: {e}")
 
 # Create singleton
-processor = PDFProcessor()
\ No newline at end of file
+processor = PDFProcessor()
+
+
+def run_process_request(
+    request_data: dict, progress: Optional[ProgressCallback] = None, stream: Optional[StreamCallback] = None
+) -> dict:
+    """
+    Picklable entry point for the worker pool.
+    In process mode each worker process uses its own processor singleton
+    (and progress/stream must be None: callbacks can't be pickled).
+    """
+    try:
+        return processor.process_request(request_data, progress, stream)
+    finally:
+        _job_finished()
+
+
+def run_process_batch(items: List[dict]) -> List[dict]:
+    """Picklable entry point for one book's batch group"""
+    try:
+        return processor.process_batch(items)
+    finally:
+        _job_finished()
+
+
+def _job_finished():
+    """Pool processes never run atexit: flush their request history after every job"""
+    if in_pool_process():
+        warmup.flush()
+
+
+def group_by_book(items: List[dict]) -> Dict[str, List[int]]:
+    """Indexes of items grouped by the book they come from (in first-seen order)"""
+    groups: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        book_key = processor._generate_book_key(
+            item["class_num"], item.get("term", 0), item["subject"], item.get("medium", "english")
+        )
+        groups.setdefault(book_key, []).append(i)
+    return groups
\ No newline at end of file
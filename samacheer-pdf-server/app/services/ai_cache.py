@@ -0,0 +1,174 @@
+"""
+AI Conversion Cache
+SQLite store of AI responses keyed by sha256(normalized prompt messages,
+prompt version, model, temperature). Unlike the artifact cache it does not
+depend on the book bytes or the pipeline version, so the same lesson text
+is never paid for twice - across reprints, crashes and bulk re-runs.
+
+Bounded by AI_CACHE_MAX_MB (least recently used rows go first); rows can
+be invalidated per model / prompt version. Safe across threads and worker
+processes (one connection per thread, WAL journal).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Optional
+from ..config import settings
+
+MB = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS conversions_last_used ON conversions (last_used);
+"""
+
+
+class AICache:
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (and per process after a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # --- Keys ---
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Whitespace/Unicode differences that don't change the answer don't change the key"""
+        text = unicodedata.normalize("NFC", text).replace("\r\n", "\n")
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip()
+
+    def key(self, messages: List[dict], model: str, prompt_version: int, temperature: float) -> str:
+        parts = {
+            "messages": [[m["role"], self.normalize(m.get("content") or "")] for m in messages],
+            "model": model,
+            "prompt_version": prompt_version,
+            "temperature": temperature,
+        }
+        encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    # --- Lookups ---
+
+    def get(self, key: str) -> Optional[str]:
+        if not settings.AI_CACHE_ENABLED:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM conversions WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE conversions SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ AI cache read failed: {e}")
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str, model: str, prompt_version: int):
+        if not settings.AI_CACHE_ENABLED:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO conversions "
+                "(key, model, prompt_version, response, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️ AI cache write failed: {e}")
+
+    # --- Eviction / invalidation ---
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used rows until the cache fits its budget"""
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM conversions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM conversions ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM conversions WHERE key = ?", victims)
+        print(f"🧹 AI cache: evicted {len(victims)} conversions")
+
+    def invalidate(self, model: Optional[str] = None, prompt_version: Optional[int] = None) -> int:
+        """Delete conversions for a model and/or prompt version (no filter = everything)"""
+        clauses, params = [], []
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if prompt_version is not None:
+            clauses.append("prompt_version = ?")
+            params.append(prompt_version)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        removed = self._connect().execute(f"DELETE FROM conversions{where}", params).rowcount
+        print(f"🗑️ AI cache: invalidated {removed} conversions")
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        try:
+            count, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM conversions"
+            ).fetchone()
+        except sqlite3.Error:
+            count, size = None, None
+        return {
+            "enabled": settings.AI_CACHE_ENABLED,
+            "entries": count,
+            "bytes": size,
+            "budget_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Create singleton instance
+ai_cache = AICache(settings.AI_CACHE_PATH, settings.AI_CACHE_MAX_MB * MB)
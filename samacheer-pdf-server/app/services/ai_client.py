@@ -0,0 +1,279 @@
+"""
+AI Client
+Async chat-completion client for the Kimi (OpenAI-compatible) API with:
+
+- Token buckets for requests/min and tokens/min, shared by every caller
+- AIMD concurrency: +1 slot per window of successes, halved on 429/5xx
+- Retries with jittered exponential backoff (honouring Retry-After up to
+  AI_RETRY_AFTER_MAX); attempts and waits share one AI_TIMEOUT budget
+- Streaming completions (stream=True) under the same limits
+
+Everything runs on the shared background loop, so blocking worker threads
+(PDFProcessor) and async callers use the same limiter. Limits are per
+process: with several uvicorn workers, divide the provider quota.
+"""
+
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List, Optional
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI
+from ..config import settings
+from .background_loop import background_loop
+
+
+class AIError(Exception):
+    """The AI call failed (after retries, or with a non-retryable error)"""
+
+
+class TokenBucket:
+    """Refills `rate` units per minute up to one minute's worth (rate 0 = unlimited)"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.available = float(rate_per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        if not self.rate:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.available >= amount:
+                self.available -= amount
+                return
+            await asyncio.sleep((amount - self.available) / self.rate)
+
+    def adjust(self, amount: float):
+        """Correct an estimate once the real usage is known (may go negative)"""
+        if self.rate:
+            self._refill()
+            self.available -= amount
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight calls, between 1 and AI_MAX_CONCURRENCY"""
+
+    def __init__(self, initial: int, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self):
+        # Additive increase: about +1 per `limit` successful calls
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_overload(self):
+        # Multiplicative decrease
+        self.limit = max(1.0, self.limit / 2)
+
+
+class AIClient:
+    def __init__(self):
+        self.model = settings.KIMI_MODEL
+        self._client: Optional[AsyncOpenAI] = None
+        self._pid = None
+        self.requests = TokenBucket(settings.AI_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(settings.AI_TOKENS_PER_MINUTE)
+        self.concurrency = AdaptiveConcurrency(settings.AI_INITIAL_CONCURRENCY, settings.AI_MAX_CONCURRENCY)
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.tokens_used = 0
+
+    def _get_client(self) -> AsyncOpenAI:
+        """Created on the background loop on first use (and again after a fork)"""
+        if self._client is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._client = AsyncOpenAI(
+                api_key=settings.KIMI_API_KEY,
+                base_url=settings.KIMI_BASE_URL,
+                timeout=settings.AI_TIMEOUT,
+                max_retries=0,  # Retries are ours, so they go through the limiter
+            )
+            self.concurrency = AdaptiveConcurrency(settings.AI_INITIAL_CONCURRENCY, settings.AI_MAX_CONCURRENCY)
+        return self._client
+
+    @staticmethod
+    def estimate_tokens(messages: List[dict]) -> int:
+        """Prompt + a similar-sized answer (~3 characters per token)"""
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        return max(1, prompt_chars // 3) * 2
+
+    @staticmethod
+    def _retry_after(value: str) -> Optional[float]:
+        """Seconds from a Retry-After header (delta-seconds or HTTP date)"""
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        delay = self._retry_after(retry_after) if retry_after else None
+        if delay is not None:
+            return min(max(0.0, delay), settings.AI_RETRY_AFTER_MAX)
+        # Exponential backoff with full jitter
+        return random.uniform(0, settings.AI_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+    def _retryable(self, error: Exception) -> bool:
+        """429/5xx/network errors are retried (429/5xx also shrink concurrency); other 4xx are not"""
+        status = getattr(error, "status_code", None)
+        if isinstance(error, APIStatusError) and status != 429 and status < 500:
+            return False  # Bad request / auth: retrying cannot help
+        if status == 429 or (status or 0) >= 500:
+            self.throttled += 1
+            self.concurrency.on_overload()
+        return True
+
+    async def _backoff(self, error: Exception, attempt: int, deadline: float) -> bool:
+        """Wait before the next attempt; False if the wait would run past the call's AI_TIMEOUT"""
+        delay = self._retry_delay(error, attempt)
+        if time.monotonic() + delay >= deadline:
+            print(f"⚠️ AI call failed ({error}); no retry, waiting {round(delay, 1)}s would exceed AI_TIMEOUT")
+            return False
+        self.retries += 1
+        print(f"⚠️ AI call failed ({error}); retry {attempt}/{settings.AI_RETRIES - 1} in {round(delay, 1)}s")
+        await asyncio.sleep(delay)
+        return True
+
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        """Timeout for the next attempt: what is left of the call's AI_TIMEOUT"""
+        return max(1.0, deadline - time.monotonic())
+
+    async def complete(self, messages: List[dict], temperature: float = 0.3) -> str:
+        """Chat completion text; raises AIError when every attempt fails"""
+        client = self._get_client()
+        estimate = self.estimate_tokens(messages)
+        deadline = time.monotonic() + settings.AI_TIMEOUT
+        last_error: Optional[Exception] = None
+
+        for attempt in range(1, settings.AI_RETRIES + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            await self.concurrency.acquire()
+            try:
+                self.calls += 1
+                completion = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=self._remaining(deadline),
+                )
+                self.concurrency.on_success()
+                if completion.usage:
+                    used = completion.usage.total_tokens
+                    self.tokens.adjust(used - estimate)
+                    self.tokens_used += used
+                return completion.choices[0].message.content or ""
+            except (APIStatusError, APIConnectionError, APITimeoutError) as e:
+                last_error = e
+                if not self._retryable(e):
+                    break
+            finally:
+                await self.concurrency.release()
+
+            if attempt == settings.AI_RETRIES or not await self._backoff(last_error, attempt, deadline):
+                break
+
+        self.failures += 1
+        raise AIError(str(last_error))
+
+    async def stream(self, messages: List[dict], temperature: float = 0.3) -> AsyncIterator[str]:
+        """
+        Chat completion as text deltas. Failures before the first delta are
+        retried like complete(); once text has been yielded it can't be replayed,
+        so a later failure raises AIError.
+        """
+        client = self._get_client()
+        estimate = self.estimate_tokens(messages)
+        deadline = time.monotonic() + settings.AI_TIMEOUT
+        last_error: Optional[Exception] = None
+
+        for attempt in range(1, settings.AI_RETRIES + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            await self.concurrency.acquire()
+            started = False
+            try:
+                self.calls += 1
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=self._remaining(deadline),
+                    stream=True,
+                )
+                async for event in response:
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if delta:
+                        started = True
+                        yield delta
+                self.concurrency.on_success()
+                return
+            except (APIStatusError, APIConnectionError, APITimeoutError) as e:
+                last_error = e
+                if not self._retryable(e) or started:
+                    break
+            finally:
+                await self.concurrency.release()
+
+            if attempt == settings.AI_RETRIES or not await self._backoff(last_error, attempt, deadline):
+                break
+
+        self.failures += 1
+        raise AIError(str(last_error))
+
+    def complete_sync(self, messages: List[dict], temperature: float = 0.3) -> str:
+        """Blocking wrapper for worker threads"""
+        return background_loop.run(self.complete(messages, temperature))
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "tokens_used": self.tokens_used,
+        }
+
+
+# Create singleton instance
+ai_client = AIClient()
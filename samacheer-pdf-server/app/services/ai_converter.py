@@ -1,11 +1,180 @@
 """
 AI Markdown Converter
 Converts extracted text to formatted Markdown using Kimi API
+(rate limiting, concurrency and retries live in ai_client, responses are
+cached in ai_cache)
+
+Long lessons are split at page/paragraph boundaries into chunks of about
+AI_CHUNK_TOKENS, converted concurrently and stitched back together with
+one # title and ## or deeper headings after it. Each chunk is cached on
+its own, so only failed chunks are ever sent again.
+
+With on_delta, the markdown is also emitted while it is generated: the
+header, then part 1 token by token, then each later part (stitched) as
+soon as it and every part before it are done. The streamed text is the
+saved markdown exactly (part 1 gets the same fence stripping live).
 """
 
-from openai import OpenAI
-from typing import Dict, Optional
+import asyncio
+import re
+from typing import Callable, Dict, List, Optional, Tuple
 from ..config import settings
+from .ai_cache import ai_cache
+from .ai_client import ai_client
+from .background_loop import background_loop
+from .text_extraction import PAGE_BREAK, PAGE_SEPARATOR
+
+# Bump when _build_prompt or the system message changes (retires cached conversions)
+PROMPT_VERSION = 1
+TEMPERATURE = 0.3  # Lower = more consistent formatting
+CHARS_PER_TOKEN = 3
+
+HEADING = re.compile(r"^(#{1,6})(\s+)(.*)$")
+# A reply wrapped in ```markdown ... ``` (the closing fence may be missing)
+OPEN_FENCE = re.compile(r"^\s*```(?:markdown|md)?[ \t]*\n")
+CLOSE_FENCE = re.compile(r"\n\s*```\s*$")
+
+
+def _pack(text: str, budget: int, separators: Tuple[str, ...]) -> List[str]:
+    """Greedily pack pieces split at the coarsest separator; oversized pieces use the next one"""
+    if len(text) <= budget:
+        return [text]
+    if not separators:
+        return [text[i:i + budget] for i in range(0, len(text), budget)]
+
+    separator, finer = separators[0], separators[1:]
+    chunks, current = [], None
+    for piece in text.split(separator):
+        for part in _pack(piece, budget, finer):
+            if current is not None and len(current) + len(separator) + len(part) > budget:
+                chunks.append(current)
+                current = None
+            current = part if current is None else current + separator + part
+    if current is not None:
+        chunks.append(current)
+    return chunks
+
+
+def split_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split at page boundaries (then paragraphs, then lines) into pieces of
+    at most max_tokens (estimated). max_tokens 0 = one chunk.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if not budget or len(text) <= budget:
+        return [text]
+    chunks = _pack(text, budget, (PAGE_SEPARATOR, PAGE_BREAK, "\n\n", "\n"))
+    return [chunk for chunk in chunks if chunk.strip()] or [text]
+
+
+def _unfence(part: str) -> str:
+    opened = OPEN_FENCE.match(part)
+    if not opened:
+        return part
+    return CLOSE_FENCE.sub("", part[opened.end():])
+
+
+def _stitch_part(part: str, index: int, title: Optional[str]) -> Tuple[str, Optional[str]]:
+    """One converted chunk ready to join: (markdown, lesson title found so far)"""
+    part = _unfence(part)
+
+    lines, in_code = [], False
+    for line in part.strip().split("\n"):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING.match(line)
+        if match:
+            hashes, space, heading = match.groups()
+            if index == 0 and title is None and len(hashes) == 1:
+                title = heading.strip()
+            elif index > 0 and len(hashes) == 1:
+                if heading.strip() == title:
+                    continue  # The model repeated the lesson title
+                line = f"##{space}{heading}"
+        lines.append(line)
+    return "\n".join(lines).strip(), title
+
+
+def stitch_markdown(parts: List[str]) -> str:
+    """
+    Join converted chunks: strip code fences, keep the first part's # title,
+    demote # headings of later parts and drop a repeated title.
+    """
+    title = None
+    stitched = []
+    for index, part in enumerate(parts):
+        text, title = _stitch_part(part, index, title)
+        stitched.append(text)
+    return "\n\n".join(p for p in stitched if p)
+
+
+class PartEmitter:
+    """
+    Emits converted parts in order: part 1 live (token by token), later parts as they complete.
+    Part 1 is stripped like _stitch_part does: the first line is held until it is known whether
+    it opens a ``` fence, and (when it did) the last line until it is known not to close it.
+    """
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self.streamed = False  # Part 1 text already went out (it can't be re-sent)
+        self._done: Dict[int, str] = {}
+        self._next = 0
+        self._title: Optional[str] = None
+        self._sent = False
+        # Part 1 text not emitted yet
+        self._pending = ""
+        self._leading = True
+        self._fenced: Optional[bool] = None
+
+    def _send(self, text: str):
+        if text:
+            self._sent = True
+            self.on_delta(text)
+
+    def live(self, delta: str):
+        self.streamed = True
+        self._pending += delta
+        if self._fenced is None:
+            start = self._pending.lstrip()
+            if not start or (start.startswith("`") and "\n" not in start):
+                return  # Maybe a fence: wait for the whole first line
+            opened = OPEN_FENCE.match(self._pending)
+            self._fenced = bool(opened)
+            if opened:
+                self._pending = self._pending[opened.end():]
+        if self._leading:
+            self._pending = self._pending.lstrip()
+            self._leading = not self._pending
+        # Trailing whitespace is dropped at the end; a fenced reply's last line may be the closing fence
+        ready = self._pending.rstrip()
+        if self._fenced:
+            ready = ready[:max(ready.rfind("\n"), 0)].rstrip()
+        self._send(ready)
+        self._pending = self._pending[len(ready):]
+
+    def _finish_live(self):
+        tail = self._pending
+        if self._fenced is None:
+            tail = _unfence(tail.lstrip())
+        elif self._fenced:
+            tail = CLOSE_FENCE.sub("", tail)
+        self._pending = ""
+        self._send(tail.strip() if self._leading else tail.rstrip())
+
+    def part_done(self, index: int, markdown: str):
+        self._done[index] = markdown
+        while self._next in self._done:
+            part = self._done.pop(self._next)
+            text, self._title = _stitch_part(part, self._next, self._title)
+            if self._next == 0:
+                if self.streamed:
+                    self._finish_live()
+                else:
+                    self._send(text)  # Cache hit: nothing was streamed
+            elif text:
+                self._send(("\n\n" if self._sent else "") + text)
+            self._next += 1
 
 
 class AIMarkdownConverter:
@@ -13,16 +182,85 @@ class AIMarkdownConverter:
     
     def __init__(self):
         """Initialize Kimi client"""
-        self.client = OpenAI(
-            api_key=settings.KIMI_API_KEY,
-            base_url=settings.KIMI_BASE_URL,
-        )
-        self.model = settings.KIMI_MODEL
+        self.client = ai_client
+        self.model = ai_client.model
+        self.prompt_version = PROMPT_VERSION
+    
+    def _messages(self, text: str, metadata: Dict, part: Optional[Tuple[int, int]] = None) -> List[dict]:
+        return [
+            {
+                "role": "system", 
+                "content": "You are an expert at formatting educational content into clean, well-structured Markdown. You preserve all original content while improving readability."
+            },
+            {
+                "role": "user", 
+                "content": self._build_prompt(text, metadata, part)
+            }
+        ]
+    
+    async def _convert_chunk(
+        self,
+        text: str,
+        metadata: Dict,
+        part: Optional[Tuple[int, int]],
+        on_delta: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """One chunk through the cache, then the API (streamed to on_delta if given); None if it failed"""
+        messages = self._messages(text, metadata, part)
+        # Same normalized prompt + model = same answer: never pay for it twice
+        cache_key = ai_cache.key(messages, self.model, PROMPT_VERSION, TEMPERATURE)
+        cached = await asyncio.to_thread(ai_cache.get, cache_key)
+        if cached is not None:
+            return cached
+        try:
+            # Call Kimi API
+            if on_delta:
+                pieces = []
+                async for delta in self.client.stream(messages, temperature=TEMPERATURE):
+                    pieces.append(delta)
+                    on_delta(delta)
+                markdown = "".join(pieces)
+            else:
+                markdown = await self.client.complete(messages, temperature=TEMPERATURE)
+        except Exception as e:
+            label = f" (part {part[0]}/{part[1]})" if part else ""
+            print(f"❌ AI Conversion Error{label}: {e}")
+            return None
+        await asyncio.to_thread(ai_cache.put, cache_key, markdown, self.model, PROMPT_VERSION)
+        return markdown
+    
+    async def _convert_chunks(
+        self, chunks: List[str], metadata: Dict, emitter: Optional[PartEmitter] = None
+    ) -> List[Optional[str]]:
+        """Convert every chunk concurrently; failed chunks (only) get AI_CHUNK_RETRIES more rounds"""
+        total = len(chunks)
+        results: List[Optional[str]] = [None] * total
+        
+        async def convert(i: int) -> Optional[str]:
+            live = emitter.live if emitter and i == 0 else None
+            result = await self._convert_chunk(chunks[i], metadata, (i + 1, total) if total > 1 else None, live)
+            if emitter and result is not None:
+                emitter.part_done(i, result)
+            return result
+        
+        for round_number in range(1 + settings.AI_CHUNK_RETRIES):
+            pending = [i for i, result in enumerate(results) if result is None]
+            if not pending:
+                break
+            if emitter and emitter.streamed and results[0] is None:
+                break  # Part 1 broke off mid-stream: a retry would repeat text already sent
+            if round_number:
+                print(f"🔁 Retrying {len(pending)}/{total} failed chunks")
+            converted = await asyncio.gather(*(convert(i) for i in pending))
+            for i, result in zip(pending, converted):
+                results[i] = result
+        return results
     
     def convert_to_markdown(
         self, 
         text: str, 
-        metadata: Dict
+        metadata: Dict,
+        on_delta: Optional[Callable[[str], None]] = None
     ) -> Optional[str]:
         """
         Convert extracted text to formatted Markdown
@@ -30,32 +268,27 @@ class AIMarkdownConverter:
         Args:
             text: Raw text extracted from PDF
             metadata: Dict with class, subject, unit, lesson info
+            on_delta: Called (on the background loop) with markdown as it is generated
         
         Returns:
             Formatted markdown string or None if failed
         """
         try:
-            # Build prompt
-            prompt = self._build_prompt(text, metadata)
-            
-            # Call Kimi API
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert at formatting educational content into clean, well-structured Markdown. You preserve all original content while improving readability."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,  # Lower = more consistent formatting
-            )
+            # Page breaks of normalized text are only chunk boundaries: the model sees paragraphs
+            chunks = [chunk.replace(PAGE_BREAK, "\n\n") for chunk in split_chunks(text, settings.AI_CHUNK_TOKENS)]
+            if len(chunks) > 1:
+                print(f"🧩 AI: {len(chunks)} chunks of ~{settings.AI_CHUNK_TOKENS} tokens")
             
-            # Extract response
-            markdown_content = completion.choices[0].message.content
+            emitter = None
+            if on_delta:
+                on_delta(self._add_metadata_header("", metadata))
+                emitter = PartEmitter(on_delta)
+            parts = background_loop.run(self._convert_chunks(chunks, metadata, emitter))
+            failed = sum(part is None for part in parts)
+            if failed:
+                print(f"❌ AI Conversion Error: {failed}/{len(parts)} chunks failed")
+                return None
+            markdown_content = stitch_markdown(parts)
             
             # Add metadata header
             markdown_with_header = self._add_metadata_header(
@@ -69,14 +302,28 @@ class AIMarkdownConverter:
             print(f"❌ AI Conversion Error: {e}")
             return None
     
-    def _build_prompt(self, text: str, metadata: Dict) -> str:
-        """Build the conversion prompt"""
+    def _build_prompt(self, text: str, metadata: Dict, part: Optional[Tuple[int, int]] = None) -> str:
+        """Build the conversion prompt (part = (index, total) for one chunk of a long lesson)"""
         
         class_num = metadata.get('class', 'Unknown')
         subject = metadata.get('subject', 'Unknown')
         unit = metadata.get('unit', '')
         lesson_title = metadata.get('lesson_title', 'Unknown')
         
+        part_info = ""
+        if part:
+            index, total = part
+            headings = (
+                "Start with the lesson title as the only # heading; use ## and deeper below it"
+                if index == 1 else
+                "Do NOT repeat the lesson title and do not use # headings; use ## and deeper only"
+            )
+            part_info = f"""**This is part {index} of {total} of the lesson.** Parts are converted separately and joined in order:
+- Start exactly where this text starts and stop where it stops; no introduction or closing remarks
+- {headings}
+
+"""
+        
         prompt = f"""Convert the following textbook content into clean, well-formatted Markdown.
 
 **Source Information:**
@@ -85,7 +332,7 @@ class AIMarkdownConverter:
 - Unit: {unit}
 - Lesson: {lesson_title}
 
-**Formatting Requirements:**
+{part_info}**Formatting Requirements:**
 1. Use proper heading hierarchy (# ## ### ####)
 2. Format poetry with proper line breaks
 3. Create clean paragraphs with proper spacing
@@ -0,0 +1,141 @@
+"""
+Artifact Cache
+Content-addressed store for derived outputs (lesson PDFs, TXT, MD, HTML).
+
+Key = sha256(book content hash, page range, format, pipeline version, variant),
+so a repeat request is a file lookup and a changed book or pipeline can never
+return a stale artifact. Files live in storage/artifacts/<k[:2]>/<key>.<fmt>.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional
+from ..config import settings
+from ..utils import unique_temp_path
+
+# Bump when any generation step changes its output (slicing, extraction, prompt, HTML template)
+PIPELINE_VERSION = 1
+
+# Published with a precompressed .gz variant for /api/download
+COMPRESSED_FORMATS = {"txt", "md", "html"}
+
+
+class ArtifactCache:
+    """Write-once artifacts; every write is temp file + atomic rename"""
+
+    def __init__(self, root: Path, publish_dir: Path):
+        self.root = root
+        self.publish_dir = publish_dir
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._access_listeners: List[Callable[[Path], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def on_access(self, listener: Callable[[Path], None]):
+        """Register a callback receiving every artifact returned by get()"""
+        self._access_listeners.append(listener)
+
+    def key(
+        self,
+        book_hash: str,
+        start_page: int,
+        end_page: int,
+        fmt: str,
+        variant: Optional[dict] = None
+    ) -> str:
+        """
+        Cache key for one output.
+        variant holds anything else the output depends on
+        (text backend, AI model, lesson metadata, ...).
+        """
+        parts = {
+            "book": book_hash,
+            "pages": [start_page, end_page],
+            "format": fmt,
+            "pipeline": PIPELINE_VERSION,
+            "variant": variant or {},
+        }
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def path(self, key: str, fmt: str) -> Path:
+        """Where the artifact for key lives (its folder is created on demand)"""
+        folder = self.root / key[:2]
+        folder.mkdir(parents=True, exist_ok=True)
+        return folder / f"{key}.{fmt}"
+
+    def get(self, key: str, fmt: str) -> Optional[Path]:
+        """The stored artifact, or None on a miss"""
+        artifact = self.root / key[:2] / f"{key}.{fmt}"
+        if not artifact.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        for listener in self._access_listeners:
+            listener(artifact)
+        return artifact
+
+    def compressed(self, artifact: Path) -> Optional[Path]:
+        """The artifact's gzip variant (<key>.<fmt>.gz), written once; None if it can't be"""
+        variant = artifact.with_name(artifact.name + ".gz")
+        if variant.exists():
+            return variant
+        tmp_path = unique_temp_path(variant)
+        try:
+            with open(artifact, 'rb') as src, open(tmp_path, 'wb') as raw:
+                # No name, mtime=0: identical bytes every time, so the variant is content-addressed too
+                with gzip.GzipFile(filename="", fileobj=raw, mode='wb', compresslevel=9, mtime=0) as dst:
+                    shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, variant)
+            return variant
+        except OSError as e:
+            print(f"⚠️ Could not compress {artifact.name}: {e}")
+            return None
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _link(self, source: Path, target: Path):
+        tmp_path = unique_temp_path(target)
+        try:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copy(source, tmp_path)
+            # Atomic: concurrent publishers of the same lesson never expose a partial file
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def publish(self, artifact: Path, filename: str) -> Path:
+        """
+        Expose an artifact under its friendly name in storage/temp for /api/download.
+        Uses a hardlink (no data copied) and falls back to a copy across filesystems.
+        Text formats also get <filename>.gz, served to clients that accept gzip.
+        """
+        target = self.publish_dir / filename
+        target_variant = target.with_name(target.name + ".gz")
+        # A stale variant of a previous file under this name must never be served
+        target_variant.unlink(missing_ok=True)
+        self._link(artifact, target)
+
+        if artifact.suffix.lstrip(".") in COMPRESSED_FORMATS:
+            variant = self.compressed(artifact)
+            if variant:
+                self._link(variant, target_variant)
+        return target
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Create singleton instance
+artifact_cache = ArtifactCache(settings.ARTIFACTS_DIR, settings.TEMP_DIR)
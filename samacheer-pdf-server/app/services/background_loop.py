@@ -0,0 +1,35 @@
+"""
+Background Event Loop
+One long-lived asyncio loop on a daemon thread, so blocking worker code
+(book downloads, remote PDF reads) can share async clients and connection pools.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class BackgroundLoop:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The loop, started on first use (and again in forked worker processes)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="background-loop", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and block until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+# Create singleton instance
+background_loop = BackgroundLoop()
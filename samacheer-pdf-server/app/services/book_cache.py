@@ -0,0 +1,144 @@
+"""
+Book Cache
+Single-flight, lock-protected textbook downloads into storage/cache
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from filelock import FileLock, Timeout
+from ..config import settings
+from ..utils import atomic_write_text, file_sha256
+from .downloader import downloader
+
+
+class BookCache:
+    """
+    Owns storage/cache. A book only ever appears under its final name once it
+    is completely downloaded, so `exists()` on the final path is always safe.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.lock_dir = cache_dir / ".locks"
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._guard = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._listeners: List[Callable[[Path], None]] = []
+        self._access_listeners: List[Callable[[Path], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, book_key: str) -> Path:
+        return self.cache_dir / book_key
+
+    def file_lock(self, book_key: str, timeout: float = -1) -> FileLock:
+        """Cross-process lock for one book (shared by all uvicorn workers)"""
+        return FileLock(str(self.lock_dir / f"{book_key}.lock"), timeout=timeout)
+
+    def on_download(self, listener: Callable[[Path], None]):
+        """Register a callback receiving the path of every newly cached book"""
+        self._listeners.append(listener)
+
+    def on_access(self, listener: Callable[[Path], None]):
+        """Register a callback receiving the path of every book handed out by ensure()"""
+        self._access_listeners.append(listener)
+
+    def _notify(self, target: Path, listeners: Optional[list] = None):
+        for listener in self._listeners if listeners is None else listeners:
+            try:
+                listener(target)
+            except Exception as e:
+                print(f"⚠️ Cache listener failed: {e}")
+
+    def _key_lock(self, book_key: str) -> threading.Lock:
+        with self._guard:
+            if book_key not in self._key_locks:
+                self._key_locks[book_key] = threading.Lock()
+            return self._key_locks[book_key]
+
+    def _count(self, hit: bool):
+        with self._guard:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def ensure(self, book_key: str, drive_id: str) -> Optional[Path]:
+        """
+        Return the cached book, downloading it first if needed.
+        Concurrent callers for the same book wait for a single download.
+        """
+        target = self.path_for(book_key)
+        if target.exists():
+            self._count(hit=True)
+            self._notify(target, self._access_listeners)
+            return target
+
+        self._count(hit=False)
+        # 1. Single-flight inside this process (threads wait here, not on the file lock)
+        with self._key_lock(book_key):
+            if target.exists():
+                # Downloaded by the thread we waited for: still an access
+                self._notify(target, self._access_listeners)
+                return target
+
+            # 2. Single-flight across worker processes
+            try:
+                with self.file_lock(book_key, timeout=settings.DOWNLOAD_LOCK_TIMEOUT):
+                    if target.exists():
+                        print(f"📦 Cache: {book_key} was downloaded by another worker")
+                        self._notify(target, self._access_listeners)
+                        return target
+                    if self._download(drive_id, target):
+                        self._notify(target)
+                        return target
+            except Timeout:
+                print(f"❌ Cache: timed out waiting for download lock on {book_key}")
+
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def content_hash(self, book_path: Path) -> str:
+        """
+        SHA-256 of a cached book, persisted next to it as <book_key>.sha256
+        so a 100 MB textbook is hashed once, not once per process start.
+        """
+        stat = book_path.stat()
+        sidecar = book_path.with_name(book_path.name + ".sha256")
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                recorded = json.load(f)
+            if recorded["size"] == stat.st_size and recorded["mtime_ns"] == stat.st_mtime_ns:
+                return recorded["sha256"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = file_sha256(book_path)
+        atomic_write_text(sidecar, json.dumps({
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }))
+        return digest
+
+    def _download(self, file_id: str, target: Path) -> bool:
+        """Resumable download into a .part file, validated, then atomically renamed"""
+        try:
+            print(f"⬇️ Downloading {target.name}...")
+            return downloader.download(file_id, target)
+        except Exception as e:
+            print(f"❌ Download error for {target.name}: {e}")
+            return False
+
+
+# Create singleton instance
+book_cache = BookCache(settings.CACHE_DIR)
@@ -1,20 +1,12 @@
-import json
 import shutil
 import os
 from pathlib import Path
 from ..config import settings
+from .registry import registry
 
 class ContentBridge:
     def __init__(self):
-        # 1. Load the Map
-        self.curriculum_path = settings.DATA_DIR / "curriculum.json"
-        
-        try:
-            with open(self.curriculum_path, 'r') as f:
-                self.curriculum = json.load(f)
-        except FileNotFoundError:
-            print(f"❌ Bridge Error: curriculum.json not found.")
-            self.curriculum = {}
+        # 1. The Map (curriculum) comes from the registry, so edits go live without a restart
 
         # 2. Load Target Path
         target_root = settings.CONTENT_SERVER_PATH
@@ -28,7 +20,11 @@ class ContentBridge:
         """
         Moves the generated file to the correct Content Server location.
         """
-        if not self.target_base or not self.curriculum:
+        curriculum = registry.curriculum(
+            metadata.get('subject') or "english",
+            metadata.get('medium') or "english"
+        )
+        if not self.target_base or not curriculum:
             print("❌ Bridge Error: Configuration missing.")
             return False
 
@@ -44,11 +40,11 @@ class ContentBridge:
         try:
             lesson_idx = metadata['lesson_choice'] - 1 
             
-            if class_str not in self.curriculum:
-                print(f"❌ Bridge Error: Class {class_str} not in curriculum.json")
+            if class_str not in curriculum:
+                print(f"❌ Bridge Error: Class {class_str} not in curriculum")
                 return False
 
-            lesson_data = self.curriculum[class_str][term_key][unit_key][lesson_idx]
+            lesson_data = curriculum[class_str][term_key][unit_key][lesson_idx]
             lesson_id = lesson_data['id']
             print(f"🌉 Bridge: Mapped 'Unit {metadata['unit']} Lesson {metadata['lesson_choice']}' -> '{lesson_id}'")
         except (KeyError, IndexError) as e:
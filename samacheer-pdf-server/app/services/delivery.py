@@ -0,0 +1,195 @@
+"""
+File Delivery
+HTTP caching semantics for /api/download:
+
+- Strong ETags from content hashes (books: the .sha256 sidecar, published
+  files: file_sha256, memoized per inode) and Last-Modified
+- If-None-Match / If-Modified-Since -> 304 Not Modified
+- Single byte ranges (Range / If-Range) -> 206, for resumable downloads
+- Text outputs served from their precompressed .gz variant (written by
+  ArtifactCache.publish) when the client accepts gzip, with Vary: Accept-Encoding
+"""
+
+import asyncio
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+from ..config import settings
+from ..utils import file_sha256
+from .book_cache import book_cache
+from .storage_manager import storage_manager
+
+CHUNK_SIZE = 64 * 1024
+# Starlette appends "; charset=utf-8" to text types
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".html": "text/html",
+}
+COMPRESSIBLE = {".txt", ".md", ".html"}
+
+
+def iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Bytes start..end (inclusive) of a file, in chunks"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class FileDelivery:
+    def media_type(self, filename: str) -> str:
+        return MEDIA_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+
+    @staticmethod
+    def content_disposition(filename: str) -> str:
+        """attachment header (RFC 5987 filename* for names that aren't plain ASCII, like FileResponse)"""
+        quoted = quote(filename)
+        if quoted != filename:
+            return f"attachment; filename*=utf-8''{quoted}"
+        return f'attachment; filename="{filename}"'
+
+    def content_hash(self, path: Path) -> str:
+        """SHA-256 behind the ETag (blocking on the first call per file)"""
+        if path.parent == settings.CACHE_DIR:
+            return book_cache.content_hash(path)
+        return file_sha256(path)
+
+    @staticmethod
+    def _accepts_gzip(request: Request) -> bool:
+        for coding in request.headers.get("accept-encoding", "").split(","):
+            name, _, params = coding.strip().partition(";")
+            if name.strip().lower() in ("gzip", "*"):
+                match = re.search(r"q=([\d.]+)", params)
+                return not match or float(match.group(1)) > 0
+        return False
+
+    @staticmethod
+    def _etag_matches(header: str, etag: str) -> bool:
+        """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+        if header.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+        return etag in tags
+
+    @staticmethod
+    def _not_modified_since(header: str, mtime: float) -> bool:
+        try:
+            return int(mtime) <= parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+        """(start, end) of a single range; None to serve the whole file; raises ValueError if unsatisfiable"""
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+        if not match or match.groups() == ("", ""):
+            return None  # Malformed or multi-range: a full 200 is always allowed
+        start, end = match.groups()
+        if start == "":
+            length = int(end)
+            if length == 0:
+                raise ValueError("Empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start >= size or end < start:
+            raise ValueError("Range not satisfiable")
+        return start, end
+
+    def _if_range_matches(self, request: Request, etag: str, last_modified: str) -> bool:
+        """Honour Range only if the client's copy is still current"""
+        if_range = request.headers.get("if-range")
+        if not if_range:
+            return True
+        if if_range.startswith(('"', "W/")):
+            return if_range == etag  # Strong comparison
+        return if_range == last_modified
+
+    async def respond(
+        self, request: Request, path: Path, filename: str, cache_control: Optional[str] = None
+    ) -> Response:
+        """Full, partial (206) or 304 response for a downloadable file"""
+        suffix = Path(filename).suffix.lower()
+        variant = path.with_name(path.name + ".gz")
+        compressible = suffix in COMPRESSIBLE
+        use_gzip = (
+            compressible and "range" not in request.headers
+            and self._accepts_gzip(request) and variant.is_file()
+        )
+
+        stat = path.stat()
+        digest = await asyncio.to_thread(self.content_hash, path)
+        # Each encoding is its own representation, so it needs its own strong ETag
+        etag = f'"{digest}-gzip"' if use_gzip else f'"{digest}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": cache_control or f"public, max-age={settings.DOWNLOAD_CACHE_MAX_AGE}",
+            "Accept-Ranges": "bytes",
+        }
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+
+        # Conditional GET (If-Modified-Since only counts without If-None-Match)
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if (if_none_match and self._etag_matches(if_none_match, etag)) or (
+            not if_none_match and if_modified_since and self._not_modified_since(if_modified_since, stat.st_mtime)
+        ):
+            return Response(status_code=304, headers=headers)
+
+        media_type = self.media_type(filename)
+        range_header = request.headers.get("range")
+        if range_header and self._if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = self._byte_range(range_header, stat.st_size)
+            except ValueError:
+                headers["Content-Range"] = f"bytes */{stat.st_size}"
+                headers["Cache-Control"] = "no-store"  # An error, never the long-lived resource policy
+                return Response(status_code=416, headers=headers)
+            if byte_range:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+                headers["Content-Length"] = str(end - start + 1)
+                headers["Content-Disposition"] = self.content_disposition(filename)
+                if request.method == "HEAD":
+                    # Headers only (FileResponse already skips the body for HEAD; streams don't)
+                    return Response(status_code=206, headers=headers, media_type=media_type)
+                storage_manager.acquire(path)
+                return StreamingResponse(
+                    iter_file_range(path, start, end),
+                    status_code=206,
+                    headers=headers,
+                    media_type=media_type,
+                    background=BackgroundTask(storage_manager.release, path)
+                )
+
+        served = variant if use_gzip else path
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        # In use until the response body is sent: the storage reaper skips it
+        storage_manager.acquire(served)
+        return FileResponse(
+            path=served,
+            filename=filename,
+            media_type=media_type,
+            headers=headers,
+            background=BackgroundTask(storage_manager.release, served)
+        )
+
+
+# Create singleton instance
+delivery = FileDelivery()
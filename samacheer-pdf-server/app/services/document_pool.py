@@ -0,0 +1,162 @@
+"""
+Document Pool
+Keeps parsed PDF documents open across requests (bounded LRU)
+"""
+
+import threading
+import PyPDF2
+import pdfplumber
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from ..config import settings
+
+
+class PooledDocument:
+    """One cached book: lazily opened PyPDF2 reader + pdfplumber document"""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self.leases = 0
+        self.retired = False
+        self._pypdf_lock = threading.RLock()
+        self._plumber_lock = threading.RLock()
+        self._pypdf_file = None
+        self._pypdf: Optional[PyPDF2.PdfReader] = None
+        self._plumber = None
+
+    @contextmanager
+    def pypdf(self) -> Iterator[PyPDF2.PdfReader]:
+        """PyPDF2 reader (parsers are not thread-safe, so access is serialized)"""
+        with self._pypdf_lock:
+            if self._pypdf is None:
+                self._pypdf_file = open(self.path, 'rb')
+                self._pypdf = PyPDF2.PdfReader(self._pypdf_file)
+            yield self._pypdf
+
+    @contextmanager
+    def plumber(self) -> Iterator["pdfplumber.PDF"]:
+        """pdfplumber document (access is serialized)"""
+        with self._plumber_lock:
+            if self._plumber is None:
+                self._plumber = pdfplumber.open(self.path)
+            yield self._plumber
+
+    def close(self):
+        with self._pypdf_lock:
+            if self._pypdf_file:
+                self._pypdf_file.close()
+            self._pypdf_file = None
+            self._pypdf = None
+        with self._plumber_lock:
+            if self._plumber is not None:
+                self._plumber.close()
+            self._plumber = None
+
+
+class DocumentPool:
+    """
+    LRU pool of open documents keyed by (book_key, mtime).
+    Bounded by document count and total source size; documents still in use
+    when evicted are closed once their last lease is released.
+    """
+
+    def __init__(self, max_documents: int, max_bytes: int):
+        self.max_documents = max(1, max_documents)
+        self.max_bytes = max_bytes
+        self._docs: "OrderedDict[Tuple[str, int], PooledDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def lease(self, path: Path) -> Iterator[PooledDocument]:
+        """Borrow the pooled document for path (opens it on a miss)"""
+        doc = self._acquire(path)
+        try:
+            yield doc
+        finally:
+            self._release(doc)
+
+    @contextmanager
+    def pypdf(self, path: Path) -> Iterator[PyPDF2.PdfReader]:
+        with self.lease(path) as doc, doc.pypdf() as reader:
+            yield reader
+
+    @contextmanager
+    def plumber(self, path: Path) -> Iterator["pdfplumber.PDF"]:
+        with self.lease(path) as doc, doc.plumber() as pdf:
+            yield pdf
+
+    def _acquire(self, path: Path) -> PooledDocument:
+        stat = path.stat()
+        key = (path.name, stat.st_mtime_ns)
+
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is not None:
+                self.hits += 1
+                self._docs.move_to_end(key)
+            else:
+                self.misses += 1
+                # The file changed on disk: drop the stale parse
+                for stale_key in [k for k in self._docs if k[0] == path.name]:
+                    self._retire(stale_key)
+                doc = PooledDocument(path, stat.st_size)
+                self._docs[key] = doc
+                self._evict()
+            doc.leases += 1
+            return doc
+
+    def _release(self, doc: PooledDocument):
+        with self._lock:
+            doc.leases -= 1
+            close_now = doc.retired and doc.leases == 0
+        if close_now:
+            doc.close()
+
+    def _evict(self):
+        """Drop least-recently-used documents until within budget (caller holds _lock)"""
+        while len(self._docs) > 1 and (
+            len(self._docs) > self.max_documents or self._total_bytes() > self.max_bytes
+        ):
+            oldest_key = next(iter(self._docs))
+            self._retire(oldest_key)
+            self.evictions += 1
+
+    def _retire(self, key: Tuple[str, int]):
+        doc = self._docs.pop(key)
+        doc.retired = True
+        if doc.leases == 0:
+            doc.close()
+
+    def _total_bytes(self) -> int:
+        return sum(d.size for d in self._docs.values())
+
+    def invalidate(self, book_key: str):
+        """Forget every pooled version of a book (e.g. before deleting it)"""
+        with self._lock:
+            for key in [k for k in self._docs if k[0] == book_key]:
+                self._retire(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "documents": len(self._docs),
+                "bytes": self._total_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Create singleton instance
+document_pool = DocumentPool(
+    max_documents=settings.DOCUMENT_POOL_MAX_DOCUMENTS,
+    max_bytes=settings.DOCUMENT_POOL_MAX_MB * 1024 * 1024,
+)
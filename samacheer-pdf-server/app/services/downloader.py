@@ -0,0 +1,303 @@
+"""
+Book Downloader
+Async httpx downloads with a shared connection pool, bounded parallelism,
+retry with backoff, Range-based resume of partial files and PDF validation.
+
+Large books are fetched as several byte-range segments in parallel, written
+into one pre-sized .part file; a .part.json sidecar records each segment's
+progress so a retry only re-fetches what is missing. Origins that ignore
+Range get a single stream.
+
+Every resume is conditional: the .part.json sidecar records the file's
+version (strong ETag, else Last-Modified) and each Range request carries it
+as If-Range, so a file replaced at the origin is fetched again from scratch
+instead of being spliced onto the old bytes.
+
+The source URL comes from DOWNLOAD_URL_TEMPLATE, so a local HTTP server
+(scripts/fake_drive.py) can stand in for Google Drive.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import PyPDF2
+import httpx
+from pathlib import Path
+from typing import List, Optional, Tuple
+from ..config import settings
+from ..utils import atomic_write_text
+from .background_loop import background_loop
+
+MB = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """
+    Download failed. retryable=False: retrying cannot help (404, HTML page, bad PDF).
+    discard=True: the partial file holds wrong bytes and must not be resumed.
+    """
+
+    def __init__(self, message: str, retryable: bool = True, discard: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.discard = discard or not retryable
+
+
+class Downloader:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pid = None
+
+    def url_for(self, file_id: str) -> str:
+        return settings.DOWNLOAD_URL_TEMPLATE.format(file_id=file_id)
+
+    def part_path(self, target: Path) -> Path:
+        """Partial download kept between attempts (callers hold the book's lock)"""
+        return target.with_name(f".{target.name}.part")
+
+    def state_path(self, part: Path) -> Path:
+        """Version (and segment progress) of a .part file"""
+        return part.with_name(part.name + ".json")
+
+    def _load_state(self, part: Path) -> dict:
+        try:
+            with open(self.state_path(part), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def validator(response: httpx.Response) -> str:
+        """The version a response is from, for If-Range: a strong ETag, else Last-Modified"""
+        etag = response.headers.get("etag", "")
+        # If-Range needs a strong ETag; weak ones fall back to Last-Modified
+        return etag if etag and not etag.startswith("W/") else response.headers.get("last-modified", "")
+
+    def _discard(self, part: Path):
+        part.unlink(missing_ok=True)
+        self.state_path(part).unlink(missing_ok=True)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Created on the background loop on first use (and again after a fork)"""
+        if self._client is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT, connect=10),
+                limits=httpx.Limits(
+                    max_connections=settings.DOWNLOAD_MAX_PARALLEL * max(1, settings.DOWNLOAD_MAX_SEGMENTS)
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(settings.DOWNLOAD_MAX_PARALLEL)
+        return self._client
+
+    # --- Validation ---
+
+    @staticmethod
+    def validate_pdf(path: Path) -> int:
+        """Page count of a complete, parseable PDF; raises DownloadError otherwise"""
+        with open(path, 'rb') as f:
+            if not f.read(5).startswith(b"%PDF"):
+                raise DownloadError("Not a PDF (Drive quota/HTML page?)", retryable=False)
+            f.seek(max(0, path.stat().st_size - 1024))
+            if b"%%EOF" not in f.read():
+                raise DownloadError("PDF is truncated (no %%EOF)", discard=True)
+
+        try:
+            with open(path, 'rb') as f:
+                pages = len(PyPDF2.PdfReader(f).pages)
+        except Exception as e:
+            raise DownloadError(f"PDF does not parse: {e}", retryable=False)
+        if pages == 0:
+            raise DownloadError("PDF has no pages", retryable=False)
+        return pages
+
+    # --- Transfer ---
+
+    @staticmethod
+    def _check_response(response: httpx.Response):
+        if response.status_code in (404, 403, 401, 410):
+            raise DownloadError(f"HTTP {response.status_code}", retryable=False)
+        if response.status_code >= 400:
+            raise DownloadError(f"HTTP {response.status_code}")
+        if "text/html" in response.headers.get("content-type", ""):
+            raise DownloadError("Got an HTML page instead of the PDF (Drive quota?)", retryable=False)
+
+    async def _probe(self, url: str) -> Tuple[Optional[int], bool, str]:
+        """(file size, ranges supported, validator) from a one-byte Range request"""
+        async with self._get_client().stream("GET", url, headers={"Range": "bytes=0-0"}) as response:
+            self._check_response(response)
+            match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("content-range", ""))
+            if response.status_code == 206 and match:
+                return int(match.group(1)), True, self.validator(response)
+            length = response.headers.get("content-length")
+            return (int(length) if length else None), False, self.validator(response)
+
+    def _plan_segments(self, size: Optional[int], ranges: bool) -> int:
+        """Segment count: ~DOWNLOAD_SEGMENT_MB each, 1 (single stream) for small files or no Range support"""
+        if not ranges or not size or size < settings.DOWNLOAD_SEGMENT_MIN_MB * MB:
+            return 1
+        wanted = math.ceil(size / (settings.DOWNLOAD_SEGMENT_MB * MB))
+        return max(1, min(settings.DOWNLOAD_MAX_SEGMENTS, wanted))
+
+    async def _fetch_segment(self, url: str, part: Path, segment: List[int], progress: dict, validator: str):
+        """Fill one [start, end, done] segment of the pre-sized .part file"""
+        start, end, done = segment
+        if start + done > end:
+            return
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            self._check_response(response)
+            if response.status_code != 206:
+                raise DownloadError("Origin sent the whole file (it changed, or ignores Range)", discard=True)
+            if validator and self.validator(response) != validator:
+                raise DownloadError("File changed at the origin", discard=True)
+            with open(part, 'r+b') as f:
+                f.seek(start + done)
+                async for chunk in response.aiter_bytes():
+                    data = chunk[:end + 1 - (start + segment[2])]
+                    f.write(data)
+                    segment[2] += len(data)
+                    progress["done"] += len(data)
+                    progress["report"]()
+
+    async def _segmented(self, url: str, part: Path, name: str, size: int, count: int, validator: str):
+        """Download all segments concurrently, resuming from the .part.json state"""
+        state_path = self.state_path(part)
+        state = self._load_state(part)
+
+        if (
+            "segments" not in state or state.get("size") != size
+            or state.get("validator") != validator or not part.exists()
+        ):
+            bounds = [round(size * i / count) for i in range(count + 1)]
+            state = {
+                "size": size,
+                "validator": validator,
+                "segments": [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)],
+            }
+            with open(part, 'wb') as f:
+                f.truncate(size)
+            print(f"🧩 {name}: {round(size / MB, 1)} MB in {count} segments")
+        else:
+            print(f"↩️ Resuming {name} ({len(state['segments'])} segments)")
+
+        segments = state["segments"]
+        done = sum(s[2] for s in segments)
+        progress = {"done": done, "next": (int(done / size * 4) + 1) / 4}
+
+        def report():
+            if progress["done"] / size >= progress["next"] and progress["done"] < size:
+                print(f"⬇️ {name}: {int(progress['next'] * 100)}%")
+                progress["next"] += 0.25
+        progress["report"] = report
+
+        try:
+            results = await asyncio.gather(
+                *(self._fetch_segment(url, part, segment, progress, validator) for segment in segments),
+                return_exceptions=True
+            )
+        finally:
+            # Persist, so the next attempt only fetches what is missing
+            atomic_write_text(state_path, json.dumps(state))
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        if any(s[0] + s[2] <= s[1] for s in segments):
+            raise DownloadError("A segment ended early")
+        state_path.unlink(missing_ok=True)
+
+    async def _attempt(self, url: str, part: Path, name: str):
+        """One GET, resuming from whatever is already in the .part file"""
+        state = self._load_state(part)
+        if "segments" in state:
+            # A segmented .part is pre-sized with holes: its length means nothing here
+            self._discard(part)
+            state = {}
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if state.get("validator"):
+                headers["If-Range"] = state["validator"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 416 and offset:
+                return  # Nothing left to fetch: the part file is already complete
+            self._check_response(response)
+            validator = self.validator(response)
+
+            if response.status_code == 206:
+                if state.get("validator") and validator != state["validator"]:
+                    raise DownloadError("File changed at the origin", discard=True)
+                mode = 'ab'
+                if offset:
+                    print(f"↩️ Resuming {name} at {round(offset / 1024 / 1024, 1)} MB")
+            else:
+                # Origin ignored the Range header, or the file changed (If-Range): start over
+                mode, offset = 'wb', 0
+            # Remember which version the .part holds, so only that version is ever appended
+            atomic_write_text(self.state_path(part), json.dumps({"validator": validator}))
+
+            total = int(response.headers.get("content-length", 0)) + offset
+            next_report = (int(offset / total * 4) + 1) / 4 if total else 1
+            with open(part, mode) as f:
+                # Network-sized chunks: everything received is on disk if the connection drops
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+                    offset += len(chunk)
+                    if total and offset / total >= next_report and offset < total:
+                        print(f"⬇️ {name}: {int(next_report * 100)}%")
+                        next_report += 0.25
+
+    async def fetch(self, file_id: str, target: Path) -> bool:
+        """Download file_id to target (atomically). Returns False after all retries fail."""
+        url = self.url_for(file_id)
+        part = self.part_path(target)
+        self._get_client()
+        plan = None  # (size, segment count, validator), probed once per download
+
+        async with self._semaphore:
+            for attempt in range(1, settings.DOWNLOAD_RETRIES + 1):
+                try:
+                    if plan is None and settings.DOWNLOAD_MAX_SEGMENTS > 1:
+                        size, ranges, validator = await self._probe(url)
+                        plan = (size, self._plan_segments(size, ranges), validator)
+                    if plan and plan[1] > 1:
+                        await self._segmented(url, part, target.name, *plan)
+                    else:
+                        await self._attempt(url, part, target.name)
+                    pages = await asyncio.to_thread(self.validate_pdf, part)
+                    os.replace(part, target)
+                    self.state_path(part).unlink(missing_ok=True)
+                    print(f"✅ Downloaded {target.name} ({pages} pages)")
+                    return True
+                except (DownloadError, httpx.HTTPError, OSError) as e:
+                    print(f"⚠️ Download attempt {attempt}/{settings.DOWNLOAD_RETRIES} failed for {target.name}: {e}")
+                    if isinstance(e, DownloadError) and e.discard:
+                        self._discard(part)
+                        plan = None  # e.g. the file changed or the origin stopped honouring ranges: probe again
+                    if isinstance(e, DownloadError) and not e.retryable:
+                        break
+                    if attempt < settings.DOWNLOAD_RETRIES:
+                        # Exponential backoff with full jitter
+                        delay = settings.DOWNLOAD_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                        await asyncio.sleep(random.uniform(0, delay))
+
+        print(f"❌ Download failed: {target.name}")
+        return False
+
+    def download(self, file_id: str, target: Path) -> bool:
+        """Blocking wrapper for worker threads"""
+        return background_loop.run(self.fetch(file_id, target))
+
+
+# Create singleton instance
+downloader = Downloader()
@@ -2,40 +2,100 @@
 HTML Converter
 Converts Markdown to beautiful HTML (Standalone or Server-Ready)
 Removes raw metadata/frontmatter from the output.
+Streaming: MarkdownBlockRenderer turns markdown deltas into HTML blocks
+as each block completes.
 """
 
 import markdown
 import re
-from typing import Optional
+from typing import List, Optional
+
+EXTENSIONS = [
+    'extra',          # Tables, footnotes
+    'codehilite',     # Code highlighting
+    'toc',            # Table of contents
+    'nl2br',          # Newline to <br>
+    'sane_lists',     # Better lists
+]
+
+
+class MarkdownBlockRenderer:
+    """
+    Incremental rendering: feed() markdown as it arrives and get back the
+    HTML of every block that completed (a blank line outside a ``` fence).
+    A preview only: the saved document is rendered from the whole markdown.
+    """
+
+    def __init__(self, converter: "HTMLConverter"):
+        self.converter = converter
+        self.buffer = ""
+        self.first = True
+
+    def _render(self, block: str) -> Optional[str]:
+        # Same cleaning as the saved document; the frontmatter header is always the first block
+        block = self.converter._clean_metadata(block + "\n", frontmatter=self.first)
+        self.first = False
+        if not block.strip():
+            return None
+        return self.converter._markdown().convert(block)
+
+    def _complete_blocks(self) -> List[str]:
+        blocks, start, in_code = [], 0, False
+        position = 0
+        for line in self.buffer.splitlines(keepends=True):
+            position += len(line)
+            if not line.endswith("\n"):
+                break  # Unfinished line
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+            elif not line.strip() and not in_code:
+                block = self.buffer[start:position].strip("\n")
+                if block.strip():
+                    blocks.append(block)
+                start = position
+        self.buffer = self.buffer[start:]
+        return blocks
+
+    def feed(self, delta: str) -> List[str]:
+        self.buffer += delta
+        if "\n" not in delta:
+            return []
+        return [html for html in map(self._render, self._complete_blocks()) if html]
+
+    def close(self) -> List[str]:
+        """HTML for whatever is left once the markdown is complete"""
+        block, self.buffer = self.buffer.strip("\n"), ""
+        html = self._render(block) if block.strip() else None
+        return [html] if html else []
+
 
 class HTMLConverter:
     """Converts Markdown to styled HTML"""
     
-    def __init__(self):
-        self.md = markdown.Markdown(
-            extensions=[
-                'extra',          # Tables, footnotes
-                'codehilite',     # Code highlighting
-                'toc',            # Table of contents
-                'nl2br',          # Newline to <br>
-                'sane_lists',     # Better lists
-            ]
-        )
+    @staticmethod
+    def _markdown() -> markdown.Markdown:
+        """A fresh parser per document (Markdown instances keep state and aren't thread-safe)"""
+        return markdown.Markdown(extensions=EXTENSIONS)
+    
+    def stream_renderer(self) -> MarkdownBlockRenderer:
+        return MarkdownBlockRenderer(self)
     
-    def _clean_metadata(self, text: str) -> str:
+    def _clean_metadata(self, text: str, frontmatter: bool = True) -> str:
         """
         Removes YAML-style metadata or JSON blocks from the top of the file.
         Example:
         title: "Lesson"
         class: 8
         ...
+        frontmatter=False for later blocks of a streamed document (key-value lines only).
         """
         # 1. Remove standard YAML frontmatter (between --- and ---)
-        text = re.sub(r'^---\s*\n.*?\n---\s*\n', '', text, flags=re.DOTALL)
+        if frontmatter:
+            text = re.sub(r'^---\s*\n.*?\n---\s*\n', '', text, flags=re.DOTALL)
         
         # 2. Remove raw key-value pairs at the start if AI forgot the --- dashes
         # Matches lines like "title: ...", "class: ...", "source: ..." at the start
-        text = re.sub(r'^\s*(title|class|subject|unit|source|generated):\s+.*?\n', '', text, flags=re.MULTILINE | re.IGNORECASE)
+        text = re.sub(r'^\s*(title|class|subject|unit|source|generated):\s+.*?(?:\n|$)', '', text, flags=re.MULTILINE | re.IGNORECASE)
         
         return text.strip()
 
@@ -53,7 +113,7 @@ class HTMLConverter:
             cleaned_markdown = self._clean_metadata(markdown_content)
             
             # Step 2: Convert MD to HTML body
-            html_body = self.md.convert(cleaned_markdown)
+            html_body = self._markdown().convert(cleaned_markdown)
             
             # Step 3: Select template
             if mode == "server":
@@ -0,0 +1,286 @@
+"""
+Job Manager
+Runs generation requests in the background so clients get a job id at once
+and follow stage-by-stage progress instead of holding a socket for minutes.
+
+A job runs in the process that accepted it, but its state is written to
+storage/jobs/<job_id>.json on every change, so any uvicorn worker can answer
+GET /api/jobs/{job_id} and stream its events. A job whose worker died before
+it finished is reported as failed.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+from ..config import settings
+from ..utils import atomic_write_text
+from .worker_pool import worker_pool, WorkerPoolBusy
+
+# Stages reported by the processor, in pipeline order
+JOB_STAGES = ["download", "slice", "extract", "ai", "render", "bridge"]
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class Job:
+    """One background request; progress updates come from the worker thread"""
+
+    def __init__(self, request_data: dict):
+        self.id = uuid.uuid4().hex
+        self.request = request_data
+        self.state = "queued"        # queued -> running -> done | failed
+        self.stage: Optional[str] = None
+        self.stages = {name: {"status": "pending", "detail": None} for name in JOB_STAGES}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.error_code: Optional[str] = None
+        self.created_at = datetime.now()
+        self.updated_at = self.created_at
+        self.version = 0             # Bumped on every change (SSE streams poll it)
+        self.owner = os.getpid()     # The worker running it
+        self.path: Optional[Path] = None  # Shared state file (None = memory only)
+        self._lock = threading.Lock()
+
+    def _touch(self):
+        """Record a change (caller holds _lock)"""
+        self.updated_at = datetime.now()
+        self.version += 1
+        self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            atomic_write_text(self.path, json.dumps(self._to_dict(), default=str))
+        except OSError as e:
+            print(f"⚠️ Job {self.id}: could not save state: {e}")
+
+    def _to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "request": self.request,
+            "state": self.state,
+            "stage": self.stage,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "error_code": self.error_code,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "version": self.version,
+            "owner": self.owner,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        """Read-only copy of a job saved by any worker"""
+        job = cls(data["request"])
+        job.id = data["job_id"]
+        job.state = data["state"]
+        job.stage = data["stage"]
+        job.stages = data["stages"]
+        job.result = data["result"]
+        job.error = data["error"]
+        job.error_code = data.get("error_code")
+        job.created_at = datetime.fromisoformat(data["created_at"])
+        job.updated_at = datetime.fromisoformat(data["updated_at"])
+        job.version = data["version"]
+        job.owner = data["owner"]
+        return job
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def report(self, stage: str, status: str, detail: Optional[str] = None):
+        """Progress callback: status is "running", "done" or "skipped" """
+        with self._lock:
+            if stage not in self.stages:
+                return
+            self.stages[stage] = {"status": status, "detail": detail}
+            # The first report means a worker has picked the job up
+            self.state = "running"
+            if status == "running":
+                self.stage = stage
+            self._touch()
+
+    def start(self):
+        with self._lock:
+            self.state = "running"
+            self._touch()
+
+    def finish(self, result: dict):
+        with self._lock:
+            self._finish(result)
+            self._touch()
+
+    def _finish(self, result: dict):
+        if result.get("error"):
+            self.state = "failed"
+            self.error = result.get("message")
+            self.error_code = result.get("error_code")
+        else:
+            self.state = "done"
+            self.result = result
+        # Stages the request never needed / the stage that broke
+        for info in self.stages.values():
+            if info["status"] == "pending":
+                info["status"] = "skipped"
+            elif info["status"] == "running":
+                info["status"] = "failed"
+        self.stage = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "state": self.state,
+                "stage": self.stage,
+                "stages": [{"name": name, **info} for name, info in self.stages.items()],
+                "result": dict(self.result) if self.result else None,
+                "error": self.error,
+                "error_code": self.error_code,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+                "version": self.version,
+            }
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobManager:
+    def __init__(self, root: Path, retention_minutes: int):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.retention = timedelta(minutes=retention_minutes)
+        self._jobs: Dict[str, Job] = {}  # Jobs running in this process
+        self._tasks = set()
+
+    def _path(self, job_id: str) -> Path:
+        return self.root / f"{job_id}.json"
+
+    def submit(self, request_data: dict) -> Job:
+        """
+        Queue a request on the worker pool and return its job immediately.
+        Raises WorkerPoolBusy when the pool cannot take more work.
+        """
+        if worker_pool.is_full():
+            raise WorkerPoolBusy("Worker pool is full, try again later")
+
+        self._prune()
+        job = Job(request_data)
+        job.path = self._path(job.id)
+        job.save()
+        self._jobs[job.id] = job
+
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        print(f"🧾 Job queued: {job.id}")
+        return job
+
+    async def _run(self, job: Job):
+        from ..processor import run_process_request, PROCESSING_ERROR
+
+        # Callbacks can't cross process boundaries: process pools only report queued/running/done
+        progress = job.report if worker_pool.kind != "process" else None
+        try:
+            if progress is None:
+                job.start()
+            result = await worker_pool.run(run_process_request, job.request, progress)
+        except WorkerPoolBusy as e:
+            result = {"error": True, "error_code": "SERVER_BUSY", "message": str(e)}
+        except Exception as e:
+            result = {"error": True, "error_code": PROCESSING_ERROR, "message": f"Job error: {str(e)}"}
+        if result.get("error"):
+            result.setdefault("error_code", PROCESSING_ERROR)
+
+        job.finish(result)
+        # Finished jobs are served from the shared store, like every other worker's
+        self._jobs.pop(job.id, None)
+        icon = "✅" if job.state == "done" else "❌"
+        print(f"{icon} Job {job.state}: {job.id}")
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        if not job.finished and not _process_alive(job.owner):
+            from ..processor import PROCESSING_ERROR
+            job._finish({"error": True, "error_code": PROCESSING_ERROR, "message": "Worker stopped before the job finished"})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job from any worker (the live object when it runs in this process)"""
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        return self._jobs.get(job_id) or self._load(job_id)
+
+    async def events(self, job: Job, interval: float = 0.5, heartbeat: float = 15):
+        """
+        Yield a snapshot on every change until the job finishes.
+        Yields None as a keep-alive when nothing changed for `heartbeat` seconds.
+        """
+        seen = -1
+        idle = 0.0
+        while True:
+            current = self.get(job.id)
+            if current is None:
+                return  # Pruned
+            snapshot = current.snapshot()
+            if snapshot["version"] != seen or snapshot["state"] in ("done", "failed"):
+                seen = snapshot["version"]
+                idle = 0.0
+                yield snapshot
+                if snapshot["state"] in ("done", "failed"):
+                    return
+            elif idle >= heartbeat:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(interval)
+            idle += interval
+
+    def _saved_jobs(self):
+        for path in self.root.glob("*.json"):
+            job = self._load(path.stem)
+            if job is not None:
+                yield path, job
+
+    def _prune(self):
+        """Forget finished jobs (of every worker) older than the retention window"""
+        cutoff = time.time() - self.retention.total_seconds()
+        for path, job in self._saved_jobs():
+            try:
+                expired = job.finished and path.stat().st_mtime < cutoff
+            except OSError:
+                continue
+            if expired:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        states = [job.state for _, job in self._saved_jobs()]
+        return {state: states.count(state) for state in ("queued", "running", "done", "failed")}
+
+
+# Create singleton instance
+job_manager = JobManager(settings.JOBS_DIR, retention_minutes=settings.JOB_RETENTION_MINUTES)
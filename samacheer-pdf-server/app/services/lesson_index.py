@@ -0,0 +1,177 @@
+"""
+Lesson Index Compiler
+Turns an index file (data/indexes/...) into a lookup table once at load time:
+
+    (class, term, subject, medium, discipline, unit, lesson_choice)
+        -> (filename, start_pdf_page, end_pdf_page)
+
+Bad or overlapping page ranges are reported while compiling, not per request.
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+LESSON_CATEGORIES = ["prose", "poem", "supplementary", "play"]
+
+
+class LessonEntry(NamedTuple):
+    filename: str
+    start_pdf_page: int
+    end_pdf_page: int
+
+
+LessonKey = Tuple[int, str, str, str, Optional[str], int, Optional[int]]
+
+
+class LessonTable:
+    """Compiled lessons for one index file (one class/subject/medium)"""
+
+    def __init__(self, class_num: int, subject: str, medium: str):
+        self.class_num = class_num
+        self.subject = subject
+        self.medium = medium
+        self.terms = set()
+        self.discipline_terms = set()  # Terms whose units are split by discipline
+        self.entries: Dict[LessonKey, LessonEntry] = {}
+        self.problems: List[str] = []
+
+    def key(self, term_key: str, discipline: Optional[str], unit: int, lesson_choice: Optional[int]) -> LessonKey:
+        return (self.class_num, term_key, self.subject, self.medium, discipline, unit, lesson_choice)
+
+    def lookup(
+        self,
+        term_key: str,
+        unit: int,
+        lesson_choice: Optional[int] = None,
+        discipline: Optional[str] = None
+    ) -> Optional[LessonEntry]:
+        """O(1) lookup; direct units (Social Science style) ignore lesson_choice"""
+        # Discipline only matters for Social Science style terms
+        disc_key = discipline.lower() if discipline and term_key in self.discipline_terms else None
+        entry = self.entries.get(self.key(term_key, disc_key, unit, lesson_choice or 1))
+        if entry is None:
+            entry = self.entries.get(self.key(term_key, disc_key, unit, None))
+            if entry and discipline:
+                # Direct units are named after the caller's discipline, in its casing
+                # (Class10-History-1-...; Class9-Physics-1-... even without disciplines)
+                prefix = f"Class{self.class_num}-{disc_key or 'Unit'}-"
+                if entry.filename.startswith(prefix):
+                    entry = entry._replace(filename=f"Class{self.class_num}-{discipline}-{entry.filename[len(prefix):]}")
+        return entry
+
+
+def _start_pages(units: list) -> List[int]:
+    """Every lesson start page in a list of units (book page numbers); malformed entries are skipped"""
+    pages = []
+    for u in units:
+        if not isinstance(u, dict):
+            continue
+        starts = [u] if "page" in u else [u[cat] for cat in LESSON_CATEGORIES if cat in u]
+        pages.extend(s["page"] for s in starts if isinstance(s, dict) and isinstance(s.get("page"), int))
+    return pages
+
+
+def _page(value) -> int:
+    if not isinstance(value, int):
+        raise TypeError(f"page {value!r} is not a number")
+    return value
+
+
+def _unit_lessons(table: LessonTable, discipline: Optional[str], position: int, unit_obj: dict) -> list:
+    """(lesson_choice, page, filename) of every lesson in a unit; raises on a malformed entry"""
+    # Case A: direct unit ({ "page": 109, "title": "..." }) - one file per unit
+    if "page" in unit_obj:
+        clean_title = unit_obj["title"].replace(" ", "")
+        return [(None, _page(unit_obj["page"]), f"Class{table.class_num}-{discipline or 'Unit'}-{position}-{clean_title}")]
+
+    # Case B: English ({ "prose": { "page": 88 }, ... })
+    lessons = []
+    for cat in LESSON_CATEGORIES:
+        if cat in unit_obj:
+            lesson = unit_obj[cat]
+            clean_title = lesson["title"].replace(" ", "")
+            name = f"Class{table.class_num}-Unit{position}-{cat.capitalize()}-{clean_title}"
+            lessons.append((len(lessons) + 1, _page(lesson["page"]), name))
+    return lessons
+
+
+def _compile_term(table: LessonTable, term_key: str, term_data: dict):
+    where = f"class {table.class_num} {table.subject} {term_key}"
+    meta = term_data.get("meta", {"prelim_pages": 0, "total_pdf_pages": 999})
+    try:
+        offset = int(meta["prelim_pages"])
+        total_pages = int(meta["total_pdf_pages"])
+    except (KeyError, TypeError, ValueError) as e:
+        table.problems.append(f"{where}: malformed meta ({e!r}, term skipped)")
+        return
+
+    # Social Science splits units by discipline; others have one list
+    if "disciplines" in term_data:
+        table.discipline_terms.add(term_key)
+        groups = {disc.lower(): units for disc, units in term_data["disciplines"].items()}
+    else:
+        groups = {None: term_data.get("units", [])}
+
+    # Boundaries come from ALL lessons in the book (History ends where Geography begins)
+    all_units = [u for units in groups.values() if isinstance(units, list) for u in units]
+    boundaries = sorted(set(_start_pages(all_units)))
+
+    compiled = []  # (start, end, label) of every lesson kept
+
+    for discipline, units in groups.items():
+        if not isinstance(units, list):
+            table.problems.append(f"{where} {discipline or 'units'}: not a list (skipped)")
+            continue
+        for position, unit_obj in enumerate(units, start=1):
+            try:
+                lessons = _unit_lessons(table, discipline, position, unit_obj)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                table.problems.append(f"{where} {discipline or 'unit'} {position}: malformed lesson entry ({e!r}, skipped)")
+                continue
+
+            for lesson_choice, page, filename in lessons:
+                label = f"{where} {discipline or 'unit'} {position}" + (f" lesson {lesson_choice}" if lesson_choice else "")
+
+                # Stop 1 page before the next lesson starts, or run to the end of the PDF
+                next_index = bisect_right(boundaries, page)
+                if next_index < len(boundaries):
+                    end_pdf_page = boundaries[next_index] + offset - 1
+                else:
+                    end_pdf_page = total_pages
+                start_pdf_page = page + offset
+
+                # Impossible ranges are dropped; running past meta.total_pdf_pages is only
+                # reported (the real PDF length is checked when slicing)
+                if start_pdf_page < 1 or end_pdf_page < start_pdf_page:
+                    table.problems.append(f"{label}: bad page range {start_pdf_page}-{end_pdf_page} (skipped)")
+                    continue
+                if end_pdf_page > total_pages:
+                    table.problems.append(f"{label}: page range {start_pdf_page}-{end_pdf_page} exceeds total_pdf_pages {total_pages}")
+
+                table.entries[table.key(term_key, discipline, position, lesson_choice)] = LessonEntry(
+                    filename, start_pdf_page, end_pdf_page
+                )
+                compiled.append((start_pdf_page, end_pdf_page, label))
+
+    # Lessons sharing pages (e.g. two starting on the same page) would be sliced twice
+    compiled.sort()
+    for (_, end, previous), (start, _, label) in zip(compiled, compiled[1:]):
+        if start <= end:
+            table.problems.append(f"{label}: starts on PDF page {start}, inside {previous} (overlapping ranges)")
+
+
+def compile_index(index_data: dict, class_num: int, subject: str, medium: str) -> LessonTable:
+    """Compile every term of an index file; problems are collected on the table"""
+    table = LessonTable(class_num, subject, medium)
+    for term_key, term_data in index_data.items():
+        if not isinstance(term_data, dict):
+            continue
+        table.terms.add(term_key)
+        try:
+            _compile_term(table, term_key, term_data)
+        except Exception as e:
+            table.problems.append(f"class {class_num} {subject} {term_key}: could not compile ({e!r})")
+
+    for problem in table.problems:
+        print(f"⚠️ Index: {problem}")
+    return table
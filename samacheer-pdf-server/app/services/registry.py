@@ -0,0 +1,234 @@
+"""
+Data Registry
+Keeps data/catalogs, data/indexes and data/curriculum in memory and
+hot-reloads them with watchfiles. Requests never touch JSON on disk.
+
+Readers always see one consistent snapshot: a reload builds a new snapshot
+and swaps it in with a single assignment. A file that fails to parse or
+compile keeps its last good version; its errors, and the problems found in
+every index, are listed under "problems" in stats().
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from watchfiles import watch
+from ..config import settings
+from .lesson_index import LessonTable, compile_index
+
+
+class DataSnapshot:
+    """Immutable-by-convention view of every data file (keyed by absolute path)"""
+
+    def __init__(self):
+        self.files: Dict[Path, dict] = {}
+        self.lesson_tables: Dict[Path, LessonTable] = {}
+        self.errors: Dict[Path, str] = {}  # Files whose current version could not be loaded
+        self.loaded_at = datetime.now()
+
+    def copy(self) -> "DataSnapshot":
+        snapshot = DataSnapshot()
+        snapshot.files = dict(self.files)
+        snapshot.lesson_tables = dict(self.lesson_tables)
+        snapshot.errors = dict(self.errors)
+        return snapshot
+
+
+class DataRegistry:
+    def __init__(self):
+        self.roots = [settings.CATALOGS_DIR, settings.INDEXES_DIR, settings.CURRICULUM_DIR]
+        # Legacy single-file curriculum still used by older deployments
+        self.legacy_curriculum_path = settings.DATA_DIR / "curriculum.json"
+
+        self._snapshot: Optional[DataSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Path]], None]] = []
+        self._stop_event = threading.Event()
+        self._watch_pid = None
+        self._watch_thread: Optional[threading.Thread] = None
+
+    # --- Loading ---
+
+    def _tracked_files(self) -> List[Path]:
+        files = [p for root in self.roots for p in root.rglob("*.json")]
+        if self.legacy_curriculum_path.exists():
+            files.append(self.legacy_curriculum_path)
+        return files
+
+    def _parse(self, snapshot: DataSnapshot, path: Path):
+        """(Re)parse one file into snapshot; a broken edit keeps the previous version"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            table = None
+            if path.is_relative_to(settings.INDEXES_DIR):
+                params = self._index_params(path)
+                if params:
+                    table = compile_index(data, *params)
+        except Exception as e:
+            snapshot.errors[path] = f"{type(e).__name__}: {e}"
+            print(f"❌ Registry: could not load {path.relative_to(settings.DATA_DIR)}: {e}")
+            return
+
+        snapshot.files[path] = data
+        snapshot.errors.pop(path, None)
+        if table is not None:
+            snapshot.lesson_tables[path] = table
+
+    def _index_params(self, path: Path) -> Optional[tuple]:
+        """(class_num, subject, medium) from an index path"""
+        match = re.match(r"class-(\d+)\.json$", path.name)
+        if not match:
+            return None
+        parts = path.relative_to(settings.INDEXES_DIR).parts
+        if parts[0] == "languages":
+            # Language books have no medium (see settings.get_index_path)
+            return int(match.group(1)), parts[1], "english"
+        return int(match.group(1)), parts[2], parts[1].replace("-medium", "")
+
+    def load(self) -> DataSnapshot:
+        """Full load of every data file"""
+        snapshot = DataSnapshot()
+        for path in self._tracked_files():
+            self._parse(snapshot, path)
+        self._snapshot = snapshot
+        print(f"📚 Registry loaded {len(snapshot.files)} data files")
+        return snapshot
+
+    def _apply_changes(self, changed: List[Path]):
+        """Re-parse only the changed files into a new snapshot, then swap it in"""
+        with self._load_lock:
+            snapshot = (self._snapshot or self.load()).copy()
+            for path in changed:
+                if path.exists():
+                    self._parse(snapshot, path)
+                else:
+                    snapshot.files.pop(path, None)
+                    snapshot.lesson_tables.pop(path, None)
+                    snapshot.errors.pop(path, None)
+            self._snapshot = snapshot  # Atomic swap
+
+        names = ", ".join(str(p.relative_to(settings.DATA_DIR)) for p in changed)
+        print(f"🔄 Registry reloaded: {names}")
+        for listener in self._listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                print(f"⚠️ Registry listener failed: {e}")
+
+    def _get(self) -> DataSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                snapshot = self._snapshot or self.load()
+        self._ensure_watching()
+        return snapshot
+
+    # --- Watching ---
+
+    def _ensure_watching(self):
+        """
+        Start the watcher once per process. Worker processes forked from the
+        server lose its threads, so this is also checked on every access.
+        """
+        if not settings.REGISTRY_WATCH or self._watch_pid == os.getpid():
+            return
+        with self._load_lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+            self._stop_event = threading.Event()
+            self._watch_thread = threading.Thread(target=self._watch_loop, name="registry-watch", daemon=True)
+            self._watch_thread.start()
+            # Scripts exit without calling stop(); a killed watcher aborts the interpreter
+            atexit.register(self.stop)
+
+    def _watch_loop(self):
+        try:
+            for changes in watch(settings.DATA_DIR, stop_event=self._stop_event, recursive=True, rust_timeout=1000):
+                changed = sorted({
+                    Path(path) for _, path in changes
+                    if path.endswith(".json") and self._is_tracked(Path(path))
+                })
+                if changed:
+                    try:
+                        self._apply_changes(changed)
+                    except Exception as e:
+                        # Keep watching: the next edit may fix it
+                        print(f"❌ Registry reload failed: {e}")
+        except Exception as e:
+            print(f"❌ Registry watcher stopped: {e}")
+
+    def _is_tracked(self, path: Path) -> bool:
+        return path == self.legacy_curriculum_path or any(path.is_relative_to(root) for root in self.roots)
+
+    def start(self):
+        """Load everything and start watching (called at server startup)"""
+        self._get()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._watch_thread and self._watch_thread.is_alive():
+            self._watch_thread.join(timeout=5)
+        self._watch_pid = None
+
+    def on_change(self, listener: Callable[[List[Path]], None]):
+        """Register a callback receiving the list of changed files"""
+        self._listeners.append(listener)
+
+    # --- Lookups ---
+
+    def catalog(self, subject: str, medium: str = "english") -> dict:
+        return self._get().files.get(settings.get_catalog_path(subject, medium), {})
+
+    def index(self, subject: str, class_num: int, medium: str = "english") -> dict:
+        return self._get().files.get(settings.get_index_path(subject, class_num, medium), {})
+
+    def lesson_table(self, subject: str, class_num: int, medium: str = "english") -> Optional[LessonTable]:
+        return self._get().lesson_tables.get(settings.get_index_path(subject, class_num, medium))
+
+    def curriculum(self, subject: str = "english", medium: str = "english") -> dict:
+        snapshot = self._get()
+        data = snapshot.files.get(settings.get_curriculum_path(subject, medium))
+        if data:
+            return data
+        return snapshot.files.get(self.legacy_curriculum_path, {})
+
+    def catalogs(self) -> Dict[Path, dict]:
+        """Every loaded catalog, keyed by path"""
+        return {
+            path: data for path, data in self._get().files.items()
+            if path.is_relative_to(settings.CATALOGS_DIR)
+        }
+
+    def problems(self) -> Dict[str, List[str]]:
+        """Load errors and index problems, keyed by data file"""
+        snapshot = self._get()
+        report = {}
+        for path, table in snapshot.lesson_tables.items():
+            if table.problems:
+                report[str(path.relative_to(settings.DATA_DIR))] = list(table.problems)
+        for path, error in snapshot.errors.items():
+            name = str(path.relative_to(settings.DATA_DIR))
+            kept = " (previous version kept)" if path in snapshot.files else ""
+            report.setdefault(name, []).insert(0, f"not loaded{kept}: {error}")
+        return report
+
+    def stats(self) -> dict:
+        snapshot = self._get()
+        return {
+            "files": len(snapshot.files),
+            "lesson_tables": len(snapshot.lesson_tables),
+            "loaded_at": snapshot.loaded_at.isoformat(),
+            "watching": self._watch_pid == os.getpid(),
+            "problems": self.problems(),
+        }
+
+
+# Create singleton instance
+registry = DataRegistry()
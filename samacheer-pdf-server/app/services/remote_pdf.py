@@ -0,0 +1,386 @@
+"""
+Remote PDF
+Read a PDF that is not downloaded yet through HTTP Range requests.
+
+PyPDF2 parses lazily: it reads the trailer and xref first, then only the
+objects it touches. Backed by RangeFile, cutting a 12-page lesson moves
+the trailer, xref and those pages' objects instead of the whole book.
+Pages are looked up through the page tree (find_page) rather than
+reader.pages, which would load every page object of the book first.
+Fetched blocks live in a shared LRU block cache.
+
+Everything is tied to the file version the reader was opened on (its
+validator: strong ETag, else Last-Modified). Blocks are cached per
+validator and every Range request carries If-Range, so a replaced Drive
+file is never mixed with old blocks: the origin answers 200/412, the
+reader and its blocks are dropped and the caller falls back to a full
+download. Readers are also re-probed every REMOTE_REVALIDATE_SECONDS.
+"""
+
+import io
+import os
+import re
+import threading
+import time
+import httpx
+import PyPDF2
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from PyPDF2.generic import NameObject
+from ..config import settings
+from .downloader import downloader
+from .splitter import split_pages
+
+KB = 1024
+INHERITABLE = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+class RemoteChanged(IOError):
+    """The remote file is no longer the version the reader was opened on"""
+
+
+def page_count(reader: PyPDF2.PdfReader) -> int:
+    """From the root /Count (len(reader.pages) would load every page object)"""
+    return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+
+
+def find_page(reader: PyPDF2.PdfReader, index: int) -> PyPDF2.PageObject:
+    """
+    Page `index` (0-based), loading only the page-tree nodes on its path.
+    Uses /Count to skip whole subtrees; a node whose /Count equals its number
+    of kids has one page per kid, so the kid is picked without loading siblings.
+    """
+    node = reader.trailer["/Root"]["/Pages"].get_object()
+    reference = None
+    inherited = {}
+    while reference is None:
+        for attr in INHERITABLE:
+            if attr in node:
+                inherited[attr] = node[attr]
+        kids = node["/Kids"]
+
+        if int(node.get("/Count", -1)) == len(kids):
+            kid_ref = kids[index]
+            kid = kid_ref.get_object()
+            if kid.get("/Type") == "/Pages":
+                node, index = kid, 0
+            else:
+                reference = kid_ref
+            continue
+
+        for kid_ref in kids:
+            kid = kid_ref.get_object()
+            if kid.get("/Type") == "/Pages":
+                count = int(kid["/Count"])
+                if index < count:
+                    node = kid
+                    break
+                index -= count
+            elif index == 0:
+                reference = kid_ref
+                break
+            else:
+                index -= 1
+        else:
+            raise IndexError("Page index out of range")
+
+    # Same inheritance rules as PdfReader._flatten
+    page_dict = reference.get_object()
+    page = PyPDF2.PageObject(reader, reference)
+    page.update(page_dict)
+    for attr, value in inherited.items():
+        if attr not in page:
+            page[NameObject(attr)] = value
+    return page
+
+
+class BlockCache:
+    """LRU of fixed-size blocks keyed by (url, validator, block index), bounded by bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._blocks: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, int]) -> Optional[bytes]:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._blocks.move_to_end(key)
+            return block
+
+    def put(self, key: Tuple[str, str, int], block: bytes):
+        with self._lock:
+            if key in self._blocks:
+                return
+            self._blocks[key] = block
+            self._bytes += len(block)
+            while self._bytes > self.max_bytes and len(self._blocks) > 1:
+                _, evicted = self._blocks.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def drop(self, url: str):
+        """Forget every block of a URL (all versions)"""
+        with self._lock:
+            for key in [key for key in self._blocks if key[0] == url]:
+                self._bytes -= len(self._blocks.pop(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class RangeFile(io.RawIOBase):
+    """Seekable read-only file over HTTP Range requests, pinned to one version of the file"""
+
+    def __init__(self, client: httpx.Client, url: str, size: int, validator: str, cache: BlockCache, block_size: int):
+        self.client = client
+        self.url = url
+        self.size = size
+        self.validator = validator
+        self.cache = cache
+        self.block_size = block_size
+        self.position = 0
+        self.bytes_fetched = 0
+        self.requests = 0
+        self.changed = False
+        self.validated = time.monotonic()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def _fetch(self, first: int, last: int) -> Dict[int, bytes]:
+        """One Range request for blocks first..last (inclusive), also stored in the cache"""
+        start = first * self.block_size
+        end = min(self.size, (last + 1) * self.block_size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if self.validator:
+            # Changed file: the origin ignores the range (200) instead of mixing versions
+            headers["If-Range"] = self.validator
+        response = self.client.get(self.url, headers=headers)
+        total = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("content-range", ""))
+        if response.status_code in (200, 412) or (total and int(total.group(1)) != self.size):
+            self.changed = True
+            raise RemoteChanged(f"Remote file changed: {self.url}")
+        if response.status_code != 206:
+            raise IOError(f"Range request failed: HTTP {response.status_code}")
+        data = response.content
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        blocks = {}
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            blocks[index] = data[offset:offset + self.block_size]
+            self.cache.put((self.url, self.validator, index), blocks[index])
+        return blocks
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.size, self.position + size)
+        if end <= self.position:
+            return b""
+
+        first = self.position // self.block_size
+        last = (end - 1) // self.block_size
+        blocks: Dict[int, bytes] = {}
+        index = first
+        while index <= last:
+            block = self.cache.get((self.url, self.validator, index))
+            if block is not None:
+                blocks[index] = block
+                index += 1
+                continue
+            # Coalesce a run of missing blocks into one request
+            run_end = index
+            while run_end < last and self.cache.get((self.url, self.validator, run_end + 1)) is None:
+                run_end += 1
+            blocks.update(self._fetch(index, run_end))
+            index = run_end + 1
+
+        data = b"".join(blocks[i] for i in range(first, last + 1))
+        skip = self.position - first * self.block_size
+        result = data[skip:skip + (end - self.position)]
+        self.position = end
+        return result
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class RemotePdfPool:
+    """Parsed remote readers per Drive file, sharing one HTTP client and block cache"""
+
+    def __init__(self):
+        self.block_size = settings.REMOTE_BLOCK_KB * KB
+        self._reset()
+
+    def _reset(self):
+        """Fresh client, readers and cache (at start and in a forked worker process)"""
+        self._pid = os.getpid()
+        self.cache = BlockCache(settings.REMOTE_BLOCK_CACHE_MB * KB * KB)
+        self._client: Optional[httpx.Client] = None
+        self._readers: "OrderedDict[str, Tuple[PyPDF2.PdfReader, RangeFile, threading.Lock]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        # Created lazily, per process: a pooled client's sockets must not be shared across a fork
+        if self._client is None:
+            self._client = httpx.Client(
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT, connect=10),
+            )
+        return self._client
+
+    def identity(self, file_id: str) -> Optional[str]:
+        """Stable id for artifact keys (size + validator), or None if the origin can't do ranges"""
+        opened = self._open(file_id)
+        if not opened:
+            return None
+        return self._identity(file_id, opened[1])
+
+    @staticmethod
+    def _identity(file_id: str, remote: RangeFile) -> str:
+        return f"remote:{file_id}:{remote.size}:{remote.validator}"
+
+    def _probe(self, url: str) -> Optional[Tuple[int, str]]:
+        """(size, validator) from a one-byte Range request; None without Range support"""
+        response = self._get_client().get(url, headers={"Range": "bytes=0-0"})
+        match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("content-range", ""))
+        if response.status_code != 206 or not match:
+            return None
+        return int(match.group(1)), downloader.validator(response)
+
+    def invalidate(self, file_id: str):
+        """Drop the reader and cached blocks of a file (it changed at the origin)"""
+        with self._lock:
+            self._readers.pop(file_id, None)
+        self.cache.drop(downloader.url_for(file_id))
+
+    def _current(self, file_id: str):
+        """The cached reader if it is still the origin's version (re-probed every REMOTE_REVALIDATE_SECONDS)"""
+        with self._lock:
+            opened = self._readers.get(file_id)
+            if opened:
+                self._readers.move_to_end(file_id)
+        if not opened:
+            return None
+        remote = opened[1]
+        if not remote.changed and time.monotonic() - remote.validated < settings.REMOTE_REVALIDATE_SECONDS:
+            return opened
+        try:
+            probed = None if remote.changed else self._probe(remote.url)
+        except httpx.HTTPError:
+            probed = None
+        if probed == (remote.size, remote.validator):
+            remote.validated = time.monotonic()
+            return opened
+        print(f"🔄 Remote PDF: {file_id} changed at the origin, reopening")
+        self.invalidate(file_id)
+        return None
+
+    def _open(self, file_id: str):
+        if self._pid != os.getpid():
+            self._reset()
+        opened = self._current(file_id)
+        if opened:
+            return opened
+
+        url = downloader.url_for(file_id)
+        try:
+            probed = self._probe(url)
+            if not probed:
+                print(f"⚠️ Remote PDF: origin has no Range support for {file_id}")
+                return None
+            size, validator = probed
+            remote = RangeFile(self._get_client(), url, size, validator, self.cache, self.block_size)
+            reader = PyPDF2.PdfReader(remote)
+        except Exception as e:
+            print(f"⚠️ Remote PDF: could not open {file_id}: {e}")
+            return None
+
+        with self._lock:
+            self._readers[file_id] = (reader, remote, threading.Lock())
+            while len(self._readers) > settings.DOCUMENT_POOL_MAX_DOCUMENTS:
+                self._readers.popitem(last=False)
+            return self._readers[file_id]
+
+    def slice(self, file_id: str, start_page: int, end_page: int, output_pdf: Path, identity: Optional[str] = None) -> bool:
+        """
+        Write pages start..end of the remote book to output_pdf (temp file + rename).
+        identity: the version the caller keyed the output by; False if the file is no longer it.
+        """
+        opened = self._open(file_id)
+        if not opened:
+            return False
+        reader, remote, lock = opened
+        if identity and identity != self._identity(file_id, remote):
+            return False
+
+        with lock:  # PyPDF2 readers are not thread-safe
+            before = remote.bytes_fetched
+            try:
+                ok = split_pages(
+                    reader,
+                    [(start_page, end_page, output_pdf)],
+                    get_page=lambda i: find_page(reader, i),
+                    total=page_count(reader)
+                )[output_pdf]
+            except Exception as e:
+                print(f"⚠️ Remote PDF: slicing failed for {file_id}: {e}")
+                ok = False
+            moved = remote.bytes_fetched - before
+
+        if remote.changed:
+            # The origin has a new version: the caller falls back to a full download
+            print(f"🔄 Remote PDF: {file_id} changed while slicing")
+            self.invalidate(file_id)
+            output_pdf.unlink(missing_ok=True)
+            return False
+
+        print(f"🌐 Remote slice {start_page}-{end_page}: fetched {round(moved / KB)} KB of {round(remote.size / KB / KB, 1)} MB")
+        return ok
+
+    def stats(self) -> dict:
+        with self._lock:
+            readers = list(self._readers.values())
+        return {
+            "open_books": len(readers),
+            "bytes_fetched": sum(remote.bytes_fetched for _, remote, _ in readers),
+            "requests": sum(remote.requests for _, remote, _ in readers),
+            "block_cache": self.cache.stats(),
+        }
+
+
+# Create singleton instance
+remote_pdfs = RemotePdfPool()
@@ -0,0 +1,145 @@
+"""
+Book Splitter
+Writes many page ranges of one book in a single read of the source PDF,
+and can materialize every lesson of a freshly downloaded book into the
+artifact cache so lesson PDF requests become plain file serves.
+"""
+
+import os
+import re
+import threading
+import PyPDF2
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from ..utils import unique_temp_path
+from .artifact_cache import artifact_cache
+from .book_cache import book_cache
+from .registry import registry
+
+# (start_page, end_page, output_path) - pages are 1-based, inclusive
+SplitJob = Tuple[int, int, Path]
+
+BOOK_KEY_PATTERN = re.compile(r"class-(\d+)-term(\d+)-([a-z]+?)(?:-(english|tamil)-medium)?\.pdf$")
+
+
+def split_pages(
+    reader: PyPDF2.PdfReader,
+    jobs: List[SplitJob],
+    get_page: Optional[Callable[[int], PyPDF2.PageObject]] = None,
+    total: Optional[int] = None
+) -> Dict[Path, bool]:
+    """
+    Write every job from one already-parsed reader.
+    Each output is written to a temp file and renamed, so readers never see partial PDFs.
+    get_page/total replace reader.pages (which parses every page object) for lazy readers.
+    """
+    results = {}
+    get_page = get_page or (lambda i: reader.pages[i])
+    total = len(reader.pages) if total is None else total
+    for start_page, end_page, output_path in jobs:
+        if start_page < 1 or end_page > total or end_page < start_page:
+            results[output_path] = False
+            continue
+
+        tmp_path = unique_temp_path(output_path)
+        try:
+            writer = PyPDF2.PdfWriter()
+            for i in range(start_page - 1, end_page):
+                writer.add_page(get_page(i))
+            with open(tmp_path, 'wb') as outfile:
+                writer.write(outfile)
+            os.replace(tmp_path, output_path)
+            results[output_path] = True
+        except Exception as e:
+            print(f"❌ Split error ({output_path.name}): {e}")
+            results[output_path] = False
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return results
+
+
+def split_book(source_pdf: Path, jobs: List[SplitJob]) -> Dict[Path, bool]:
+    """Open the source once (outside the document pool) and write every job"""
+    with open(source_pdf, 'rb') as f:
+        return split_pages(PyPDF2.PdfReader(f), jobs)
+
+
+def parse_book_key(book_key: str) -> Optional[Tuple[int, int, str, str]]:
+    """class-10-term0-maths-english-medium.pdf -> (10, 0, "maths", "english")"""
+    match = BOOK_KEY_PATTERN.match(book_key)
+    if not match:
+        return None
+    class_num, term, subject, medium = match.groups()
+    return int(class_num), int(term), subject, medium or "english"
+
+
+class BookSplitter:
+    """Background materialization of every lesson PDF of a book"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="splitter")
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    def lesson_jobs(self, book_path: Path) -> List[SplitJob]:
+        """Artifact-cache split jobs for every indexed lesson of a book not yet materialized"""
+        parsed = parse_book_key(book_path.name)
+        if not parsed:
+            return []
+        class_num, term, subject, medium = parsed
+
+        table = registry.lesson_table(subject, class_num, medium)
+        if not table:
+            return []
+
+        term_key = f"term{term}" if class_num in [6, 7] else "term0"
+        ranges = sorted({
+            (entry.start_pdf_page, entry.end_pdf_page)
+            for key, entry in table.entries.items() if key[1] == term_key
+        })
+
+        book_hash = book_cache.content_hash(book_path)
+        jobs = []
+        for start_page, end_page in ranges:
+            pdf_key = artifact_cache.key(book_hash, start_page, end_page, "pdf")
+            if not artifact_cache.get(pdf_key, "pdf"):
+                jobs.append((start_page, end_page, artifact_cache.path(pdf_key, "pdf")))
+        return jobs
+
+    def materialize(self, book_path: Path) -> int:
+        """Write every missing lesson PDF of a book in one pass; returns how many were written"""
+        jobs = self.lesson_jobs(book_path)
+        if not jobs:
+            return 0
+
+        print(f"✂️ Materializing {len(jobs)} lessons: {book_path.name}")
+        results = split_book(book_path, jobs)
+        written = sum(results.values())
+        print(f"✅ Materialized {written}/{len(jobs)} lessons: {book_path.name}")
+        return written
+
+    def materialize_in_background(self, book_path: Path):
+        """Queue a materialization without blocking the caller (one at a time)"""
+        with self._lock:
+            if book_path in self._queued:
+                return
+            self._queued.add(book_path)
+
+        def run():
+            try:
+                self.materialize(book_path)
+            except Exception as e:
+                print(f"❌ Materialize error ({book_path.name}): {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(book_path)
+
+        self._executor.submit(run)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Create singleton instance
+splitter = BookSplitter()
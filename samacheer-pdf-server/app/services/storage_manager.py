@@ -0,0 +1,508 @@
+"""
+Storage Manager
+Keeps storage/cache, storage/temp and storage/artifacts inside byte budgets.
+
+Eviction is frequency-aware: every access adds 1 to a file's score and the
+score halves every STORAGE_SCORE_HALF_LIFE_HOURS, so a book used daily beats
+one fetched once yesterday (LRU/LFU hybrid). Pinned books, files being
+served and files touched in the last STORAGE_MIN_AGE_SECONDS are never evicted.
+
+Leases, scores and pins are shared by every uvicorn worker: a lease is a
+file in storage/cache/.locks/leases (created, checked and deleted under one
+file lock, so a reaper never deletes a file another worker just leased),
+scores live next to them in .scores.json and pins in storage/pinned_books.json.
+
+Published temp files are hardlinks to artifacts: each inode is counted once,
+against the artifacts budget.
+
+Interrupted downloads (hidden .<book>.part files and their .part.json state)
+count against the cache budget and are deleted once nobody has resumed them
+for STORAGE_PARTIAL_RETENTION_HOURS.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from filelock import FileLock, Timeout
+from ..config import settings
+from ..utils import atomic_write_text
+from .artifact_cache import artifact_cache
+from .book_cache import book_cache
+from .document_pool import document_pool
+from .downloader import downloader
+from .text_store import text_store
+
+MB = 1024 * 1024
+PINS_PATH = settings.BASE_DIR / "storage" / "pinned_books.json"
+
+
+class FileScore:
+    """Decaying access count for one file"""
+
+    def __init__(self, last_access: float, score: float = 0.0):
+        self.score = score
+        self.last_access = last_access
+
+    def decayed(self, now: float, half_life: float) -> float:
+        return self.score * 0.5 ** ((now - self.last_access) / half_life)
+
+    def touch(self, now: float, half_life: float):
+        self.score = self.decayed(now, half_life) + 1
+        self.last_access = now
+
+
+class StorageManager:
+    def __init__(self):
+        self.budgets = {
+            "cache": settings.STORAGE_CACHE_MAX_MB * MB,
+            "temp": settings.STORAGE_TEMP_MAX_MB * MB,
+            "artifacts": settings.STORAGE_ARTIFACTS_MAX_MB * MB,
+        }
+        self.half_life = settings.STORAGE_SCORE_HALF_LIFE_HOURS * 3600
+        self.lease_dir = book_cache.lock_dir / "leases"
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # This process's lease files per path, oldest first
+        self._leases: Dict[Path, List[Path]] = {}
+        self._lease_seq = 0
+        self._pins_cache: Tuple[Optional[Tuple[int, int]], frozenset] = (None, frozenset())
+        self.evictions = {area: 0 for area in self.budgets}
+        self.evicted_bytes = {area: 0 for area in self.budgets}
+        self.last_reap: Optional[float] = None
+
+        self._stop_event = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+        book_cache.on_download(self.touch)
+        book_cache.on_access(self.touch)
+        artifact_cache.on_access(self.touch)
+
+    # --- Access tracking ---
+
+    def touch(self, path: Path):
+        """Record one access (feeds the eviction score of every worker's reaper)"""
+        now = time.time()
+
+        def update(scores: Dict[str, List[float]]):
+            entry = scores.get(str(path))
+            score = FileScore(entry[1], entry[0]) if entry else FileScore(now)
+            score.touch(now, self.half_life)
+            scores[str(path)] = [score.score, score.last_access]
+        self._update_scores(update)
+
+    def _scores_path(self) -> Path:
+        return self.lease_dir / ".scores.json"
+
+    def _read_scores(self) -> Dict[str, List[float]]:
+        """path -> [score, last_access] (written atomically: no lock needed to read)"""
+        try:
+            with open(self._scores_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update_scores(self, update: Callable[[Dict[str, List[float]]], None]):
+        """Read-modify-write the shared scores under their own file lock"""
+        try:
+            with FileLock(str(self._scores_path()) + ".lock", timeout=10):
+                scores = self._read_scores()
+                update(scores)
+                atomic_write_text(self._scores_path(), json.dumps(scores))
+        except Exception as e:
+            print(f"⚠️ Storage: could not save access scores: {e}")
+
+    def _load_scores(self) -> Dict[Path, FileScore]:
+        return {Path(key): FileScore(last_access, score) for key, (score, last_access) in self._read_scores().items()}
+
+    def _prune_scores(self):
+        """Forget files that no longer exist (deleted outside _delete, or never downloaded)"""
+        def update(scores: Dict[str, List[float]]):
+            for key in [key for key in scores if not Path(key).exists()]:
+                del scores[key]
+        self._update_scores(update)
+
+    def _lease_files_lock(self) -> FileLock:
+        """Held while lease files are created, or checked and the file deleted (all workers)"""
+        return FileLock(str(self.lease_dir / ".lock"), timeout=10)
+
+    def _lease_prefix(self, path: Path) -> str:
+        return hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()
+
+    def acquire(self, path: Path):
+        """Mark a file as in use (being served or processed) until release(), for every worker"""
+        self.touch(path)
+        with self._lock:
+            self._lease_seq += 1
+            lease = self.lease_dir / f"{self._lease_prefix(path)}.{os.getpid()}-{self._lease_seq}"
+        try:
+            with self._lease_files_lock():
+                lease.touch()
+        except Exception as e:
+            print(f"⚠️ Storage: could not lease {path.name}: {e}")
+            return
+        with self._lock:
+            self._leases.setdefault(path, []).append(lease)
+
+    def release(self, path: Path):
+        with self._lock:
+            leases = self._leases.get(path)
+            if not leases:
+                return
+            lease = leases.pop(0)
+            if not leases:
+                del self._leases[path]
+        lease.unlink(missing_ok=True)
+
+    @contextmanager
+    def lease(self, path: Path) -> Iterator[Path]:
+        self.acquire(path)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def _in_use(self, path: Path, now: float) -> bool:
+        """
+        Leased by any worker (call under _lease_files_lock). Lease files older than
+        STORAGE_LEASE_TIMEOUT are leaked (crashed worker) and are removed here.
+        """
+        in_use = False
+        for lease in self.lease_dir.glob(f"{self._lease_prefix(path)}.*"):
+            try:
+                age = now - lease.stat().st_mtime
+            except OSError:
+                continue
+            if age < settings.STORAGE_LEASE_TIMEOUT:
+                in_use = True
+            else:
+                lease.unlink(missing_ok=True)
+        return in_use
+
+    # --- Pinning ---
+
+    @property
+    def pinned(self) -> frozenset:
+        """STORAGE_PINNED_BOOKS plus books pinned at runtime by any worker"""
+        try:
+            stat = PINS_PATH.stat()
+            version = (stat.st_mtime_ns, stat.st_ino)
+        except OSError:
+            version = None
+        cached_version, pins = self._pins_cache
+        if version != cached_version:
+            pins = frozenset(self._read_pins())
+            self._pins_cache = (version, pins)
+        return pins | frozenset(settings.STORAGE_PINNED_BOOKS)
+
+    def _read_pins(self) -> List[str]:
+        try:
+            with open(PINS_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _update_pins(self, book_key: str, pinned: bool):
+        with FileLock(str(PINS_PATH) + ".lock", timeout=10):
+            pins = set(self._read_pins())
+            if pinned:
+                pins.add(book_key)
+            else:
+                pins.discard(book_key)
+            atomic_write_text(PINS_PATH, json.dumps(sorted(pins)))
+
+    def pin(self, book_key: str):
+        self._update_pins(book_key, True)
+
+    def unpin(self, book_key: str):
+        """Runtime pins only (STORAGE_PINNED_BOOKS stays pinned)"""
+        self._update_pins(book_key, False)
+
+    # --- Scanning ---
+
+    def _book_units(self) -> List[Tuple[Path, List[Path]]]:
+        """Each cached book with its sidecars (text stores, .sha256)"""
+        units = []
+        for book in settings.CACHE_DIR.glob("*.pdf"):
+            sidecars = list(settings.CACHE_DIR.glob(f"{book.name}.*"))
+            units.append((book, sidecars))
+        return units
+
+    def _partial_units(self) -> List[Tuple[Path, List[Path]]]:
+        """Interrupted downloads: each .part with its state file (and state files left alone)"""
+        units = []
+        for part in settings.CACHE_DIR.glob(".*.part"):
+            state = downloader.state_path(part)
+            units.append((part, [state] if state.exists() else []))
+        for state in settings.CACHE_DIR.glob(".*.part.json"):
+            if not state.with_suffix("").exists():
+                units.append((state, []))
+        return units
+
+    def _temp_units(self) -> List[Tuple[Path, List[Path]]]:
+        return [(p, []) for p in settings.TEMP_DIR.iterdir() if p.is_file() and not p.name.startswith(".")]
+
+    def _artifact_units(self) -> List[Tuple[Path, List[Path]]]:
+        return [(p, []) for p in settings.ARTIFACTS_DIR.glob("*/*") if p.is_file() and not p.name.startswith(".")]
+
+    def _units(self, area: str) -> List[Tuple[Path, List[Path]]]:
+        return {"cache": self._book_units, "temp": self._temp_units, "artifacts": self._artifact_units}[area]()
+
+    @staticmethod
+    def _size(paths: List[Path], seen: Optional[Set[Tuple[int, int]]] = None) -> int:
+        """Bytes on disk: with `seen`, each inode (hardlinks) is counted only the first time"""
+        total = 0
+        for p in paths:
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            if seen is not None:
+                inode = (stat.st_dev, stat.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            total += stat.st_size
+        return total
+
+    def _counted_inodes(self, area: str) -> Set[Tuple[int, int]]:
+        """Inodes already counted elsewhere: temp publications share the artifacts' bytes"""
+        seen = set()
+        if area == "temp":
+            for path, _ in self._artifact_units():
+                self._size([path], seen)
+        return seen
+
+    @staticmethod
+    def _last_change(path: Path) -> float:
+        """
+        mtime, or ctime when later: published temp files are hardlinks to older
+        artifacts, and linking/renaming updates ctime only.
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return time.time()  # Vanished mid-scan: treat as fresh, never evict
+        return max(stat.st_mtime, stat.st_ctime)
+
+    # --- Eviction ---
+
+    def _evictable(
+        self, area: str, path: Path, now: float, pinned: frozenset, scores: Dict[Path, FileScore]
+    ) -> bool:
+        if area == "cache" and path.name in pinned:
+            return False
+        score = scores.get(path)
+        last_access = score.last_access if score else self._last_change(path)
+        return now - last_access >= settings.STORAGE_MIN_AGE_SECONDS
+
+    def _rank(self, path: Path, now: float, scores: Dict[Path, FileScore]) -> Tuple[float, float]:
+        """Eviction order: lowest decayed score first, then least recently used"""
+        score = scores.get(path)
+        if score is None:
+            return 0.0, self._last_change(path)
+        return score.decayed(now, self.half_life), score.last_access
+
+    def _delete(self, area: str, path: Path, sidecars: List[Path]) -> bool:
+        """Delete unless some worker leased it (checked and deleted under the lease lock)"""
+        try:
+            with self._lease_files_lock():
+                if self._in_use(path, time.time()):
+                    return False
+                if area == "cache":
+                    # Never race a download of the same book (another worker may hold its lock)
+                    with book_cache.file_lock(path.name, timeout=0):
+                        document_pool.invalidate(path.name)
+                        text_store.invalidate(path)
+                        path.unlink(missing_ok=True)
+                        for sidecar in sidecars:
+                            sidecar.unlink(missing_ok=True)
+                else:
+                    path.unlink(missing_ok=True)
+        except Timeout:
+            return False
+        self._update_scores(lambda scores: scores.pop(str(path), None))
+        return True
+
+    def expire_leases(self) -> int:
+        """Remove lease files leaked by crashed workers (older than STORAGE_LEASE_TIMEOUT)"""
+        now = time.time()
+        removed = 0
+        for lease in self.lease_dir.glob("*.*"):
+            if lease.name.startswith("."):
+                continue
+            try:
+                leaked = now - lease.stat().st_mtime >= settings.STORAGE_LEASE_TIMEOUT
+            except OSError:
+                continue
+            if leaked:
+                lease.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def enforce(self, area: str) -> dict:
+        """Evict from one area until it fits its budget"""
+        budget = self.budgets[area]
+        seen = self._counted_inodes(area)
+        units = [(p, sidecars, self._size([p] + sidecars, seen)) for p, sidecars in self._units(area)]
+        used = sum(size for _, _, size in units)
+        if area == "cache":
+            # Counted, never evicted here: expire_partial() removes abandoned ones
+            used += sum(self._size([p] + sidecars, seen) for p, sidecars in self._partial_units())
+        evicted, freed = 0, 0
+        if not budget or used <= budget:
+            return {"evicted": 0, "freed_bytes": 0}
+
+        now = time.time()
+        pinned = self.pinned
+        scores = self._load_scores()
+        # Links to bytes counted elsewhere (size 0) free nothing: leave them to expire_temp
+        candidates = [
+            (self._rank(p, now, scores), p, sidecars, size) for p, sidecars, size in units
+            if size and self._evictable(area, p, now, pinned, scores)
+        ]
+        candidates.sort(key=lambda c: c[0])
+
+        for _, path, sidecars, size in candidates:
+            if used <= budget:
+                break
+            if self._delete(area, path, sidecars):
+                used -= size
+                freed += size
+                evicted += 1
+                print(f"🧹 Evicted {area}: {path.name} ({round(size / MB, 1)} MB)")
+
+        with self._lock:
+            self.evictions[area] += evicted
+            self.evicted_bytes[area] += freed
+        if used > budget:
+            print(f"⚠️ Storage: {area} still over budget ({round(used / MB)} / {round(budget / MB)} MB, rest in use or pinned)")
+        return {"evicted": evicted, "freed_bytes": freed}
+
+    def expire_temp(self) -> int:
+        """
+        Delete published temp files older than TEMP_FILE_RETENTION_HOURS,
+        plus write-then-rename leftovers (.*.tmp) from crashed writers.
+        """
+        now = time.time()
+        retention = settings.TEMP_FILE_RETENTION_HOURS * 3600
+        removed = 0
+        for path in settings.TEMP_DIR.iterdir():
+            if not path.is_file():
+                continue
+            age = now - self._last_change(path)
+            stale_tmp = path.name.startswith(".") and path.name.endswith(".tmp") and age > 3600
+            expired = not path.name.startswith(".") and age > retention
+            if (stale_tmp or expired) and self._delete("temp", path, []):
+                removed += 1
+        if removed:
+            print(f"🧹 Expired {removed} temp files")
+        return removed
+
+    def expire_partial(self) -> int:
+        """Delete interrupted downloads untouched for STORAGE_PARTIAL_RETENTION_HOURS"""
+        now = time.time()
+        retention = settings.STORAGE_PARTIAL_RETENTION_HOURS * 3600
+        removed = 0
+        for part, sidecars in self._partial_units():
+            files = [part] + sidecars
+            try:
+                # mtime: downloads write in place, so it is when data last arrived
+                touched = max(p.stat().st_mtime for p in files)
+            except OSError:
+                continue  # Finished or discarded mid-scan
+            if now - touched <= retention:
+                continue
+            book_key = part.name[1:].rsplit(".part", 1)[0]
+            try:
+                # Never while a worker is downloading (and so resuming) the book
+                with book_cache.file_lock(book_key, timeout=0):
+                    for p in files:
+                        p.unlink(missing_ok=True)
+            except Timeout:
+                continue
+            removed += 1
+        if removed:
+            print(f"🧹 Expired {removed} interrupted downloads")
+        return removed
+
+    def reap(self) -> dict:
+        """One full pass: temp retention, then every budget"""
+        # One reaper at a time across uvicorn workers
+        try:
+            with FileLock(str(book_cache.lock_dir / "storage-reaper.lock"), timeout=0):
+                result = {
+                    "expired_temp": self.expire_temp(),
+                    "expired_partial": self.expire_partial(),
+                    "expired_leases": self.expire_leases(),
+                }
+                for area in self.budgets:
+                    result[area] = self.enforce(area)
+                self._prune_scores()
+        except Timeout:
+            return {"skipped": "another worker is reaping"}
+        self.last_reap = time.time()
+        return result
+
+    # --- Reaper thread ---
+
+    def _reap_loop(self):
+        while not self._stop_event.wait(settings.STORAGE_REAP_INTERVAL_SECONDS):
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"❌ Storage reaper error: {e}")
+
+    def start(self):
+        """Start the background reaper (called at server startup)"""
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, name="storage-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    # --- Stats ---
+
+    def stats(self) -> dict:
+        areas = {}
+        partial = self._partial_units()
+        for area, budget in self.budgets.items():
+            units = self._units(area)
+            seen = self._counted_inodes(area)
+            used = sum(self._size([p] + sidecars, seen) for p, sidecars in units + (partial if area == "cache" else []))
+            areas[area] = {
+                "files": len(units),
+                "used_mb": round(used / MB, 1),
+                "budget_mb": round(budget / MB) if budget else None,
+                "evictions": self.evictions[area],
+                "evicted_mb": round(self.evicted_bytes[area] / MB, 1),
+            }
+        areas["cache"]["partial_downloads"] = len(partial)
+        now = time.time()
+        leased = {
+            lease.name.split(".")[0] for lease in self.lease_dir.glob("*.*")
+            if not lease.name.startswith(".") and now - self._last_change(lease) < settings.STORAGE_LEASE_TIMEOUT
+        }
+        return {
+            "areas": areas,
+            "hit_rates": {
+                "cache": book_cache.stats(),
+                "artifacts": artifact_cache.stats(),
+                "document_pool": document_pool.stats()["hit_rate"],
+            },
+            "pinned": sorted(self.pinned),
+            "in_use": len(leased),
+            "last_reap": self.last_reap,
+        }
+
+
+# Create singleton instance
+storage_manager = StorageManager()
@@ -0,0 +1,99 @@
+"""
+Text Extraction Backends
+- pdfplumber: layout-faithful (slow, pure Python)
+- pypdfium2:  plain text straight from PDFium (fast, C)
+"""
+
+import threading
+import pypdfium2 as pdfium
+from pathlib import Path
+from typing import Dict, List, Optional
+from ..config import settings
+from .document_pool import document_pool
+
+
+class TextBackend:
+    """Interface every backend implements (pages are 1-based, inclusive)"""
+
+    name = ""
+    parallelizable = True  # Worth splitting across the extraction process pool
+
+    def page_count(self, pdf_path: Path) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_path: Path, start_page: int, end_page: int) -> List[str]:
+        """Raw text of each page in the range ("" for pages without text)"""
+        raise NotImplementedError
+
+
+class PdfPlumberBackend(TextBackend):
+    name = "pdfplumber"
+
+    def page_count(self, pdf_path: Path) -> int:
+        with document_pool.plumber(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def extract_pages(self, pdf_path: Path, start_page: int, end_page: int) -> List[str]:
+        texts = []
+        with document_pool.plumber(pdf_path) as pdf:
+            for page_num in range(start_page - 1, end_page):
+                page = pdf.pages[page_num]
+                texts.append(page.extract_text() or "")
+                page.close()  # Drop layout caches; the document itself stays pooled
+        return texts
+
+
+class PdfiumBackend(TextBackend):
+    name = "pypdfium2"
+    parallelizable = False  # Already fast; pool overhead would dominate
+
+    # PDFium is not thread-safe, not even across different documents
+    _lock = threading.Lock()
+
+    def page_count(self, pdf_path: Path) -> int:
+        with self._lock:
+            pdf = pdfium.PdfDocument(str(pdf_path))
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+    def extract_pages(self, pdf_path: Path, start_page: int, end_page: int) -> List[str]:
+        texts = []
+        with self._lock:
+            pdf = pdfium.PdfDocument(str(pdf_path))
+            try:
+                for page_num in range(start_page - 1, end_page):
+                    page = pdf[page_num]
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_bounded()
+                    textpage.close()
+                    page.close()
+                    # Match pdfplumber's line endings so outputs stay comparable
+                    texts.append(text.replace("\r\n", "\n").replace("\r", "\n").strip())
+            finally:
+                pdf.close()
+        return texts
+
+
+BACKENDS: Dict[str, TextBackend] = {
+    backend.name: backend for backend in (PdfPlumberBackend(), PdfiumBackend())
+}
+
+
+def get_backend(name: str) -> TextBackend:
+    """Look up a backend by name (unknown names fall back to the default)"""
+    backend = BACKENDS.get((name or "").lower().strip())
+    if backend is None:
+        backend = BACKENDS[settings.TEXT_BACKEND]
+    return backend
+
+
+def resolve_backend_name(subject: str, requested: Optional[str] = None) -> str:
+    """Request override > per-subject setting > global default"""
+    if requested in BACKENDS:
+        return requested
+    subject_backend = settings.SUBJECT_TEXT_BACKENDS.get(subject)
+    if subject_backend in BACKENDS:
+        return subject_backend
+    return settings.TEXT_BACKEND
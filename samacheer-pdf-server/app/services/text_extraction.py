@@ -0,0 +1,131 @@
+"""
+Text Extraction
+Page-level text extraction shared by the processor and the page-text store.
+Long ranges can be split across a process pool (pdfplumber is pure Python
+and CPU-bound, so threads would just queue on the GIL).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+from ..config import settings
+from .text_backends import get_backend
+
+# Separator written after every non-empty page (TXT output format)
+PAGE_SEPARATOR = "\n\n" + "=" * 50 + "\n\n"
+# Compact page boundary in normalized text (AI chunks still split on it)
+PAGE_BREAK = "\n\f\n"
+
+
+def format_page(text: str) -> str:
+    """One page as it appears in TXT output (empty pages vanish)"""
+    return (text + PAGE_SEPARATOR) if text else ""
+
+
+# === Worker process side ===
+
+def _init_worker():
+    """Preload the extraction libraries once per worker process"""
+    import pdfplumber  # noqa: F401
+    import pypdfium2  # noqa: F401
+
+
+def _extract_chunk(backend_name: str, pdf_path: str, start_page: int, end_page: int) -> List[str]:
+    """
+    Formatted pages [start_page, end_page] - runs inside a pool worker.
+    The worker's own document pool keeps the book open between chunks.
+    """
+    texts = get_backend(backend_name).extract_pages(Path(pdf_path), start_page, end_page)
+    return [format_page(text) for text in texts]
+
+
+# === Parent side ===
+
+class ParallelExtractor:
+    """Splits a page range across a persistent process pool and reassembles it in order"""
+
+    def __init__(self, workers: int):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a multi-threaded server process is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                print(f"⚡ Extraction pool started: {self.workers} processes")
+            return self._executor
+
+    def _chunks(self, start_page: int, end_page: int) -> List[Tuple[int, int]]:
+        """Contiguous chunks, a few per worker so a slow chunk doesn't stall the rest"""
+        total = end_page - start_page + 1
+        count = min(total, self.workers * 4)
+        size, extra = divmod(total, count)
+        chunks = []
+        first = start_page
+        for i in range(count):
+            last = first + size + (1 if i < extra else 0) - 1
+            chunks.append((first, last))
+            first = last + 1
+        return chunks
+
+    def extract(self, backend_name: str, pdf_path: Path, start_page: int, end_page: int) -> List[str]:
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_extract_chunk, backend_name, str(pdf_path), first, last)
+            for first, last in self._chunks(start_page, end_page)
+        ]
+        segments = []
+        for future in futures:  # Submission order == page order
+            segments.extend(future.result())
+        return segments
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+parallel_extractor = ParallelExtractor(settings.EXTRACTION_WORKERS)
+
+
+def extract_segments(
+    pdf_path: Path,
+    start_page: int,
+    end_page: int,
+    backend_name: str = "",
+    parallel: Optional[bool] = None
+) -> List[str]:
+    """
+    Formatted text for each page in [start_page, end_page] (1-based, inclusive).
+    end_page is clamped to the document length.
+
+    backend_name "" uses TEXT_BACKEND.
+    parallel=None decides from PARALLEL_LESSON_MIN_PAGES (0 disables it).
+    """
+    backend = get_backend(backend_name)
+    end_page = min(end_page, backend.page_count(pdf_path))
+    if start_page > end_page:
+        return []
+
+    if parallel is None:
+        min_pages = settings.PARALLEL_LESSON_MIN_PAGES
+        parallel = bool(min_pages) and (end_page - start_page + 1) >= min_pages
+
+    if parallel and backend.parallelizable:
+        try:
+            return parallel_extractor.extract(backend.name, pdf_path, start_page, end_page)
+        except Exception as e:
+            print(f"⚠️ Parallel extraction failed, falling back to single process: {e}")
+
+    texts = backend.extract_pages(pdf_path, start_page, end_page)
+    return [format_page(text) for text in texts]
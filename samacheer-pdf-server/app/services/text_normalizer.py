@@ -0,0 +1,120 @@
+"""
+Text Normalizer
+Deterministic clean-up of lesson text before it is sent to the AI:
+
+- Running headers/footers and page numbers: lines that repeat at the same
+  position from the top/bottom of many pages (digits masked, so "Page 12"
+  and "Page 13" match), found with one vectorized count over every page
+- The "=" * 50 page separators of the TXT format (pages are rejoined with
+  the one-character PAGE_BREAK, so AI chunks still break between pages)
+- Words hyphenated across line breaks, runs of spaces and blank lines
+
+Works on the page texts of any backend (text store hits included), so no
+layout data is needed. Fewer input tokens = faster, cheaper AI calls.
+"""
+
+import hashlib
+import re
+import threading
+from typing import List
+import numpy as np
+from ..config import settings
+from .ai_converter import CHARS_PER_TOKEN
+from .text_extraction import PAGE_BREAK, PAGE_SEPARATOR
+
+# Bump when the rules change (re-keys cached AI markdown)
+NORMALIZER_VERSION = 2
+EDGE_LINES = 3        # Headers/footers live in the first/last few lines of a page
+MIN_REPEAT_PAGES = 3  # Never treat a line seen on fewer pages as a header
+MAX_REMOVED_SHARE = 0.5  # A page that would lose more than this is templated content: keep it
+EMPTY = -1            # Line keys are never negative
+
+DIGITS = re.compile(r"\d+")
+SPACES = re.compile(r"[ \t\u00a0]+")
+HYPHEN_BREAK = re.compile(r"([a-z])-\n([a-z])")
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def line_key(line: str) -> int:
+    """Stable 56-bit key of a line with digits masked (same in every process, so it can be logged)"""
+    masked = DIGITS.sub("#", SPACES.sub(" ", line).strip().lower())
+    return int.from_bytes(hashlib.blake2b(masked.encode('utf-8'), digest_size=7).digest(), "big")
+
+
+def repeated_edge_lines(pages: List[List[str]], min_share: float) -> List[set]:
+    """Per page, the indexes of lines repeating at the same edge position on enough pages"""
+    count = len(pages)
+    width = 2 * EDGE_LINES
+    keys = np.full((count, width), EMPTY, dtype=np.int64)
+    # Line index behind every (page, position) cell; blank lines take no position
+    where = np.zeros((count, width), dtype=np.int64)
+    for p, lines in enumerate(pages):
+        content = [i for i, line in enumerate(lines) if line]
+        top, bottom = content[:EDGE_LINES], content[::-1][:EDGE_LINES]  # Bottom counted upwards
+        keys[p, :len(top)] = [line_key(lines[i]) for i in top]
+        keys[p, EDGE_LINES:EDGE_LINES + len(bottom)] = [line_key(lines[i]) for i in bottom]
+        where[p, :len(top)] = top
+        where[p, EDGE_LINES:EDGE_LINES + len(bottom)] = bottom
+
+    # How many pages share each (position, line) pair - one np.unique over every cell
+    positions = np.tile(np.arange(width), count)
+    pairs = np.stack([positions, keys.ravel()], axis=1)
+    _, inverse, counts = np.unique(pairs, axis=0, return_inverse=True, return_counts=True)
+    repeats = counts[inverse.reshape(-1)].reshape(count, width)
+
+    threshold = max(MIN_REPEAT_PAGES, int(np.ceil(min_share * count)))
+    hits = (keys != EMPTY) & (repeats >= threshold)
+    return [set(where[p][hits[p]].tolist()) for p in range(count)]
+
+
+class TextNormalizer:
+    def __init__(self):
+        self.version = NORMALIZER_VERSION
+        self._lock = threading.Lock()
+        self.lessons = 0
+        self.lines_removed = 0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def normalize(self, text: str) -> str:
+        """Lesson text (pages joined by PAGE_SEPARATOR) without page furniture, pages joined by PAGE_BREAK"""
+        pages = [
+            [SPACES.sub(" ", line).strip() for line in page.split("\n")]
+            for page in text.split(PAGE_SEPARATOR) if page.strip()
+        ]
+        if not pages:
+            return text.strip()
+
+        removed = repeated_edge_lines(pages, settings.TEXT_NORMALIZE_MIN_REPEAT)
+        cleaned = []
+        for lines, drop in zip(pages, removed):
+            if sum(len(lines[i]) for i in drop) > MAX_REMOVED_SHARE * sum(map(len, lines)):
+                drop.clear()
+            kept = "\n".join(line for i, line in enumerate(lines) if i not in drop).strip()
+            if kept:
+                cleaned.append(HYPHEN_BREAK.sub(r"\1\2", kept))
+        result = PAGE_BREAK.join(BLANK_LINES.sub("\n\n", page) for page in cleaned)
+
+        with self._lock:
+            self.lessons += 1
+            self.lines_removed += sum(len(drop) for drop in removed)
+            self.chars_in += len(text)
+            self.chars_out += len(result)
+        saved = (len(text) - len(result)) // CHARS_PER_TOKEN
+        print(f"🧽 Normalized text: {len(text)} -> {len(result)} chars (~{saved} tokens saved)")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.TEXT_NORMALIZE_ENABLED,
+                "lessons": self.lessons,
+                "lines_removed": self.lines_removed,
+                "chars_in": self.chars_in,
+                "chars_out": self.chars_out,
+                "tokens_saved": (self.chars_in - self.chars_out) // CHARS_PER_TOKEN,
+            }
+
+
+# Create singleton instance
+text_normalizer = TextNormalizer()
@@ -0,0 +1,268 @@
+"""
+Page Text Store
+Each cached book's text is extracted once into storage/cache:
+
+    <book_key>.<backend>.pages       - all formatted pages as one UTF-8 blob
+    <book_key>.<backend>.pages.json  - page -> [offset, length] table (+ source size/mtime)
+
+At read time the blob is memory-mapped, so any page range is a single slice.
+Each extraction backend gets its own store. Open stores are reference-counted:
+a store replaced or invalidated mid-read is closed by its last reader.
+"""
+
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from filelock import FileLock
+from ..config import settings
+from ..utils import unique_temp_path
+from .text_backends import get_backend
+from .text_extraction import extract_segments
+
+STORE_VERSION = 2
+
+
+class OpenStore:
+    """A memory-mapped blob plus its page table"""
+
+    def __init__(self, blob_path: Path, table: dict):
+        self.table = table
+        self.pages: List[List[int]] = table["pages"]
+        # Guarded by PageTextStore._lock
+        self.readers = 0
+        self.retired = False
+        self._file = open(blob_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files (e.g. a scanned book with no text layer)
+        self.view = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def span(self, start_page: int, end_page: int) -> Tuple[int, int]:
+        """Byte span covering pages [start_page, end_page] (1-based, inclusive, clamped)"""
+        end_page = min(end_page, len(self.pages))
+        if start_page > end_page:
+            return 0, 0
+        first_offset = self.pages[start_page - 1][0]
+        last_offset, last_length = self.pages[end_page - 1]
+        return first_offset, last_offset + last_length
+
+    def close(self):
+        if isinstance(self.view, mmap.mmap):
+            self.view.close()
+        self._file.close()
+
+
+class PageTextStore:
+    """Builds, validates and serves per-book page-text stores"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[Path, str], OpenStore] = {}
+        self._builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="text-store")
+        self._queued = set()
+
+    # --- Paths ---
+
+    def _blob_path(self, pdf_path: Path, backend: str) -> Path:
+        return pdf_path.with_name(f"{pdf_path.name}.{backend}.pages")
+
+    def _table_path(self, pdf_path: Path, backend: str) -> Path:
+        return pdf_path.with_name(f"{pdf_path.name}.{backend}.pages.json")
+
+    def _lock_path(self, pdf_path: Path, backend: str) -> Path:
+        return pdf_path.parent / ".locks" / f"{pdf_path.name}.{backend}.pages.lock"
+
+    # --- Reading ---
+
+    def _is_current(self, table: dict, pdf_path: Path) -> bool:
+        stat = pdf_path.stat()
+        return (
+            table.get("version") == STORE_VERSION
+            and table.get("source_size") == stat.st_size
+            and table.get("source_mtime_ns") == stat.st_mtime_ns
+        )
+
+    def _retire(self, store: OpenStore):
+        """Drop a store from use; its mapping closes when the last reader is done (call under _lock)"""
+        store.retired = True
+        if not store.readers:
+            store.close()
+
+    def _get_locked(self, pdf_path: Path, backend: str) -> Optional[OpenStore]:
+        key = (pdf_path, backend)
+        store = self._open.get(key)
+        if store and self._is_current(store.table, pdf_path):
+            return store
+
+        if store:
+            self._retire(self._open.pop(key))
+
+        table_path = self._table_path(pdf_path, backend)
+        if not table_path.exists():
+            return None
+        try:
+            with open(table_path, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            if not self._is_current(table, pdf_path):
+                return None
+            store = OpenStore(self._blob_path(pdf_path, backend), table)
+        except Exception as e:
+            print(f"⚠️ Text store unreadable for {pdf_path.name}: {e}")
+            return None
+
+        self._open[key] = store
+        return store
+
+    def _get(self, pdf_path: Path, backend: str) -> Optional[OpenStore]:
+        """Open (or reuse) the mapped store for a book; None if missing or stale (don't read it: see _reading)"""
+        with self._lock:
+            return self._get_locked(pdf_path, backend)
+
+    @contextmanager
+    def _reading(self, pdf_path: Path, backend: str) -> Iterator[Optional[OpenStore]]:
+        """The store, kept mapped until the block ends even if it is invalidated meanwhile"""
+        with self._lock:
+            store = self._get_locked(pdf_path, backend)
+            if store:
+                store.readers += 1
+        try:
+            yield store
+        finally:
+            if store:
+                with self._lock:
+                    store.readers -= 1
+                    if store.retired and not store.readers:
+                        store.close()
+
+    def read_range(self, pdf_path: Path, start_page: int, end_page: int, backend: str = "") -> Optional[str]:
+        """Text for a page range, or None if the book has no store yet"""
+        with self._reading(pdf_path, get_backend(backend).name) as store:
+            if store is None:
+                return None
+            begin, end = store.span(start_page, end_page)
+            return store.view[begin:end].decode('utf-8')
+
+    def write_range(
+        self,
+        pdf_path: Path,
+        start_page: int,
+        end_page: int,
+        output_path: Path,
+        backend: str = ""
+    ) -> bool:
+        """Copy a page range straight from the mapped blob to a file (no decode)"""
+        with self._reading(pdf_path, get_backend(backend).name) as store:
+            if store is None:
+                return False
+            begin, end = store.span(start_page, end_page)
+            tmp_path = unique_temp_path(output_path)
+            try:
+                with open(tmp_path, 'wb') as f:
+                    with memoryview(store.view) as view:
+                        f.write(view[begin:end])
+                os.replace(tmp_path, output_path)
+                return True
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    # --- Building ---
+
+    def ensure(self, pdf_path: Path, backend: str = "", parallel: Optional[bool] = None) -> bool:
+        """
+        Build the store for a book if it is missing or stale (blocking).
+        parallel=None uses PARALLEL_FULL_BOOK; False keeps the build in the calling thread.
+        """
+        backend = get_backend(backend).name
+        if self._get(pdf_path, backend):
+            return True
+
+        lock_path = self._lock_path(pdf_path, backend)
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(str(lock_path)):
+            # Another worker may have finished the build while we waited
+            if self._get(pdf_path, backend):
+                return True
+            try:
+                self._build(pdf_path, backend, parallel)
+            except Exception as e:
+                print(f"❌ Text store build failed for {pdf_path.name}: {e}")
+                return False
+        return self._get(pdf_path, backend) is not None
+
+    def ensure_in_background(self, pdf_path: Path, backend: str = ""):
+        """Queue a build without blocking the caller"""
+        key = (pdf_path, get_backend(backend).name)
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+
+        def run():
+            try:
+                self.ensure(*key)
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+
+        self._builder.submit(run)
+
+    def _build(self, pdf_path: Path, backend: str, parallel: Optional[bool] = None):
+        stat = pdf_path.stat()
+        print(f"🗂️ Building {backend} text store: {pdf_path.name}")
+
+        if parallel is None:
+            parallel = settings.PARALLEL_FULL_BOOK
+        segments = extract_segments(pdf_path, 1, 10**9, backend, parallel=parallel)
+
+        pages = []
+        offset = 0
+        encoded = []
+        for segment in segments:
+            data = segment.encode('utf-8')
+            pages.append([offset, len(data)])
+            encoded.append(data)
+            offset += len(data)
+
+        table = {
+            "version": STORE_VERSION,
+            "backend": backend,
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "page_count": len(pages),
+            "blob_size": offset,
+            "pages": pages,
+        }
+
+        # Blob first, table last: the table is the commit marker readers look for
+        blob_path = self._blob_path(pdf_path, backend)
+        tmp_blob = unique_temp_path(blob_path)
+        table_path = self._table_path(pdf_path, backend)
+        tmp_table = unique_temp_path(table_path)
+        try:
+            with open(tmp_blob, 'wb') as f:
+                f.write(b"".join(encoded))
+            with open(tmp_table, 'w', encoding='utf-8') as f:
+                json.dump(table, f)
+            os.replace(tmp_blob, blob_path)
+            os.replace(tmp_table, table_path)
+        finally:
+            tmp_blob.unlink(missing_ok=True)
+            tmp_table.unlink(missing_ok=True)
+
+        print(f"✅ Text store ready: {pdf_path.name} ({len(pages)} pages, {offset} bytes)")
+
+    def invalidate(self, pdf_path: Path):
+        """Close and delete a book's stores for every backend (e.g. before evicting the book)"""
+        with self._lock:
+            for key in [k for k in self._open if k[0] == pdf_path]:
+                self._retire(self._open.pop(key))
+        for sidecar in pdf_path.parent.glob(f"{pdf_path.name}.*.pages*"):
+            sidecar.unlink(missing_ok=True)
+
+
+# Create singleton instance
+text_store = PageTextStore()
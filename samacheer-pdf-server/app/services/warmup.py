@@ -0,0 +1,244 @@
+"""
+Cache Warmup
+After a deploy, prefetch the most requested books into storage/cache and
+build their page-text stores, so the first users don't pay for the
+download + parse.
+
+Books are ranked by a request history persisted in storage/ (decaying
+per-book counts, merged across worker processes). Warmup runs on one
+low-priority thread, waits while the worker pool is busy, and runs again
+whenever a catalog changes. /ready reports 503 until WARMUP_READY_PERCENT
+of the first pass has settled. Lesson tables need no warmup: the registry
+compiles every index when it loads.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from filelock import FileLock
+from ..config import settings
+from ..utils import atomic_write_text
+from .book_cache import book_cache
+from .registry import registry
+from .storage_manager import storage_manager
+from .text_backends import resolve_backend_name
+from .text_store import text_store
+from .worker_pool import worker_pool
+
+HISTORY_PATH = settings.BASE_DIR / "storage" / "request_history.json"
+HISTORY_FLUSH_SECONDS = 60
+
+
+class Warmup:
+    def __init__(self):
+        self.half_life = settings.WARMUP_HISTORY_HALF_LIFE_DAYS * 86400
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}
+        self._last_flush = time.time()
+        self._flush_pid = None
+
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.planned: List[str] = []
+        self.warmed: List[str] = []
+        self.failed: List[str] = []
+        self.current: Optional[str] = None
+        self.passes = 0
+        self._ready = not settings.WARMUP_ENABLED
+
+    # --- Request history ---
+
+    def record(self, book_key: str, count: int = 1):
+        """Count a request for a book (flushed to disk at most every HISTORY_FLUSH_SECONDS)"""
+        with self._lock:
+            self._pending[book_key] = self._pending.get(book_key, 0) + count
+            if self._flush_pid != os.getpid():
+                # Forked uvicorn workers keep their own counts: flush them on exit too
+                # (process-pool workers skip atexit; run_process_* flush after each job)
+                self._flush_pid = os.getpid()
+                atexit.register(self.flush)
+            due = time.time() - self._last_flush >= HISTORY_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def _decayed(self, entry: List[float], now: float) -> float:
+        score, updated = entry
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def _read_history(self) -> Dict[str, List[float]]:
+        try:
+            with open(HISTORY_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def flush(self):
+        """Merge this process's new counts into the history file"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        if not pending:
+            return
+
+        now = time.time()
+        try:
+            with FileLock(str(HISTORY_PATH) + ".lock", timeout=10):
+                history = self._read_history()
+                for book_key, count in pending.items():
+                    previous = self._decayed(history[book_key], now) if book_key in history else 0.0
+                    history[book_key] = [previous + count, now]
+                atomic_write_text(HISTORY_PATH, json.dumps(history))
+        except Exception as e:
+            print(f"⚠️ Request history flush failed: {e}")
+
+    def scores(self) -> Dict[str, float]:
+        """Current decayed request count per book (including unflushed counts)"""
+        now = time.time()
+        scores = {key: self._decayed(entry, now) for key, entry in self._read_history().items()}
+        with self._lock:
+            for book_key, count in self._pending.items():
+                scores[book_key] = scores.get(book_key, 0.0) + count
+        return scores
+
+    # --- Planning ---
+
+    @staticmethod
+    def _catalog_books() -> Dict[str, Tuple[str, str]]:
+        """book_key -> (drive_id, subject) across every catalog"""
+        books = {}
+        for path, catalog in registry.catalogs().items():
+            for book_key, drive_id in catalog.items():
+                if book_key.endswith(".pdf") and isinstance(drive_id, str):
+                    books[book_key] = (drive_id, path.stem)
+        return books
+
+    def plan(self) -> List[Tuple[str, str, str]]:
+        """Pinned books, then the most requested ones: up to WARMUP_BOOKS (book_key, drive_id, subject)"""
+        books = self._catalog_books()
+        scores = self.scores()
+        pinned = storage_manager.pinned
+        ranked = sorted(
+            (key for key in books if key in pinned or scores.get(key, 0) > 0),
+            key=lambda key: (key in pinned, scores.get(key, 0)), reverse=True
+        )
+        return [(key, *books[key]) for key in ranked[:settings.WARMUP_BOOKS]]
+
+    # --- Warming ---
+
+    def _wait_for_idle(self):
+        """Low priority: let requests in the worker pool finish first"""
+        while worker_pool.stats()["active"] and not self._stop_event.is_set():
+            self._stop_event.wait(1)
+
+    def _warm(self, book_key: str, drive_id: str, subject: str) -> bool:
+        self._wait_for_idle()
+        book_path = book_cache.ensure(book_key, drive_id)
+        if not book_path:
+            return False
+        if settings.TEXT_STORE_ENABLED and settings.WARMUP_TEXT_STORES:
+            self._wait_for_idle()
+            # Serial, in this niced thread: the shared extraction process pool stays free for requests
+            return text_store.ensure(book_path, resolve_backend_name(subject), parallel=False)
+        return True
+
+    def _pass(self):
+        plan = self.plan()
+        with self._lock:
+            self.planned = [key for key, _, _ in plan]
+            self.warmed, self.failed = [], []
+        print(f"🔥 Warmup: {len(plan)} books")
+        self._check_ready()
+
+        for book_key, drive_id, subject in plan:
+            if self._stop_event.is_set():
+                return
+            self.current = book_key
+            try:
+                ok = self._warm(book_key, drive_id, subject)
+            except Exception as e:
+                print(f"⚠️ Warmup failed for {book_key}: {e}")
+                ok = False
+            self.current = None
+            with self._lock:
+                (self.warmed if ok else self.failed).append(book_key)
+            self._check_ready()
+
+        self.passes += 1
+        print(f"🔥 Warmup done: {len(self.warmed)} warm, {len(self.failed)} failed")
+
+    def _check_ready(self):
+        if not self._ready and self.percent() >= settings.WARMUP_READY_PERCENT:
+            self._ready = True
+            print(f"✅ Warmup reached {settings.WARMUP_READY_PERCENT}%: ready")
+
+    def _run(self):
+        try:
+            # Linux nices single threads; elsewhere this is a no-op
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        while not self._stop_event.is_set():
+            self._wake.clear()
+            try:
+                self._pass()
+            except Exception as e:
+                print(f"❌ Warmup pass failed: {e}")
+                self._ready = True  # Never keep the server out of rotation over a warmup bug
+            self._wake.wait()
+
+    def _on_data_change(self, changed: List[Path]):
+        if any(path.is_relative_to(settings.CATALOGS_DIR) for path in changed):
+            self._wake.set()
+
+    def start(self):
+        """Start warming in the background (called at server startup)"""
+        if not settings.WARMUP_ENABLED:
+            return
+        self._stop_event.clear()
+        registry.on_change(self._on_data_change)
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        self.flush()
+
+    # --- Status ---
+
+    def percent(self) -> float:
+        with self._lock:
+            if not self.planned:
+                return 100.0
+            settled = len(self.warmed) + len(self.failed)
+            return round(settled / len(self.planned) * 100, 1)
+
+    def ready(self) -> bool:
+        """True once the first pass reached WARMUP_READY_PERCENT (later passes don't unset it)"""
+        return self._ready
+
+    def stats(self) -> dict:
+        with self._lock:
+            planned, warmed, failed = list(self.planned), list(self.warmed), list(self.failed)
+        return {
+            "enabled": settings.WARMUP_ENABLED,
+            "ready": self._ready,
+            "percent": self.percent(),
+            "target_percent": settings.WARMUP_READY_PERCENT,
+            "planned": planned,
+            "warmed": warmed,
+            "failed": failed,
+            "current": self.current,
+            "passes": self.passes,
+        }
+
+
+# Create singleton instance
+warmup = Warmup()
@@ -0,0 +1,109 @@
+"""
+Worker Pool
+Runs blocking PDF/AI work on a bounded executor so the event loop stays free
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from ..config import settings
+
+
+class WorkerPoolBusy(Exception):
+    """Raised when the pool already has too many running + queued jobs"""
+
+
+_in_pool_process = False
+
+
+def _init_pool_process():
+    global _in_pool_process
+    _in_pool_process = True
+
+
+def in_pool_process() -> bool:
+    """True inside a process-pool worker (which exits without running atexit hooks)"""
+    return _in_pool_process
+
+
+class WorkerPool:
+    """Bounded thread/process executor shared by all API routes"""
+
+    def __init__(self, kind: str, size: int, max_pending: int):
+        self.kind = kind.lower().strip()
+        self.size = max(1, size)
+        self.max_pending = max(0, max_pending)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _get_executor(self) -> Executor:
+        """Create the executor lazily (process pools must not start at import)"""
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.size, initializer=_init_pool_process)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.size,
+                        thread_name_prefix="pdf-worker"
+                    )
+                print(f"⚙️ Worker pool started: {self.kind} x {self.size}")
+            return self._executor
+
+    def is_full(self) -> bool:
+        """True when a new job would be rejected"""
+        with self._lock:
+            return bool(self.max_pending) and self._active >= self.size + self.max_pending
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Run fn(*args) on the pool and await the result.
+
+        With a process pool, fn and args must be picklable
+        (use module-level functions, not bound methods).
+        """
+        with self._lock:
+            limit = self.size + self.max_pending
+            if self.max_pending and self._active >= limit:
+                raise WorkerPoolBusy(f"Worker pool is full ({self._active}/{limit} jobs)")
+            self._active += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._finished(None)
+            raise
+        # Counted until the job itself ends: a cancelled await doesn't stop a running job
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future):
+        with self._lock:
+            self._active -= 1
+
+    def stats(self) -> dict:
+        """Current pool usage"""
+        with self._lock:
+            return {
+                "type": self.kind,
+                "size": self.size,
+                "max_pending": self.max_pending,
+                "active": self._active,
+            }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running jobs"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Create singleton instance
+worker_pool = WorkerPool(
+    kind=settings.WORKER_POOL_TYPE,
+    size=settings.WORKER_POOL_SIZE,
+    max_pending=settings.WORKER_MAX_PENDING,
+)
@@ -1,5 +1,11 @@
+import hashlib
+import os
+import uuid
+import zipfile
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from .config import settings
 
 def get_file_size(file_path: Path) -> dict:
     """Get file size in bytes and MB"""
@@ -18,4 +24,99 @@ def generate_download_url(filename: str, base_url: str = "http://localhost:8000"
 def get_file_creation_time(file_path: Path) -> datetime:
     """Get file creation timestamp"""
     timestamp = file_path.stat().st_ctime
-    return datetime.fromtimestamp(timestamp)
\ No newline at end of file
+    return datetime.fromtimestamp(timestamp)
+
+def resolve_download_path(filename: str) -> Optional[Path]:
+    """
+    Find a downloadable file by name.
+    Full books are served straight from storage/cache; everything else from storage/temp.
+    """
+    # Plain file names only - no path traversal, no hidden/lock/sidecar files
+    if Path(filename).name != filename or filename.startswith("."):
+        return None
+    
+    if filename.endswith(".pdf"):
+        cached_book = settings.CACHE_DIR / filename
+        if cached_book.is_file():
+            return cached_book
+    
+    temp_file = settings.TEMP_DIR / filename
+    if temp_file.is_file():
+        return temp_file
+    return None
+
+def unique_temp_path(target: Path) -> Path:
+    """Unique hidden sibling of target, used for write-then-rename"""
+    return target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+
+def atomic_write_text(target: Path, content: str) -> None:
+    """Write text so concurrent readers never see a half-written file"""
+    tmp_path = unique_temp_path(target)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+_hash_memo = {}
+
+def file_sha256(file_path: Path) -> str:
+    """
+    SHA-256 of a file's content.
+    Memoized per (device, inode, size, mtime) so a file is hashed once per process.
+    """
+    stat = file_path.stat()
+    memo_key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+    
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+class _ZipBuffer:
+    """Write-only sink that lets zipfile stream to a generator"""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+def iter_zip(files: List[Tuple[str, Path]], extra: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    """
+    Stream a ZIP of (archive name, path) pairs chunk by chunk,
+    without building the archive in memory or on disk.
+    extra holds small generated members (e.g. a manifest).
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in (extra or {}).items():
+            archive.writestr(name, content, compress_type=zipfile.ZIP_DEFLATED)
+            yield buffer.drain()
+        for name, path in files:
+            # PDFs are already compressed; text compresses well
+            info = zipfile.ZipInfo.from_file(path, name)
+            info.compress_type = zipfile.ZIP_STORED if name.endswith(".pdf") else zipfile.ZIP_DEFLATED
+            with archive.open(info, 'w', force_zip64=True) as member, open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    member.write(chunk)
+                    yield buffer.drain()
+    yield buffer.drain()
@@ -2,10 +2,17 @@ import requests
 import time
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # === CONFIGURATION ===
-API_URL = "http://localhost:8000/api/generate"
+SERVER_URL = "http://localhost:8000"
+JOBS_URL = f"{SERVER_URL}/api/jobs"
+# The server sends a keep-alive every 15s, so a silent stream means trouble
+STREAM_TIMEOUT = 60
+# Lessons in flight at once. The server's AI client enforces the provider's
+# rate limits (AI_REQUESTS_PER_MINUTE / AI_TOKENS_PER_MINUTE), so no sleeps here.
+CONCURRENCY = 4
 # Adjust path to find curriculum.json relative to this script
 CURRICULUM_PATH = Path(__file__).parent.parent / "data" / "curriculum.json"
 
@@ -16,11 +23,58 @@ def load_curriculum():
     with open(CURRICULUM_PATH, 'r') as f:
         return json.load(f)
 
+def run_job(payload):
+    """
+    Submits a background job and follows its progress stream.
+    Returns the final job status (dict).
+    """
+    # Server busy (503): wait and resubmit
+    for attempt in range(10):
+        response = requests.post(JOBS_URL, json=payload, timeout=30)
+        if response.status_code != 503:
+            break
+        time.sleep(min(60, 2 ** attempt))
+    response.raise_for_status()
+    job = response.json()
+
+    event, last_stage = None, None
+    with requests.get(SERVER_URL + job["events_url"], stream=True, timeout=STREAM_TIMEOUT) as stream:
+        for line in stream.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+            elif line.startswith("data:"):
+                status = json.loads(line.split(":", 1)[1])
+                if event in ("done", "failed"):
+                    return status
+                if status["stage"] and status["stage"] != last_stage:
+                    last_stage = status["stage"]
+                    print(f"         … {last_stage}")
+
+    # Stream closed early: ask for the final state
+    return requests.get(SERVER_URL + job["status_url"], timeout=30).json()
+
+def generate_lesson(task):
+    """Runs one lesson job and prints the outcome"""
+    label, payload = task
+    try:
+        start_time = time.time()
+        status = run_job(payload)
+        
+        if status.get("state") == "done":
+            print(f"      ✅ {label} ({round(time.time() - start_time, 1)}s)")
+            return True
+        print(f"      ❌ {label} failed: {status.get('error') or status}")
+    
+    except Exception as e:
+        print(f"      ⚠️ {label} connection error: {e}")
+    return False
+
 def run_bulk_update(target_class=None, start_unit=1):
     """
     Runs the bulk generation.
     target_class: If set (e.g., 8), only runs for that class. If None, runs ALL.
     """
+    tasks = []
     data = load_curriculum()
     print(f"🚀 Starting Bulk Update Automation...")
     if target_class:
@@ -68,8 +122,6 @@ def run_bulk_update(target_class=None, start_unit=1):
                 for i, lesson in enumerate(lessons):
                     lesson_choice = i + 1
                     lesson_title = lesson.get('title', 'Unknown Lesson')
-                    
-                    print(f"      [{i+1}/{len(lessons)}] Generating: '{lesson_title}'...")
 
                     # PREPARE THE PAYLOAD
                     payload = {
@@ -82,24 +134,15 @@ def run_bulk_update(target_class=None, start_unit=1):
                         "output_format": "html"  # Change to 'md' if you want Markdown
                     }
 
-                    # SEND REQUEST
-                    try:
-                        start_time = time.time()
-                        # Timeout set to 700s (approx 11 mins) to handle large PDF downloads
-                        response = requests.post(API_URL, json=payload, timeout=700)
-                        
-                        if response.status_code == 200:
-                            print(f"      ✅ Success! ({round(time.time() - start_time, 1)}s)")
-                        else:
-                            print(f"      ❌ Failed: {response.text}")
-                    
-                    except Exception as e:
-                        print(f"      ⚠️ Connection Error: {e}")
-
-                    # === SAFETY SLEEP ===
-                    # Wait 15 seconds to keep AI happy
-                    print("      ⏳ Cooling down (15s)...")
-                    time.sleep(15)
+                    label = f"Class {class_key} Unit {unit_num} [{i+1}/{len(lessons)}] '{lesson_title}'"
+                    tasks.append((label, payload))
+
+    # SEND REQUESTS (background jobs - no long-lived request to time out)
+    print(f"\n🚀 Generating {len(tasks)} lessons, {CONCURRENCY} at a time...")
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        results = list(executor.map(generate_lesson, tasks))
+    print(f"\n🏁 Done: {sum(results)}/{len(tasks)} succeeded in {round(time.time() - start_time)}s")
 
 if __name__ == "__main__":
     # === INSTRUCTIONS ===
@@ -1,14 +1,23 @@
 #!/bin/bash
-# Delete files older than 24 hours from temp directory
+# Delete files older than TEMP_FILE_RETENTION_HOURS from temp directory
+# (the server's storage reaper does the same in-process; this is for cron/manual runs)
 
 TEMP_DIR="storage/temp"
-HOURS=24
+
+# Same setting as the server: environment first, then .env, then 24
+HOURS="${TEMP_FILE_RETENTION_HOURS:-}"
+if [ -z "$HOURS" ] && [ -f .env ]; then
+    HOURS=$(grep -E '^TEMP_FILE_RETENTION_HOURS=' .env | tail -n 1 | cut -d '=' -f 2 | tr -d '"[:space:]')
+fi
+HOURS="${HOURS:-24}"
+MINUTES=$((HOURS * 60))
 
 echo "🧹 Starting temp file cleanup..."
 echo "Directory: $TEMP_DIR"
 echo "Retention: $HOURS hours"
 
-# Find and delete files older than HOURS
-find "$TEMP_DIR" -type f -mtime +1 -delete
+# Published files are hardlinks to older artifacts: publishing updates ctime, not mtime,
+# so a file is only stale when both are older than the retention window
+find "$TEMP_DIR" -type f -mmin +"$MINUTES" -cmin +"$MINUTES" -delete
 
-echo "✅ Cleanup complete!"
\ No newline at end of file
+echo "✅ Cleanup complete!"
@@ -0,0 +1,166 @@
+import argparse
+import os
+import re
+import threading
+import time
+from email.utils import formatdate
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# === CONFIGURATION ===
+# Local stand-in for Google Drive, for testing downloads without the network.
+# Serves <DIR>/<file_id> with HTTP Range support (ETag, Last-Modified and
+# If-Range like Drive, so replacing a file mid-test is detected). Point the server at it with:
+#   DOWNLOAD_URL_TEMPLATE=http://127.0.0.1:8765/{file_id}
+# and use file names as the catalog "Drive IDs".
+DEFAULT_DIR = Path(__file__).parent.parent / "storage" / "fake_drive"
+DEFAULT_PORT = 8765
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, root, ranges, drop_after, latency, **kwargs):
+        self.root = root
+        self.ranges = ranges
+        self.drop_after = drop_after
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def _resolve(self):
+        name = self.path.split("?", 1)[0].lstrip("/")
+        path = self.root / name
+        if "/" in name or not name or not path.is_file():
+            self.send_error(404)
+            return None
+        return path
+
+    @staticmethod
+    def _validators(path):
+        """(ETag, Last-Modified) of the current file version"""
+        stat = path.stat()
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"', formatdate(stat.st_mtime, usegmt=True)
+
+    def _byte_range(self, size, validators):
+        """(start, end) from the Range header, None for the full file, False if unsatisfiable"""
+        header = self.headers.get("Range")
+        if not self.ranges or not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range not in validators:
+            return None  # Changed since the client's copy: send the whole new file
+        match = re.match(r"bytes=(\d*)-(\d*)$", header.strip())
+        if not match or match.groups() == ("", ""):
+            return None
+        start, end = match.groups()
+        if start == "":
+            start, end = max(0, size - int(end)), size - 1
+        else:
+            start, end = int(start), int(end) if end else size - 1
+        if start >= size:
+            return False
+        return start, min(end, size - 1)
+
+    def _send_headers(self, path):
+        size = path.stat().st_size
+        etag, last_modified = self._validators(path)
+        byte_range = self._byte_range(size, (etag, last_modified))
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return None
+
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes" if self.ranges else "none")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        return start, end
+
+    def _should_drop(self, start, length):
+        """
+        Without a drop budget (server.drops_left is None) full downloads are always cut;
+        with one, the first N long enough responses of any kind (segments and resumes too)
+        """
+        if not self.drop_after or length <= self.drop_after:
+            return False
+        drops_left = getattr(self.server, "drops_left", None)
+        if drops_left is None:
+            return start == 0
+        with self.server.drop_lock:
+            if self.server.drops_left <= 0:
+                return False
+            self.server.drops_left -= 1
+            return True
+
+    def do_HEAD(self):
+        path = self._resolve()
+        if path:
+            self._send_headers(path)
+
+    def do_GET(self):
+        path = self._resolve()
+        if not path:
+            return
+        span = self._send_headers(path)
+        if not span:
+            return
+
+        start, end = span
+        if self.latency:
+            time.sleep(self.latency)
+        remaining = end - start + 1
+        sent = 0
+        drop = self._should_drop(start, remaining)
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while remaining:
+                chunk = f.read(min(64 * 1024, remaining))
+                # Simulate a dropped connection part-way through the response
+                if drop and sent + len(chunk) > self.drop_after:
+                    self.wfile.write(chunk[:self.drop_after - sent])
+                    self.close_connection = True
+                    print(f"✂️ Dropped {path.name} after {self.drop_after} bytes")
+                    return
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                remaining -= len(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Range-capable local stand-in for Google Drive")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_DIR, help="Folder of files to serve")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-ranges", action="store_true", help="Ignore Range headers (always 200)")
+    parser.add_argument("--drop-after", type=int, default=0, help="Cut full downloads after N bytes")
+    parser.add_argument("--drops", type=int, default=None,
+                        help="With --drop-after: cut only the first N responses, range requests included")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds before each response body")
+    args = parser.parse_args()
+
+    args.dir.mkdir(parents=True, exist_ok=True)
+    handler = partial(
+        FakeDriveHandler,
+        root=args.dir,
+        ranges=not args.no_ranges,
+        drop_after=args.drop_after,
+        latency=args.latency,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    server.drops_left = args.drops
+    server.drop_lock = threading.Lock()
+    print(f"🧪 Fake Drive serving {args.dir} on http://127.0.0.1:{args.port}/{{file_id}}")
+    print(f"   ranges={'off' if args.no_ranges else 'on'} drop_after={args.drop_after or 'never'} pid={os.getpid()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
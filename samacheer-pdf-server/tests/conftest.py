@@ -0,0 +1,80 @@
+"""Shared fixtures"""
+
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from app.config import settings
+from scripts.fake_drive import FakeDriveHandler
+from tests.helpers import make_pdf
+
+KB = 1024
+
+
+class RecordingHandler(FakeDriveHandler):
+    """Remembers the Range header of every GET"""
+
+    def do_GET(self):
+        self.server.ranges_seen.append(self.headers.get("Range"))
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def shared_leases(tmp_path, monkeypatch):
+    """Leases and access scores of the storage manager singleton under tmp_path"""
+    from app.services.storage_manager import storage_manager
+    monkeypatch.setattr(storage_manager, "lease_dir", tmp_path / "leases")
+    storage_manager.lease_dir.mkdir()
+    return storage_manager.lease_dir
+
+
+@pytest.fixture
+def book_pdf(tmp_path) -> Path:
+    return make_pdf(tmp_path / "class-10-term0-english.pdf")
+
+
+@pytest.fixture
+def fake_drive(tmp_path, monkeypatch):
+    """
+    start(ranges=True, drop_after=0, drops=None) -> in-process scripts/fake_drive.py
+    serving tmp_path/drive (with an 8-page ~320 KB "book"), set as DOWNLOAD_URL_TEMPLATE
+    """
+    root = tmp_path / "drive"
+    root.mkdir()
+    make_pdf(root / "book", pages=8, padding=40 * KB)
+    servers = []
+
+    def start(ranges=True, drop_after=0, drops=None):
+        handler = partial(RecordingHandler, root=root, ranges=ranges, drop_after=drop_after, latency=0)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.ranges_seen = []
+        server.drops_left = drops
+        server.drop_lock = threading.Lock()
+        server.root = root
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(settings, "DOWNLOAD_URL_TEMPLATE", f"http://127.0.0.1:{server.server_port}/{{file_id}}")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    """Artifact cache and published files under tmp_path instead of storage/"""
+    from app.services.artifact_cache import artifact_cache
+    monkeypatch.setattr(artifact_cache, "root", tmp_path / "artifacts")
+    monkeypatch.setattr(artifact_cache, "publish_dir", tmp_path / "published")
+    monkeypatch.setattr(artifact_cache, "hits", 0)
+    monkeypatch.setattr(artifact_cache, "misses", 0)
+    artifact_cache.root.mkdir()
+    artifact_cache.publish_dir.mkdir()
+    return artifact_cache
@@ -0,0 +1,52 @@
+"""Test helpers: small generated textbooks (no binary files in the repo)"""
+
+from pathlib import Path
+from typing import List
+
+
+def page_lines(page: int) -> List[str]:
+    return [
+        "Samacheer Kalvi English",
+        f"Lesson body page {page} with some text",
+        f"Another line of content for page {page}.",
+    ]
+
+
+def make_pdf(path: Path, pages: int = 6, padding: int = 0) -> Path:
+    """
+    A minimal uncompressed PDF with a few lines of Helvetica text per page.
+    padding adds that many bytes of comment to every content stream
+    (big books for range-request tests).
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for i in range(pages):
+        y = 760
+        content = b""
+        for line in page_lines(i + 1):
+            content += f"BT /F1 12 Tf 72 {y} Td ({line}) Tj ET\n".encode()
+            y -= 20
+        content += f"BT /F1 10 Tf 300 40 Td ({i + 1}) Tj ET\n".encode()
+        content += b"%" + b"x" * padding + b"\n" if padding else b""
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+    return path
+
@@ -0,0 +1,58 @@
+"""State-changing admin endpoints need ADMIN_TOKEN"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.api import ai_cache
+from app.config import settings
+from app.main import app
+
+ENDPOINTS = [
+    ("DELETE", "/api/admin/ai-cache"),
+    ("POST", "/api/admin/storage/reap"),
+    ("POST", "/api/admin/storage/pin/class-10-term0-english.pdf"),
+    ("DELETE", "/api/admin/storage/pin/class-10-term0-english.pdf"),
+]
+
+
+@pytest.fixture
+def client():
+    # No context manager: startup tasks (warmup, reaper) don't run
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method,url", ENDPOINTS)
+def test_disabled_without_admin_token(client, monkeypatch, method, url):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+
+    response = client.request(method, url, headers={"Authorization": "Bearer anything"})
+
+    assert response.status_code == 403
+    assert response.json()["detail"]["error_code"] == "ADMIN_DISABLED"
+
+
+@pytest.mark.parametrize("header", [None, "Bearer wrong", "secret", "Basic secret"])
+@pytest.mark.parametrize("method,url", ENDPOINTS)
+def test_wrong_or_missing_token_is_rejected(client, monkeypatch, method, url, header):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    headers = {"Authorization": header} if header else {}
+
+    response = client.request(method, url, headers=headers)
+
+    assert response.status_code == 401
+
+
+def test_valid_token_is_accepted(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    calls = []
+    monkeypatch.setattr(ai_cache, "invalidate", lambda model, version: calls.append((model, version)) or 0)
+
+    response = client.delete("/api/admin/ai-cache?model=m", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 200
+    assert calls == [("m", None)]
+
+
+def test_read_only_stats_stay_open(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+
+    assert client.get("/api/admin/storage").status_code == 200
@@ -0,0 +1,67 @@
+"""AI conversion cache: normalized keys, LRU byte budget and invalidation"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from app.config import settings
+from app.services import ai_cache as ai_cache_module
+from app.services.ai_cache import AICache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", True)
+    # Strictly increasing clock, so "least recently used" is never a tie
+    ticks = itertools.count(1)
+    monkeypatch.setattr(ai_cache_module, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+    return AICache(tmp_path / "ai_cache.sqlite3", max_bytes=0)
+
+
+def messages(text):
+    return [{"role": "system", "content": "Convert to markdown"}, {"role": "user", "content": text}]
+
+
+def test_key_ignores_whitespace_but_not_content(cache):
+    key = cache.key(messages("Line one\nLine two"), "model", 1, 0.3)
+
+    assert cache.key(messages("Line one  \r\nLine two\n\n\n"), "model", 1, 0.3) == key
+    assert cache.key(messages("Line one\nLine 2"), "model", 1, 0.3) != key
+    assert cache.key(messages("Line one\nLine two"), "other", 1, 0.3) != key
+    assert cache.key(messages("Line one\nLine two"), "model", 2, 0.3) != key
+    assert cache.key(messages("Line one\nLine two"), "model", 1, 0.7) != key
+
+
+def test_round_trip_and_disabled_cache(cache, monkeypatch):
+    cache.put("k", "# Lesson", "model", 1)
+
+    assert cache.get("k") == "# Lesson"
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", False)
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_rows_go_first(cache):
+    cache.max_bytes = 25
+    for key in "abc":
+        cache.put(key, "x" * 10, "model", 1)  # 30 bytes: "a" is evicted
+    assert cache.get("a") is None
+
+    cache.get("b")  # Now "c" is the oldest
+    cache.put("d", "x" * 10, "model", 1)
+
+    assert cache.get("c") is None
+    assert cache.get("b") and cache.get("d")
+
+
+def test_invalidate_by_model_and_prompt_version(cache):
+    cache.put("old", "1", "model", 1)
+    cache.put("new", "2", "model", 2)
+    cache.put("other", "3", "other", 1)
+
+    assert cache.invalidate(model="model", prompt_version=1) == 1
+    assert cache.get("old") is None
+    assert cache.invalidate(model="model") == 1
+    assert cache.get("other") == "3"
+    assert cache.invalidate() == 1
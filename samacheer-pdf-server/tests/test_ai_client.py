@@ -0,0 +1,83 @@
+"""AI client retries: Retry-After is capped and every wait counts against AI_TIMEOUT"""
+
+import asyncio
+import os
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from app.config import settings
+from app.services.ai_client import AIClient, AIError
+
+
+def rate_limited(retry_after: str) -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://ai.test/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+class FakeCompletions:
+    def __init__(self, failures: int, retry_after: str):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.timeouts = []
+
+    async def create(self, **kwargs):
+        self.timeouts.append(kwargs["timeout"])
+        if len(self.timeouts) <= self.failures:
+            raise rate_limited(self.retry_after)
+        message = SimpleNamespace(content="# Lesson")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "AI_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(settings, "AI_TOKENS_PER_MINUTE", 0)
+    monkeypatch.setattr(settings, "AI_RETRIES", 3)
+    monkeypatch.setattr(settings, "AI_RETRY_AFTER_MAX", 30)
+
+    def make(failures: int, retry_after: str):
+        client = AIClient()
+        completions = FakeCompletions(failures, retry_after)
+        client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        client._pid = os.getpid()
+        return client, completions
+
+    return make
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("3600", 30),        # Capped
+    ("2.5", 2.5),
+    ("-4", 0),
+    (formatdate(time.time() + 7200, usegmt=True), 30),
+])
+def test_retry_after_is_capped(client, header, expected):
+    ai, _ = client(0, header)
+    assert ai._retry_delay(rate_limited(header), 1) == pytest.approx(expected, abs=1)
+
+
+def test_short_retry_after_is_retried(client, monkeypatch):
+    monkeypatch.setattr(settings, "AI_TIMEOUT", 60)
+    ai, completions = client(2, "0")
+
+    assert asyncio.run(ai.complete([{"role": "user", "content": "text"}])) == "# Lesson"
+    assert len(completions.timeouts) == 3
+    assert ai.retries == 2
+
+
+def test_wait_beyond_the_timeout_fails_fast(client, monkeypatch):
+    monkeypatch.setattr(settings, "AI_TIMEOUT", 5)
+    ai, completions = client(5, "20")
+
+    started = time.monotonic()
+    with pytest.raises(AIError):
+        asyncio.run(ai.complete([{"role": "user", "content": "text"}]))
+
+    assert time.monotonic() - started < 2
+    assert len(completions.timeouts) == 1
+    assert completions.timeouts[0] <= 5
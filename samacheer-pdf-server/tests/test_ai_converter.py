@@ -0,0 +1,121 @@
+"""Chunked AI conversion: splitting, stitching and retrying only failed chunks"""
+
+import re
+
+import pytest
+from app.config import settings
+from app.services.ai_cache import AICache
+from app.services import ai_converter as converter_module
+from app.services.ai_converter import CHARS_PER_TOKEN, ai_converter, split_chunks, stitch_markdown
+from app.services.text_extraction import PAGE_SEPARATOR
+
+METADATA = {"class": 10, "subject": "english", "unit": 1, "lesson_title": "Unit1-Lesson"}
+
+
+def pages(count: int, lines: int = 5) -> str:
+    return PAGE_SEPARATOR.join(
+        "\n".join(f"Page {p} line {i} of the lesson text." for i in range(lines)) for p in range(count)
+    )
+
+
+def test_chunks_stay_within_budget_and_lose_nothing():
+    text = pages(6)
+    budget = 100
+
+    chunks = split_chunks(text, budget)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= budget * CHARS_PER_TOKEN for chunk in chunks)
+    assert PAGE_SEPARATOR.join(chunks) == text
+
+
+def test_chunks_break_between_pages_when_they_fit():
+    text = pages(6)
+    page_tokens = len(text.split(PAGE_SEPARATOR)[0]) // CHARS_PER_TOKEN + 1
+
+    chunks = split_chunks(text, 2 * page_tokens + 30)
+
+    assert len(chunks) == 3
+    assert all(chunk.startswith("Page") and chunk.count("line 0 ") == 2 for chunk in chunks)
+
+
+def test_oversized_page_falls_back_to_lines():
+    text = pages(1, lines=40)
+
+    chunks = split_chunks(text, 50)
+
+    assert all(len(chunk) <= 50 * CHARS_PER_TOKEN for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_no_budget_means_one_chunk():
+    assert split_chunks(pages(6), 0) == [pages(6)]
+
+
+def test_stitching_keeps_one_title():
+    parts = [
+        "```markdown\n# Lesson\n\nIntro\n```",
+        "# Lesson\n\n# Part Two\n\n```python\n# not a heading\n```",
+        "### Deep",
+    ]
+
+    stitched = stitch_markdown(parts)
+
+    assert stitched.count("# Lesson") == 1
+    assert "## Part Two" in stitched
+    assert "# not a heading" in stitched and "## not a heading" not in stitched
+    assert "### Deep" in stitched
+    assert not stitched.startswith("```")
+
+
+class FlakyAI:
+    """Fails the first call for every part listed in failures"""
+    model = "fake"
+
+    def __init__(self, failures):
+        self.failures = set(failures)
+        self.calls = []
+
+    async def complete(self, messages, temperature=0.3):
+        prompt = messages[-1]["content"]
+        part = int(re.search(r"This is part (\d+) of", prompt).group(1))
+        self.calls.append(part)
+        if part in self.failures:
+            self.failures.discard(part)
+            raise RuntimeError("upstream error")
+        return f"# Section {part}\n\nConverted part {part}."
+
+
+@pytest.fixture
+def chunked(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_CHUNK_TOKENS", 100)
+    monkeypatch.setattr(converter_module, "ai_cache", AICache(tmp_path / "ai_cache.sqlite3", max_bytes=0))
+
+    def use(ai):
+        monkeypatch.setattr(ai_converter, "client", ai)
+        return ai
+    return use
+
+
+def test_only_failed_chunks_are_retried(chunked, monkeypatch):
+    monkeypatch.setattr(settings, "AI_CHUNK_RETRIES", 1)
+    ai = chunked(FlakyAI(failures={2}))
+
+    markdown = ai_converter.convert_to_markdown(pages(6), METADATA)
+
+    total = max(ai.calls)
+    assert total > 2
+    assert sorted(ai.calls) == sorted(list(range(1, total + 1)) + [2])
+    assert all(f"Converted part {part}." in markdown for part in range(1, total + 1))
+    assert "## Section 2" in markdown
+
+
+def test_cached_chunks_are_not_sent_again(chunked, monkeypatch):
+    monkeypatch.setattr(settings, "AI_CHUNK_RETRIES", 0)
+    ai = chunked(FlakyAI(failures={2}))
+    assert ai_converter.convert_to_markdown(pages(6), METADATA) is None
+
+    ai.calls.clear()
+    assert ai_converter.convert_to_markdown(pages(6), METADATA)
+    assert ai.calls == [2]
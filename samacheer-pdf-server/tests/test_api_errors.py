@@ -0,0 +1,77 @@
+"""Processor error codes -> HTTP statuses; errors never get the immutable cache policy"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app import api
+from app.main import app
+from app.processor import processor, error_result, NOT_FOUND, INVALID_REQUEST, UPSTREAM_ERROR, PROCESSING_ERROR
+
+LESSON_URL = "/api/books/10/english/english/lessons/1/1.pdf"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def processor_result(monkeypatch):
+    """Make the worker pool return a fixed processor result"""
+    def set_result(result):
+        async def run(fn, *args):
+            return result
+        monkeypatch.setattr(api.worker_pool, "run", run)
+    return set_result
+
+
+@pytest.mark.parametrize("code,status", [
+    (NOT_FOUND, 404),
+    (INVALID_REQUEST, 400),
+    (UPSTREAM_ERROR, 502),
+    (PROCESSING_ERROR, 500),
+])
+def test_error_codes_map_to_statuses(client, processor_result, code, status):
+    processor_result(error_result(code, "Lesson text"))
+
+    resource = client.get(LESSON_URL)
+    generated = client.post("/api/generate", json={
+        "class_num": 10, "subject": "english", "mode": "lesson", "unit": 1, "output_format": "pdf"
+    })
+
+    for response in (resource, generated):
+        assert response.status_code == status
+        assert response.json()["detail"]["error_code"] == code
+    assert resource.headers["cache-control"] == "no-store"
+
+
+def test_message_text_does_not_decide_the_status(client, processor_result):
+    processor_result(error_result(UPSTREAM_ERROR, "Book not found upstream"))
+
+    assert client.get(LESSON_URL).status_code == 502
+
+
+def test_unsatisfiable_range_is_not_cached(client, processor_result, book_pdf):
+    processor_result({"error": False, "filename": "lesson.pdf", "file_path": str(book_pdf)})
+
+    ok = client.get(LESSON_URL)
+    assert "immutable" in ok.headers["cache-control"]
+
+    response = client.get(LESSON_URL, headers={"Range": f"bytes={10 ** 9}-"})
+    assert response.status_code == 416
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_processor_codes(monkeypatch, book_pdf):
+    monkeypatch.setattr(processor, "_fetch_book", lambda book_key, subject, medium: (book_pdf, None))
+    lesson = {"class_num": 10, "subject": "english", "mode": "lesson", "output_format": "pdf"}
+
+    assert processor.process_request({**lesson, "unit": 999})["error_code"] == NOT_FOUND
+    full_book_md = {**lesson, "mode": "full_book", "output_format": "md"}
+    assert processor.process_request(full_book_md)["error_code"] == INVALID_REQUEST
+
+
+def test_missing_catalog_is_not_found(monkeypatch):
+    monkeypatch.setattr(processor, "_load_catalog", lambda subject, medium: {})
+    request = {"class_num": 10, "subject": "english", "mode": "lesson", "unit": 1, "output_format": "pdf"}
+
+    assert processor.process_request(request)["error_code"] == NOT_FOUND
@@ -0,0 +1,59 @@
+"""Artifact cache: keys, hits/misses and publishing with gzip variants"""
+
+import gzip
+
+from app.services import artifact_cache as artifact_cache_module
+
+
+def test_key_changes_with_every_input(artifacts, monkeypatch):
+    base = artifacts.key("hash", 1, 4, "txt", {"backend": "pypdfium2"})
+
+    assert artifacts.key("hash", 1, 4, "txt", {"backend": "pypdfium2"}) == base
+    assert artifacts.key("other", 1, 4, "txt", {"backend": "pypdfium2"}) != base
+    assert artifacts.key("hash", 1, 5, "txt", {"backend": "pypdfium2"}) != base
+    assert artifacts.key("hash", 1, 4, "md", {"backend": "pypdfium2"}) != base
+    assert artifacts.key("hash", 1, 4, "txt", {"backend": "pdfplumber"}) != base
+    monkeypatch.setattr(artifact_cache_module, "PIPELINE_VERSION", artifact_cache_module.PIPELINE_VERSION + 1)
+    assert artifacts.key("hash", 1, 4, "txt", {"backend": "pypdfium2"}) != base
+
+
+def test_get_counts_hits_and_misses(artifacts):
+    key = artifacts.key("hash", 1, 4, "txt")
+    seen = []
+    artifacts.on_access(seen.append)
+
+    assert artifacts.get(key, "txt") is None
+    artifacts.path(key, "txt").write_text("lesson")
+    assert artifacts.get(key, "txt").read_text() == "lesson"
+
+    assert (artifacts.hits, artifacts.misses) == (1, 1)
+    assert seen == [artifacts.path(key, "txt")]
+
+
+def test_publish_links_text_with_a_gzip_variant(artifacts):
+    artifact = artifacts.path(artifacts.key("hash", 1, 4, "txt"), "txt")
+    artifact.write_text("lesson text " * 100)
+
+    published = artifacts.publish(artifact, "Class10-Unit1-Lesson.txt")
+
+    assert published.read_bytes() == artifact.read_bytes()
+    assert published.stat().st_ino == artifact.stat().st_ino
+    variant = published.with_name(published.name + ".gz")
+    assert gzip.decompress(variant.read_bytes()) == artifact.read_bytes()
+    # Content-addressed: compressing again gives the same bytes
+    first = artifacts.compressed(artifact).read_bytes()
+    artifacts.compressed(artifact).unlink()
+    assert artifacts.compressed(artifact).read_bytes() == first
+
+
+def test_republishing_a_pdf_drops_the_old_text_variant(artifacts):
+    text = artifacts.path(artifacts.key("hash", 1, 4, "txt"), "txt")
+    text.write_text("lesson")
+    pdf = artifacts.path(artifacts.key("hash", 1, 4, "pdf"), "pdf")
+    pdf.write_bytes(b"%PDF-1.4 lesson")
+
+    artifacts.publish(text, "lesson")
+    published = artifacts.publish(pdf, "lesson")
+
+    assert published.read_bytes() == pdf.read_bytes()
+    assert not published.with_name("lesson.gz").exists()
@@ -0,0 +1,35 @@
+"""Batch lesson PDFs of one book are cut in a single split_pages pass"""
+
+import PyPDF2
+from app import processor as processor_module
+from app.processor import processor
+from tests.helpers import page_lines
+
+LESSONS = {1: ("Unit1-Lesson", 1, 2), 2: ("Unit2-Lesson", 3, 4), 3: ("Unit3-Lesson", 5, 6)}
+
+
+def test_batch_slices_every_lesson_in_one_pass(book_pdf, artifacts, monkeypatch):
+    monkeypatch.setattr(processor, "_fetch_book", lambda book_key, subject, medium: (book_pdf, None))
+    monkeypatch.setattr(processor, "_lesson_details", lambda item: (LESSONS[item["unit"]], None))
+    passes = []
+    split_pages = processor_module.split_pages
+
+    def counting_split_pages(reader, jobs, *args, **kwargs):
+        passes.append(len(jobs))
+        return split_pages(reader, jobs, *args, **kwargs)
+
+    monkeypatch.setattr(processor_module, "split_pages", counting_split_pages)
+    items = [
+        {"class_num": 10, "subject": "english", "mode": "lesson", "unit": unit, "output_format": "pdf"}
+        for unit in (1, 2, 3, 2)
+    ]
+
+    results = processor.process_batch(items)
+
+    assert passes == [3]
+    assert [result["filename"] for result in results] == [
+        "Unit1-Lesson.pdf", "Unit2-Lesson.pdf", "Unit3-Lesson.pdf", "Unit2-Lesson.pdf"
+    ]
+    pages = PyPDF2.PdfReader(results[2]["file_path"]).pages
+    assert len(pages) == 2
+    assert page_lines(5)[1] in pages[0].extract_text()
@@ -0,0 +1,74 @@
+"""Book cache: one download per book however many callers ask at once"""
+
+import hashlib
+import threading
+
+import pytest
+from app.config import settings
+from app.services.book_cache import BookCache
+
+BOOK = "class-10-term0-english.pdf"
+
+
+@pytest.fixture
+def drive(fake_drive, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_MAX_SEGMENTS", 1)  # One GET per download
+    monkeypatch.setattr(settings, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    return fake_drive()
+
+
+def test_concurrent_callers_share_one_download(drive, tmp_path):
+    cache = BookCache(tmp_path / "cache")
+    downloads, accesses = [], []
+    cache.on_download(downloads.append)
+    cache.on_access(accesses.append)
+    results = []
+    start = threading.Barrier(8)
+
+    def ask():
+        start.wait()
+        results.append(cache.ensure(BOOK, "book"))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [cache.path_for(BOOK)] * 8
+    assert drive.ranges_seen == [None]
+    # Every caller is counted and every caller but the downloader is an access
+    assert cache.hits + cache.misses == 8
+    assert downloads == [cache.path_for(BOOK)]
+    assert accesses == [cache.path_for(BOOK)] * 7
+    assert cache.path_for(BOOK).read_bytes() == (drive.root / "book").read_bytes()
+
+
+def test_other_worker_reuses_the_cached_book(drive, tmp_path):
+    first, second = BookCache(tmp_path / "cache"), BookCache(tmp_path / "cache")
+
+    assert first.ensure(BOOK, "book")
+    assert second.ensure(BOOK, "book") == second.path_for(BOOK)
+
+    assert len(drive.ranges_seen) == 1
+    assert second.stats()["hits"] == 1
+
+
+def test_failed_download_leaves_nothing_behind(drive, tmp_path):
+    cache = BookCache(tmp_path / "cache")
+
+    assert cache.ensure(BOOK, "missing") is None
+    assert not cache.path_for(BOOK).exists()
+
+
+def test_content_hash_is_kept_in_a_sidecar(drive, tmp_path):
+    cache = BookCache(tmp_path / "cache")
+    path = cache.ensure(BOOK, "book")
+    expected = hashlib.sha256(path.read_bytes()).hexdigest()
+
+    assert cache.content_hash(path) == expected
+    sidecar = path.with_name(path.name + ".sha256")
+    assert expected in sidecar.read_text()
+    # A rewritten book is hashed again instead of trusting the old sidecar
+    path.write_bytes(b"%PDF-1.4 reprint")
+    assert cache.content_hash(path) == hashlib.sha256(b"%PDF-1.4 reprint").hexdigest()
@@ -0,0 +1,121 @@
+"""/api/download caching semantics: ETag/304, Range/206/416 and gzip variants"""
+
+import gzip
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.services.storage_manager import storage_manager
+
+TEXT = ("Lesson body line\n" * 400).encode()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Downloads served from tmp_path instead of storage/"""
+    for name in ("TEMP_DIR", "CACHE_DIR"):
+        folder = tmp_path / name.lower()
+        folder.mkdir()
+        monkeypatch.setattr(settings, name, folder)
+    monkeypatch.setattr(settings, "DOWNLOAD_ACCEL_REDIRECT_PREFIX", "")
+    return TestClient(app)
+
+
+@pytest.fixture
+def lesson(client):
+    path = settings.TEMP_DIR / "Class10-Unit1-Lesson.txt"
+    path.write_bytes(TEXT)
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(TEXT, mtime=0))
+    return "/api/download/Class10-Unit1-Lesson.txt"
+
+
+def test_etag_and_conditional_get(client, lesson):
+    response = client.get(lesson, headers={"Accept-Encoding": "identity"})
+    etag = response.headers["etag"]
+
+    assert response.status_code == 200
+    assert response.content == TEXT
+    assert etag == f'"{hashlib.sha256(TEXT).hexdigest()}"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    cached = client.get(lesson, headers={"Accept-Encoding": "identity", "If-None-Match": f"W/{etag}"})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    dated = client.get(lesson, headers={
+        "Accept-Encoding": "identity", "If-Modified-Since": response.headers["last-modified"]
+    })
+    assert dated.status_code == 304
+
+
+def test_gzip_variant_has_its_own_etag(client, lesson):
+    plain = client.get(lesson, headers={"Accept-Encoding": "identity"})
+    zipped = client.get(lesson, headers={"Accept-Encoding": "gzip"})
+
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.content == TEXT  # Decoded by the client
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    refused = client.get(lesson, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=100-199", 100, 199),
+    ("bytes=-50", len(TEXT) - 50, len(TEXT) - 1),
+    ("bytes=6000-", 6000, len(TEXT) - 1),
+])
+def test_single_ranges(client, lesson, header, start, end):
+    response = client.get(lesson, headers={"Range": header, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 206
+    assert response.content == TEXT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(TEXT)}"
+    assert "content-encoding" not in response.headers
+
+
+def test_unsatisfiable_range(client, lesson):
+    response = client.get(lesson, headers={"Range": f"bytes={len(TEXT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(TEXT)}"
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_stale_if_range_gets_the_whole_file(client, lesson):
+    etag = client.get(lesson, headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+    stale = client.get(lesson, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+    assert stale.status_code == 200
+    assert stale.content == TEXT
+    current = client.get(lesson, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert current.status_code == 206
+    assert current.content == TEXT[:10]
+
+
+def test_leases_are_released_after_sending(client, lesson):
+    client.get(lesson)
+    client.get(lesson, headers={"Range": "bytes=0-9"})
+
+    assert not list(storage_manager.lease_dir.glob("*.*-*"))
+
+
+def test_head_range_sends_headers_only(client, lesson):
+    response = client.head(lesson, headers={"Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-9/{len(TEXT)}"
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+    assert not list(storage_manager.lease_dir.glob("*.*-*"))
+
+
+def test_accel_redirect_path_is_url_encoded(client, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_ACCEL_REDIRECT_PREFIX", "/protected")
+    (settings.TEMP_DIR / "Class10 Unit1 #2 தமிழ்.txt").write_bytes(TEXT)
+
+    response = client.get("/api/download/Class10%20Unit1%20%232%20தமிழ்.txt")
+
+    quoted = "Class10%20Unit1%20%232%20%E0%AE%A4%E0%AE%AE%E0%AE%BF%E0%AE%B4%E0%AF%8D.txt"
+    assert response.headers["x-accel-redirect"] == f"/protected/temp/{quoted}"
+    assert response.headers["content-disposition"] == f"attachment; filename*=utf-8''{quoted}"
@@ -0,0 +1,75 @@
+"""Document pool: reuse, LRU eviction, stale parses and leases outliving eviction"""
+
+import os
+
+from app.services.document_pool import DocumentPool
+from tests.helpers import make_pdf
+
+
+def test_second_lease_reuses_the_open_document(book_pdf):
+    pool = DocumentPool(max_documents=2, max_bytes=1 << 30)
+
+    with pool.pypdf(book_pdf) as reader:
+        first = reader
+        assert len(reader.pages) == 6
+    with pool.pypdf(book_pdf) as reader:
+        assert reader is first
+
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+
+def test_least_recently_used_document_is_evicted(tmp_path):
+    pool = DocumentPool(max_documents=2, max_bytes=1 << 30)
+    a, b, c = (make_pdf(tmp_path / f"{name}.pdf", pages=2) for name in "abc")
+
+    for path in (a, b, a, c):
+        with pool.lease(path):
+            pass
+
+    stats = pool.stats()
+    assert stats["documents"] == 2
+    assert stats["evictions"] == 1
+    with pool.lease(a):  # Used after b, so b went instead
+        pass
+    assert pool.stats()["hits"] == 2
+
+
+def test_byte_budget_keeps_at_least_one_document(tmp_path):
+    pool = DocumentPool(max_documents=10, max_bytes=1)
+    a, b = (make_pdf(tmp_path / f"{name}.pdf", pages=2) for name in "ab")
+
+    for path in (a, b):
+        with pool.lease(path):
+            pass
+
+    assert pool.stats()["documents"] == 1
+
+
+def test_rewritten_file_is_parsed_again(tmp_path):
+    pool = DocumentPool(max_documents=2, max_bytes=1 << 30)
+    path = make_pdf(tmp_path / "book.pdf", pages=2)
+    with pool.pypdf(path) as reader:
+        assert len(reader.pages) == 2
+
+    make_pdf(path, pages=3)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    with pool.pypdf(path) as reader:
+        assert len(reader.pages) == 3
+
+    assert pool.stats()["documents"] == 1
+
+
+def test_evicted_document_stays_open_until_released(tmp_path):
+    pool = DocumentPool(max_documents=1, max_bytes=1 << 30)
+    a, b = (make_pdf(tmp_path / f"{name}.pdf", pages=2) for name in "ab")
+
+    with pool.lease(a) as doc, doc.pypdf() as reader:
+        with pool.lease(b):
+            pass  # Evicts a while it is still leased
+        assert doc.retired
+        assert reader.pages[1].extract_text()
+        assert doc._pypdf is not None
+
+    assert doc._pypdf is None
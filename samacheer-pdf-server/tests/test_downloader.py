@@ -0,0 +1,110 @@
+"""Segmented / resumable downloads against scripts/fake_drive.py, in-process"""
+
+import os
+
+import pytest
+from app.config import settings
+from app.services import downloader as downloader_module
+from app.services.downloader import Downloader
+
+KB = 1024
+
+
+@pytest.fixture
+def drive(fake_drive, monkeypatch):
+    # Sizes in KB instead of MB so small fixtures get segmented
+    monkeypatch.setattr(downloader_module, "MB", KB)
+    monkeypatch.setattr(settings, "DOWNLOAD_MAX_SEGMENTS", 4)
+    monkeypatch.setattr(settings, "DOWNLOAD_SEGMENT_MB", 64)
+    monkeypatch.setattr(settings, "DOWNLOAD_SEGMENT_MIN_MB", 128)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRIES", 4)
+    monkeypatch.setattr(settings, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    return fake_drive
+
+
+def test_segmented_download(drive, tmp_path):
+    server = drive()
+    target = tmp_path / "book.pdf"
+
+    assert Downloader().download("book", target)
+
+    assert target.read_bytes() == (server.root / "book").read_bytes()
+    probe, *segments = server.ranges_seen
+    assert probe == "bytes=0-0"
+    assert len(segments) == 4
+    assert not list(tmp_path.glob(".book.pdf.part*"))
+
+
+def test_resume_from_partial_file(drive, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_MAX_SEGMENTS", 1)  # Single stream
+    server = drive()
+    source = (server.root / "book").read_bytes()
+    target = tmp_path / "book.pdf"
+    downloader = Downloader()
+    downloader.part_path(target).write_bytes(source[:100 * KB])
+
+    assert downloader.download("book", target)
+
+    assert target.read_bytes() == source
+    assert server.ranges_seen == [f"bytes={100 * KB}-"]
+
+
+def test_origin_without_range_support_uses_one_stream(drive, tmp_path):
+    server = drive(ranges=False)
+    target = tmp_path / "book.pdf"
+
+    assert Downloader().download("book", target)
+
+    assert target.read_bytes() == (server.root / "book").read_bytes()
+    # The probe got a 200 (Accept-Ranges: none), so the file came as one plain GET
+    assert server.ranges_seen == ["bytes=0-0", None]
+
+
+def test_dropped_segment_resumes_where_it_stopped(drive, tmp_path):
+    server = drive(drop_after=20 * KB, drops=2)
+    target = tmp_path / "book.pdf"
+
+    assert Downloader().download("book", target)
+
+    assert target.read_bytes() == (server.root / "book").read_bytes()
+    first_round = server.ranges_seen[1:5]
+    starts = {int(header[6:].split("-")[0]) for header in first_round}
+    retries = server.ranges_seen[5:]
+    assert len(retries) == 2
+    # Retries continue inside the dropped segments instead of refetching them
+    assert all(int(header[6:].split("-")[0]) not in starts for header in retries)
+    assert not list(tmp_path.glob(".book.pdf.part*"))
+
+
+def test_html_page_is_not_retried(drive, tmp_path):
+    server = drive()
+    (server.root / "quota").write_bytes(b"<html>Too many users have viewed this file</html>")
+    target = tmp_path / "quota.pdf"
+
+    assert not Downloader().download("quota", target)
+
+    assert not target.exists()
+    assert len(server.ranges_seen) == 2  # Probe + one attempt
+
+
+@pytest.mark.parametrize("segments,drop_after,drops", [(1, 100 * KB, 1), (4, 20 * KB, 4)])
+def test_file_replaced_at_origin_is_not_spliced(drive, tmp_path, monkeypatch, segments, drop_after, drops):
+    monkeypatch.setattr(settings, "DOWNLOAD_MAX_SEGMENTS", segments)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRIES", 1)
+    server = drive(drop_after=drop_after, drops=drops)
+    target = tmp_path / "book.pdf"
+    downloader = Downloader()
+    assert not downloader.download("book", target)  # Leaves a .part of the old version
+    assert downloader.part_path(target).stat().st_size
+
+    # Same size, different bytes (and a new ETag)
+    book = server.root / "book"
+    book.write_bytes(book.read_bytes().replace(b"xxxx", b"yyyy"))
+    stat = book.stat()
+    os.utime(book, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    server.ranges_seen.clear()
+
+    assert downloader.download("book", target)
+
+    assert target.read_bytes() == book.read_bytes()
+    assert not list(tmp_path.glob(".book.pdf.part*"))
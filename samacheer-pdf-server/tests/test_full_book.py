@@ -0,0 +1,38 @@
+"""Full books: PDFs straight from the cache, text from the artifact cache after the first request"""
+
+from app.config import settings
+from app.processor import processor
+from tests.helpers import page_lines
+
+REQUEST = {"class_num": 10, "subject": "english", "mode": "full_book"}
+
+
+def test_pdf_is_served_from_the_book_cache(book_pdf, artifacts, monkeypatch):
+    monkeypatch.setattr(processor, "_fetch_book", lambda book_key, subject, medium: (book_pdf, None))
+
+    result = processor.process_request({**REQUEST, "output_format": "pdf"})
+
+    assert result["file_path"] == str(book_pdf)
+    assert not any(artifacts.publish_dir.iterdir())
+
+
+def test_second_text_request_hits_the_artifact_cache(book_pdf, artifacts, monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_STORE_ENABLED", False)
+    monkeypatch.setattr(processor, "_fetch_book", lambda book_key, subject, medium: (book_pdf, None))
+    extractions = []
+    extract_text = processor._extract_text
+
+    def counting_extract_text(*args):
+        extractions.append(args[1:3])
+        return extract_text(*args)
+
+    monkeypatch.setattr(processor, "_extract_text", counting_extract_text)
+
+    first = processor.process_request({**REQUEST, "output_format": "txt"})
+    second = processor.process_request({**REQUEST, "output_format": "txt"})
+
+    assert extractions == [(1, 6)]
+    assert (artifacts.hits, artifacts.misses) == (1, 1)
+    assert first["file_path"] == second["file_path"]
+    text = open(second["file_path"], encoding="utf-8").read()
+    assert page_lines(1)[1] in text and page_lines(6)[1] in text
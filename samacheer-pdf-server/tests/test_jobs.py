@@ -0,0 +1,135 @@
+"""Background jobs: progress, failures with error codes, and state shared by every worker"""
+
+import asyncio
+import multiprocessing
+
+import pytest
+from fastapi.testclient import TestClient
+from app import api
+from app.main import app
+from app.processor import error_result, PROCESSING_ERROR, UPSTREAM_ERROR
+from app.services import jobs as jobs_module
+from app.services.jobs import Job, JobManager
+from app.services.worker_pool import WorkerPoolBusy
+
+REQUEST = {
+    "class_num": 10, "subject": "english", "mode": "lesson", "unit": 1,
+    "lesson_choice": 1, "output_format": "md", "term": None, "discipline": None, "medium": "english",
+}
+RESULT = {"filename": "Class10-Unit1-Prose-Lesson.md", "file_path": "/tmp/Class10-Unit1-Prose-Lesson.md"}
+
+
+class FakePool:
+    """Runs the job inline: reports two stages, then returns (or raises) outcome"""
+    kind = "thread"
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def is_full(self):
+        return False
+
+    async def run(self, fn, request, progress):
+        for stage in ("download", "slice"):
+            progress(stage, "running")
+            await asyncio.sleep(0.02)
+            progress(stage, "done", "ok")
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    def use(outcome):
+        monkeypatch.setattr(jobs_module, "worker_pool", FakePool(outcome))
+        return JobManager(tmp_path / "jobs", retention_minutes=60)
+    return use
+
+
+def run_job(manager: JobManager) -> list:
+    """Submit REQUEST and collect every event snapshot until it finishes"""
+    async def scenario():
+        job = manager.submit(REQUEST)
+        return [snapshot async for snapshot in manager.events(job, interval=0.005) if snapshot]
+    return asyncio.run(scenario())
+
+
+def test_events_follow_the_stages_until_done(manager):
+    events = run_job(manager(RESULT))
+
+    assert events[-1]["state"] == "done"
+    assert events[-1]["result"] == RESULT
+    assert [s["status"] for s in events[-1]["stages"]] == ["done", "done", "skipped", "skipped", "skipped", "skipped"]
+    assert any(e["stage"] == "slice" for e in events)
+    versions = [e["version"] for e in events]
+    assert versions == sorted(set(versions))
+
+
+@pytest.mark.parametrize("outcome,code", [
+    (error_result(UPSTREAM_ERROR, "Drive is down"), UPSTREAM_ERROR),
+    ({"error": True, "message": "Old-style failure"}, PROCESSING_ERROR),
+    (RuntimeError("boom"), PROCESSING_ERROR),
+    (WorkerPoolBusy("full"), "SERVER_BUSY"),
+])
+def test_failures_carry_an_error_code(manager, outcome, code):
+    final = run_job(manager(outcome))[-1]
+
+    assert final["state"] == "failed"
+    assert final["error_code"] == code
+    assert final["error"]
+
+
+def test_other_workers_see_the_job(manager, tmp_path):
+    accepting = manager(RESULT)
+    job_id = run_job(accepting)[-1]["job_id"]
+
+    other = JobManager(tmp_path / "jobs", retention_minutes=60)
+    job = other.get(job_id)
+    assert job.state == "done"
+    assert job.result == RESULT
+    assert job.request == REQUEST
+    assert other.stats()["done"] == 1
+    assert other.get("../jobs") is None
+
+
+def test_job_of_a_dead_worker_is_failed(tmp_path):
+    child = multiprocessing.get_context("fork").Process(target=lambda: None)
+    child.start()
+    child.join()
+    job = Job(REQUEST)
+    job.owner = child.pid
+    job.path = tmp_path / "jobs" / f"{job.id}.json"
+    manager = JobManager(tmp_path / "jobs", retention_minutes=60)
+    job.report("download", "running")
+
+    loaded = manager.get(job.id)
+
+    assert loaded.state == "failed"
+    assert loaded.error_code == PROCESSING_ERROR
+    assert loaded.stages["download"]["status"] == "failed"
+
+
+def test_api_serves_jobs_from_the_shared_store(manager, tmp_path, monkeypatch):
+    job_id = run_job(manager(error_result(UPSTREAM_ERROR, "Drive is down")))[-1]["job_id"]
+    monkeypatch.setattr(api, "job_manager", JobManager(tmp_path / "jobs", retention_minutes=60))
+    client = TestClient(app)
+
+    status = client.get(f"/api/jobs/{job_id}").json()
+    assert status["state"] == "failed"
+    assert status["error_code"] == UPSTREAM_ERROR
+    assert status["request_details"]["class"] == 10
+
+    events = client.get(f"/api/jobs/{job_id}/events").text
+    assert events.startswith("event: failed")
+    assert client.get(f"/api/jobs/{'0' * 32}").status_code == 404
+
+
+def test_finished_jobs_are_pruned(manager, monkeypatch):
+    jobs = manager(RESULT)
+    first = run_job(jobs)[-1]["job_id"]
+
+    jobs.retention = jobs.retention * 0
+    run_job(jobs)
+
+    assert jobs.get(first) is None
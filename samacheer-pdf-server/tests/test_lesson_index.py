@@ -0,0 +1,77 @@
+"""Lesson index compilation and lookup"""
+
+from app.services.lesson_index import compile_index
+
+SOCIAL_SCIENCE = {
+    "term0": {
+        "meta": {"prelim_pages": 2, "total_pdf_pages": 40},
+        "disciplines": {
+            "History": [{"page": 1, "title": "Rise of Empires"}, {"page": 9, "title": "Trade"}],
+            "geography": [{"page": 15, "title": "Rivers and Lakes"}],
+        },
+    }
+}
+
+ENGLISH = {
+    "term0": {
+        "meta": {"prelim_pages": 4, "total_pdf_pages": 30},
+        "units": [
+            {"prose": {"page": 1, "title": "His First Flight"}, "poem": {"page": 7, "title": "Life"}},
+            {"prose": {"page": 11, "title": "The Night the Ghost Got In"}},
+        ],
+    }
+}
+
+
+def test_filename_keeps_the_callers_discipline_casing():
+    table = compile_index(SOCIAL_SCIENCE, 10, "socialscience", "english")
+
+    assert table.lookup("term0", 1, discipline="History").filename == "Class10-History-1-RiseofEmpires"
+    assert table.lookup("term0", 1, discipline="history").filename == "Class10-history-1-RiseofEmpires"
+    assert table.lookup("term0", 1, discipline="Geography").filename == "Class10-Geography-1-RiversandLakes"
+
+
+def test_discipline_ranges_end_where_the_next_lesson_starts():
+    table = compile_index(SOCIAL_SCIENCE, 10, "socialscience", "english")
+
+    history = table.lookup("term0", 2, discipline="HISTORY")
+    geography = table.lookup("term0", 1, discipline="geography")
+    assert (history.start_pdf_page, history.end_pdf_page) == (11, 16)
+    assert (geography.start_pdf_page, geography.end_pdf_page) == (17, 40)
+    assert table.lookup("term0", 3, discipline="history") is None
+    assert not table.problems
+
+
+def test_english_lessons_by_choice():
+    table = compile_index(ENGLISH, 10, "english", "english")
+
+    poem = table.lookup("term0", 1, 2)
+    assert poem == ("Class10-Unit1-Poem-Life", 11, 14)
+    assert table.lookup("term0", 1).filename == "Class10-Unit1-Prose-HisFirstFlight"
+    assert table.lookup("term0", 2, 1).end_pdf_page == 30
+    assert table.lookup("term0", 2, 2) is None
+
+
+def test_problems_are_reported_at_compile_time():
+    broken = {"term0": {"meta": {"prelim_pages": 0, "total_pdf_pages": 5}, "units": [
+        {"page": 3, "title": "A"}, {"page": 3, "title": "B"}, {"page": 4, "title": "C"}
+    ]}}
+
+    table = compile_index(broken, 9, "science", "english")
+
+    overlaps = [problem for problem in table.problems if "overlapping" in problem]
+    assert len(overlaps) == 1 and "unit 2" in overlaps[0] and "unit 1" in overlaps[0]
+
+
+def test_direct_units_take_the_callers_discipline_without_disciplines():
+    science = {"term0": {"meta": {"prelim_pages": 0, "total_pdf_pages": 20}, "units": [
+        {"page": 1, "title": "Motion"}, {"page": 8, "title": "Light"}
+    ]}}
+
+    table = compile_index(science, 9, "science", "english")
+
+    assert table.lookup("term0", 2, discipline="Physics").filename == "Class9-Physics-2-Light"
+    assert table.lookup("term0", 2).filename == "Class9-Unit-2-Light"
+    # English lessons are named by unit, whatever the caller sends
+    english = compile_index(ENGLISH, 10, "english", "english")
+    assert english.lookup("term0", 1, 2, discipline="Poetry").filename == "Class10-Unit1-Poem-Life"
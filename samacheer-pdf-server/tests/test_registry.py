@@ -0,0 +1,108 @@
+"""Data registry: malformed files and entries never take lookups down"""
+
+import json
+
+import pytest
+from app.config import settings
+from app.services import registry as registry_module
+from app.services.registry import DataRegistry
+
+CATALOG = {"class-9-term0-english.pdf": "drive-id"}
+INDEX = {
+    "term0": {
+        "meta": {"prelim_pages": 2, "total_pdf_pages": 40},
+        "units": [
+            {"prose": {"page": 1, "title": "First"}},
+            {"prose": {"page": 9}},  # No title
+            {"prose": {"page": 15, "title": "Third"}},
+        ],
+    }
+}
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    """A data/ tree under tmp_path with an English catalog and class 9 index"""
+    root = tmp_path / "data"
+    for name, folder in (("CATALOGS_DIR", "catalogs"), ("INDEXES_DIR", "indexes"), ("CURRICULUM_DIR", "curriculum")):
+        monkeypatch.setattr(settings, name, root / folder)
+    monkeypatch.setattr(settings, "DATA_DIR", root)
+    monkeypatch.setattr(settings, "REGISTRY_WATCH", False)
+
+    def write(path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content if isinstance(content, str) else json.dumps(content))
+        return path
+
+    write(settings.get_catalog_path("english"), CATALOG)
+    write(settings.get_index_path("english", 9), INDEX)
+    return write
+
+
+def test_malformed_entry_skips_only_that_lesson(data):
+    registry = DataRegistry()
+
+    assert registry.catalog("english") == CATALOG
+    table = registry.lesson_table("english", 9)
+    assert table.lookup("term0", 1).filename == "Class9-Unit1-Prose-First"
+    assert table.lookup("term0", 2) is None
+    # The broken lesson still bounds the one before it
+    assert table.lookup("term0", 1).end_pdf_page == 10
+    assert table.lookup("term0", 3).start_pdf_page == 17
+
+    (name, problems), = registry.problems().items()
+    assert name.endswith("class-9.json")
+    assert "unit 2: malformed lesson entry" in problems[0]
+
+
+def test_malformed_meta_and_file_are_reported(data):
+    data(settings.get_index_path("english", 10), {"term0": {"meta": {"prelim_pages": 1}, "units": []}})
+    data(settings.get_index_path("english", 11), "{not json")
+    data(settings.get_index_path("english", 12), ["a", "list"])
+    registry = DataRegistry()
+
+    problems = registry.problems()
+    assert "malformed meta" in problems["indexes/languages/english/class-10.json"][0]
+    assert problems["indexes/languages/english/class-11.json"][0].startswith("not loaded: JSONDecodeError")
+    assert problems["indexes/languages/english/class-12.json"][0].startswith("not loaded: AttributeError")
+    assert registry.lesson_table("english", 9) is not None
+    assert "problems" in registry.stats()
+
+
+def test_broken_reload_keeps_the_last_good_version(data):
+    registry = DataRegistry()
+    registry.load()
+    index = settings.get_index_path("english", 9)
+
+    data(index, '{"term0": ')
+    registry._apply_changes([index])
+
+    assert registry.index("english", 9) == INDEX
+    assert registry.lesson_table("english", 9).lookup("term0", 1)
+    assert "previous version kept" in registry.problems()["indexes/languages/english/class-9.json"][0]
+
+    fixed = json.loads(json.dumps(INDEX))
+    fixed["term0"]["units"][1]["prose"]["title"] = "Second"
+    data(index, fixed)
+    registry._apply_changes([index])
+
+    assert registry.lesson_table("english", 9).lookup("term0", 2).filename == "Class9-Unit2-Prose-Second"
+    assert registry.problems() == {}
+
+
+def test_watcher_survives_a_failed_reload(data, monkeypatch):
+    registry = DataRegistry()
+    registry.load()
+    catalog = settings.get_catalog_path("english")
+    monkeypatch.setattr(registry_module, "watch", lambda *args, **kwargs: iter([{(1, str(catalog))}] * 2))
+    applied = []
+
+    def apply_changes(changed):
+        applied.append(changed)
+        if len(applied) == 1:
+            raise RuntimeError("listener blew up")
+    monkeypatch.setattr(registry, "_apply_changes", apply_changes)
+
+    registry._watch_loop()
+
+    assert applied == [[catalog], [catalog]]
@@ -0,0 +1,117 @@
+"""Lazy slicing over HTTP Range requests against scripts/fake_drive.py, in-process"""
+
+import os
+
+import PyPDF2
+import pytest
+from app.config import settings
+from app.services import remote_pdf
+from app.services.remote_pdf import RemotePdfPool
+from scripts.fake_drive import FakeDriveHandler
+from tests.helpers import page_lines
+
+KB = 1024
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "REMOTE_BLOCK_KB", 4)
+    monkeypatch.setattr(settings, "REMOTE_REVALIDATE_SECONDS", 3600)
+    return RemotePdfPool()
+
+
+def replace_book(root):
+    """Same size, different bytes, newer mtime: only the validator tells them apart"""
+    path = root / "book"
+    data = path.read_bytes().replace(b"Samacheer", b"SAMACHEER")
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert path.stat().st_size == stat.st_size
+
+
+def test_slice_reads_only_the_needed_pages(fake_drive, pool, tmp_path):
+    server = fake_drive()
+    output = tmp_path / "lesson.pdf"
+
+    assert pool.slice("book", 2, 3, output)
+
+    pages = PyPDF2.PdfReader(str(output)).pages
+    assert len(pages) == 2
+    for page, number in zip(pages, (2, 3)):
+        assert page_lines(number)[1] in page.extract_text()
+    size = (server.root / "book").stat().st_size
+    assert pool.stats()["bytes_fetched"] < size / 2
+    assert all(header.startswith("bytes=") for header in server.ranges_seen)
+
+
+def test_range_requests_carry_the_validator(fake_drive, pool, tmp_path, monkeypatch):
+    server = fake_drive()
+    seen = []
+    fetch = remote_pdf.RangeFile._fetch
+
+    def recording_fetch(self, first, last):
+        seen.append(self.validator)
+        return fetch(self, first, last)
+
+    identity = pool.identity("book")
+    monkeypatch.setattr(remote_pdf.RangeFile, "_fetch", recording_fetch)
+    assert pool.slice("book", 1, 1, tmp_path / "one.pdf")
+
+    etag, _ = FakeDriveHandler._validators(server.root / "book")
+    assert identity.endswith(etag)
+    assert seen and set(seen) == {etag}
+
+
+def test_replaced_file_is_detected_through_if_range(fake_drive, pool, tmp_path):
+    server = fake_drive()
+    before = pool.identity("book")
+    assert pool.slice("book", 1, 1, tmp_path / "first.pdf", before)
+
+    replace_book(server.root)
+    # Within the revalidation window, so only If-Range on the next block fetch notices
+    output = tmp_path / "last.pdf"
+    assert not pool.slice("book", 7, 8, output, before)
+    assert not output.exists()
+
+    after = pool.identity("book")
+    assert after != before
+    assert pool.slice("book", 7, 8, output, after)
+    assert "SAMACHEER" in PyPDF2.PdfReader(str(output)).pages[0].extract_text()
+
+
+def test_revalidation_reprobes_open_readers(fake_drive, pool, monkeypatch):
+    server = fake_drive()
+    monkeypatch.setattr(settings, "REMOTE_REVALIDATE_SECONDS", 0)
+    before = pool.identity("book")
+    assert pool.identity("book") == before
+
+    replace_book(server.root)
+
+    assert pool.identity("book") != before
+
+
+def test_stale_identity_is_refused(fake_drive, pool, tmp_path):
+    fake_drive()
+    identity = pool.identity("book")
+
+    assert not pool.slice("book", 1, 1, tmp_path / "out.pdf", identity + "-old")
+
+
+def test_origin_without_range_support(fake_drive, pool):
+    fake_drive(ranges=False)
+
+    assert pool.identity("book") is None
+
+
+def test_forked_process_gets_its_own_client(fake_drive, pool, monkeypatch):
+    fake_drive()
+    assert pool.identity("book")
+    client, cache = pool._client, pool.cache
+
+    monkeypatch.setattr(remote_pdf.os, "getpid", lambda: -1)
+    assert pool.identity("book")
+
+    assert pool._client is not client
+    assert pool.cache is not cache
+    assert pool.stats()["open_books"] == 1
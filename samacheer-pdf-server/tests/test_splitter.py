@@ -0,0 +1,74 @@
+"""Book splitter: lesson ranges from the index, materialized into the artifact cache"""
+
+import PyPDF2
+import pytest
+from app.services import splitter as splitter_module
+from app.services.lesson_index import compile_index
+from app.services.splitter import BookSplitter, parse_book_key, split_book
+from tests.helpers import make_pdf, page_lines
+
+INDEX = {
+    term: {
+        "meta": {"prelim_pages": 0, "total_pdf_pages": 6},
+        "units": [
+            {"prose": {"page": 1, "title": "First"}, "poem": {"page": 3, "title": "Second"}},
+            {"prose": {"page": 5 if term == "term0" else 4, "title": "Third"}},
+        ],
+    }
+    for term in ("term0", "term1")
+}
+
+
+@pytest.fixture
+def lessons(monkeypatch):
+    """Serve INDEX as the lesson table of any class/subject"""
+    tables = []
+
+    def lesson_table(subject, class_num, medium="english"):
+        tables.append((subject, class_num, medium))
+        return compile_index(INDEX, class_num, subject, medium)
+
+    monkeypatch.setattr(splitter_module.registry, "lesson_table", lesson_table)
+    return tables
+
+
+def test_book_keys():
+    assert parse_book_key("class-10-term0-maths-tamil-medium.pdf") == (10, 0, "maths", "tamil")
+    assert parse_book_key("class-6-term2-english.pdf") == (6, 2, "english", "english")
+    assert parse_book_key("notes.pdf") is None
+
+
+def test_lesson_jobs_use_the_books_term(tmp_path, artifacts, lessons):
+    book10 = make_pdf(tmp_path / "class-10-term0-english.pdf")
+    book6 = make_pdf(tmp_path / "class-6-term1-science-english-medium.pdf")
+
+    assert [job[:2] for job in BookSplitter().lesson_jobs(book10)] == [(1, 2), (3, 4), (5, 6)]
+    assert [job[:2] for job in BookSplitter().lesson_jobs(book6)] == [(1, 2), (3, 3), (4, 6)]
+    assert lessons == [("english", 10, "english"), ("science", 6, "english")]
+    assert BookSplitter().lesson_jobs(tmp_path / "notes.pdf") == []
+
+
+def test_materialize_writes_each_lesson_once(book_pdf, artifacts, lessons):
+    splitter = BookSplitter()
+    jobs = splitter.lesson_jobs(book_pdf)
+
+    assert splitter.materialize(book_pdf) == 3
+
+    for start, end, path in jobs:
+        pages = PyPDF2.PdfReader(path).pages
+        assert len(pages) == end - start + 1
+        assert page_lines(start)[1] in pages[0].extract_text()
+        assert page_lines(end)[1] in pages[-1].extract_text()
+    assert splitter.lesson_jobs(book_pdf) == []
+    assert splitter.materialize(book_pdf) == 0
+    splitter.shutdown()
+
+
+def test_bad_ranges_are_refused(book_pdf, tmp_path):
+    good, past_end, reversed_ = (tmp_path / name for name in ("good.pdf", "past.pdf", "reversed.pdf"))
+
+    results = split_book(book_pdf, [(2, 3, good), (5, 7, past_end), (4, 3, reversed_)])
+
+    assert results == {good: True, past_end: False, reversed_: False}
+    assert not past_end.exists() and not reversed_.exists()
+    assert not list(tmp_path.glob(".*.tmp"))
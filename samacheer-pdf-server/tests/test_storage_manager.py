@@ -0,0 +1,177 @@
+"""Leases and pins are shared between workers (separate StorageManager instances / processes)"""
+
+import multiprocessing
+import os
+import time
+
+import pytest
+from app.config import settings
+from app.services import storage_manager as storage_module
+from app.services.storage_manager import StorageManager
+
+
+@pytest.fixture
+def managers(tmp_path, monkeypatch):
+    """Two managers over the same storage, like two uvicorn workers"""
+    monkeypatch.setattr(storage_module, "PINS_PATH", tmp_path / "pinned_books.json")
+    monkeypatch.setattr(settings, "STORAGE_PINNED_BOOKS", ["configured.pdf"])
+    monkeypatch.setattr(settings, "STORAGE_LEASE_TIMEOUT", 3600)
+
+    def make():
+        manager = StorageManager()
+        manager.lease_dir = tmp_path / "leases"
+        manager.lease_dir.mkdir(exist_ok=True)
+        return manager
+
+    return make(), make()
+
+
+@pytest.fixture
+def published(tmp_path):
+    path = tmp_path / "temp" / "Class10-Unit1.pdf"
+    path.parent.mkdir()
+    path.write_bytes(b"%PDF-1.4")
+    return path
+
+
+def test_lease_blocks_eviction_by_another_worker(managers, published):
+    serving, reaping = managers
+
+    serving.acquire(published)
+    assert not reaping._delete("temp", published, [])
+    assert published.exists()
+
+    serving.release(published)
+    assert reaping._delete("temp", published, [])
+    assert not published.exists()
+
+
+def test_nested_leases_release_one_at_a_time(managers, published):
+    serving, reaping = managers
+
+    with serving.lease(published):
+        with serving.lease(published):
+            pass
+        assert reaping._in_use(published, time.time())
+    assert not reaping._in_use(published, time.time())
+
+
+def _lease_and_exit(manager, path):
+    manager.acquire(path)
+    os._exit(0)  # Crash without release()
+
+
+def test_lease_from_crashed_process_expires(managers, published, monkeypatch):
+    serving, reaping = managers
+    child = multiprocessing.get_context("fork").Process(target=_lease_and_exit, args=(serving, published))
+    child.start()
+    child.join()
+
+    assert reaping._in_use(published, time.time())
+    assert reaping.stats()["in_use"] == 1
+
+    monkeypatch.setattr(settings, "STORAGE_LEASE_TIMEOUT", 0)
+    assert reaping.expire_leases() == 1
+    assert not reaping._in_use(published, time.time())
+
+
+def test_pins_are_shared_and_persisted(managers):
+    first, second = managers
+
+    first.pin("class-12-term0-english.pdf")
+    assert "class-12-term0-english.pdf" in second.pinned
+    assert "configured.pdf" in second.pinned
+    assert "class-12-term0-english.pdf" in StorageManager().pinned  # After a restart
+
+    second.unpin("class-12-term0-english.pdf")
+    second.unpin("configured.pdf")  # Configured pins stay
+    assert first.pinned == {"configured.pdf"}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    from app.services.book_cache import book_cache
+    monkeypatch.setattr(settings, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(book_cache, "lock_dir", tmp_path / "locks")
+    settings.CACHE_DIR.mkdir()
+    book_cache.lock_dir.mkdir()
+    return settings.CACHE_DIR
+
+
+def test_abandoned_partial_downloads_are_counted_and_expired(managers, cache_dir, monkeypatch):
+    manager, _ = managers
+    old = time.time() - 7200
+    abandoned = cache_dir / ".class-6-term1-english.pdf.part"
+    abandoned.write_bytes(b"x" * 1000)
+    (cache_dir / ".class-6-term1-english.pdf.part.json").write_text("{}")
+    orphan_state = cache_dir / ".class-7-term1-english.pdf.part.json"
+    orphan_state.write_text("{}")
+    for path in cache_dir.iterdir():
+        os.utime(path, (old, old))
+    fresh = cache_dir / ".class-8-term1-english.pdf.part"
+    fresh.write_bytes(b"x" * 10)
+
+    assert manager.stats()["areas"]["cache"]["partial_downloads"] == 3
+    monkeypatch.setattr(settings, "STORAGE_PARTIAL_RETENTION_HOURS", 1)
+    assert manager.expire_partial() == 2
+
+    assert sorted(p.name for p in cache_dir.iterdir()) == [fresh.name]
+
+
+def test_scores_are_shared_with_another_workers_reaper(managers, tmp_path, monkeypatch):
+    serving, reaping = managers
+    monkeypatch.setattr(settings, "TEMP_DIR", tmp_path / "temp")
+    monkeypatch.setattr(settings, "STORAGE_MIN_AGE_SECONDS", 0)
+    settings.TEMP_DIR.mkdir()
+    popular, once = settings.TEMP_DIR / "popular.txt", settings.TEMP_DIR / "once.txt"
+    for path, age in ((popular, 7200), (once, 60)):
+        path.write_bytes(b"x" * 1000)
+        os.utime(path, (time.time() - age,) * 2)
+    for _ in range(3):
+        serving.touch(popular)
+    serving.touch(once)
+    reaping.budgets["temp"] = 1500
+
+    # Without the shared scores the reaper would evict the older file
+    assert reaping.enforce("temp")["evicted"] == 1
+    assert popular.exists() and not once.exists()
+    assert str(once) not in serving._read_scores()
+
+
+def test_published_hardlinks_are_counted_once(managers, tmp_path, monkeypatch):
+    manager, _ = managers
+    for name in ("TEMP_DIR", "ARTIFACTS_DIR"):
+        monkeypatch.setattr(settings, name, tmp_path / name.lower())
+    artifact = settings.ARTIFACTS_DIR / "ab" / "abcd.pdf"
+    artifact.parent.mkdir(parents=True)
+    artifact.write_bytes(b"x" * 1000)
+    settings.TEMP_DIR.mkdir()
+    published = settings.TEMP_DIR / "Class10-Unit1.pdf"
+    os.link(artifact, published)
+    (settings.TEMP_DIR / "own.txt").write_bytes(b"y" * 100)
+    manager.budgets["temp"] = 500
+
+    assert manager.enforce("temp")["evicted"] == 0
+    assert published.exists()
+    monkeypatch.setattr(storage_module, "MB", 1)  # Report bytes
+    areas = manager.stats()["areas"]
+    assert (areas["temp"]["used_mb"], areas["artifacts"]["used_mb"]) == (100, 1000)
+
+
+def test_book_is_leased_before_it_is_fetched(monkeypatch):
+    from app.processor import processor
+    from app.services.book_cache import book_cache
+    leased = []
+
+    def fetch(book_key, subject, medium):
+        # The reaper may run right after the download: the lease must already exist
+        leased.append(storage_module.storage_manager._in_use(book_cache.path_for(book_key), time.time()))
+        return book_cache.path_for(book_key), None
+    monkeypatch.setattr(processor, "_fetch_book", fetch)
+    request = {"class_num": 10, "subject": "english", "mode": "full_book", "output_format": "pdf"}
+
+    assert processor.process_request(request)["error"] is False
+    assert processor.process_batch([dict(request), dict(request)])[0]["error"] is False
+
+    assert leased == [True] * 4
+    assert not storage_module.storage_manager._in_use(book_cache.path_for("class-10-term0-english.pdf"), time.time())
@@ -0,0 +1,48 @@
+"""pdfplumber and pypdfium2 must extract equivalent text"""
+
+import difflib
+
+import pytest
+from app.services.text_backends import BACKENDS, get_backend, resolve_backend_name
+from tests.helpers import page_lines
+
+# Minimum similarity (0-1) between backends, after whitespace is normalized
+TOLERANCE = 0.90
+
+
+def normalize(text: str) -> str:
+    """Backends differ in spacing/line breaks, not in words"""
+    return " ".join(text.split())
+
+
+@pytest.mark.parametrize("name", sorted(BACKENDS))
+def test_backend_extracts_every_page(book_pdf, name):
+    backend = BACKENDS[name]
+    assert backend.page_count(book_pdf) == 6
+
+    pages = backend.extract_pages(book_pdf, 2, 4)
+    assert len(pages) == 3
+    for page, text in zip((2, 3, 4), pages):
+        for line in page_lines(page):
+            assert line in normalize(text)
+
+
+def test_backends_are_equivalent(book_pdf):
+    results = {name: backend.extract_pages(book_pdf, 1, 6) for name, backend in BACKENDS.items()}
+    reference, *others = results.values()
+    for other in others:
+        assert len(other) == len(reference)
+        for a, b in zip(reference, other):
+            ratio = difflib.SequenceMatcher(None, normalize(a), normalize(b)).ratio()
+            assert ratio >= TOLERANCE
+
+
+def test_backend_resolution(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "TEXT_BACKEND", "pdfplumber")
+    monkeypatch.setattr(settings, "SUBJECT_TEXT_BACKENDS", {"socialscience": "pypdfium2"})
+
+    assert resolve_backend_name("socialscience") == "pypdfium2"
+    assert resolve_backend_name("socialscience", "pdfplumber") == "pdfplumber"
+    assert resolve_backend_name("english") == "pdfplumber"
+    assert get_backend("unknown").name == "pdfplumber"
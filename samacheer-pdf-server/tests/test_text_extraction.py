@@ -0,0 +1,52 @@
+"""Parallel extraction must return exactly the serial segments, in page order"""
+
+import pytest
+from app.services import text_extraction
+from app.services.text_backends import BACKENDS
+from app.services.text_extraction import ParallelExtractor, extract_segments
+from tests.helpers import make_pdf, page_lines
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = ParallelExtractor(workers=2)
+    yield extractor
+    extractor.shutdown()
+
+
+@pytest.fixture
+def parallel(extractor, monkeypatch):
+    """extract_segments(parallel=True) through a 2-process pool; records that it really ran"""
+    runs = []
+
+    def extract(*args):
+        segments = extractor.extract(*args)
+        runs.append(args)
+        return segments
+
+    monkeypatch.setattr(text_extraction.parallel_extractor, "extract", extract)
+    return runs
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("start,end", [(1, 11), (4, 11), (3, 7), (6, 6)])
+def test_parallel_matches_serial(tmp_path, parallel, backend, start, end):
+    book = make_pdf(tmp_path / "book.pdf", pages=11)
+
+    serial = extract_segments(book, start, end, backend, parallel=False)
+    segments = extract_segments(book, start, end, backend, parallel=True)
+
+    # Backends not worth a pool stay serial
+    assert len(parallel) == (1 if BACKENDS[backend].parallelizable else 0)
+    assert segments == serial
+    assert len(segments) == end - start + 1
+    for page, segment in zip(range(start, end + 1), segments):
+        assert page_lines(page)[1] in segment
+
+
+def test_chunks_cover_the_range_in_order(extractor):
+    chunks = extractor._chunks(4, 30)
+
+    assert chunks[0][0] == 4 and chunks[-1][1] == 30
+    assert all(b[0] == a[1] + 1 for a, b in zip(chunks, chunks[1:]))
+    assert len(chunks) == extractor.workers * 4
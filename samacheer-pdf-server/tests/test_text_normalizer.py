@@ -0,0 +1,94 @@
+"""Text normalization before the AI, and how its output is chunked"""
+
+import pytest
+from app.config import settings
+from app.services.ai_converter import CHARS_PER_TOKEN, split_chunks
+from app.services.text_extraction import PAGE_BREAK, format_page
+from app.services.text_normalizer import TextNormalizer, line_key
+
+
+WORDS = "river temple village harvest monsoon poet festival market forest school".split()
+
+
+def body(page: int, lines: int = 8) -> str:
+    """Distinct prose lines (real lines don't differ only by their numbers)"""
+    return "\n".join(
+        f"The {WORDS[(page + line) % 10]} near the {WORDS[(page * 3 + line) % 10]} line {line}."
+        for line in range(lines)
+    )
+
+
+def lesson(pages: int = 12, extra: str = "") -> str:
+    text = ""
+    for page in range(1, pages + 1):
+        header = "10th Std - English" if page % 2 else "Unit 3 - The Poem of Life"
+        text += format_page(f"{header}\n{body(page)}\n{extra}\n{body(page, 2)}\n{page + 40}")
+    return text
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_NORMALIZE_MIN_REPEAT", 0.3)
+
+
+def test_removes_running_headers_and_page_numbers():
+    result = TextNormalizer().normalize(lesson())
+
+    assert "10th Std" not in result
+    assert "Unit 3 - The Poem of Life" not in result
+    assert not any(line.strip().isdigit() for line in result.split("\n"))
+    assert "=" * 50 not in result
+    assert body(12) in result
+
+
+def test_merges_hyphenated_line_breaks_and_collapses_spaces():
+    result = TextNormalizer().normalize(lesson(extra="the informa-\ntion   age"))
+
+    assert "the information age" in result
+    assert "informa-" not in result
+
+
+def test_keeps_pages_that_are_mostly_repeated_lines():
+    templated = "".join(format_page(f"Samacheer Kalvi English\nLesson body page {p}\n{p}") for p in range(10))
+    result = TextNormalizer().normalize(templated)
+
+    assert result.count("Samacheer Kalvi English") == 10
+
+
+def test_short_lessons_keep_every_line():
+    text = format_page("Header\nBody one\n1") + format_page("Header\nBody two\n2")
+    result = TextNormalizer().normalize(text)
+
+    assert result == f"Header\nBody one\n1{PAGE_BREAK}Header\nBody two\n2"
+
+
+def test_records_token_savings():
+    normalizer = TextNormalizer()
+    text = lesson()
+    result = normalizer.normalize(text)
+    stats = normalizer.stats()
+
+    assert stats["lessons"] == 1
+    assert stats["lines_removed"] == 24  # One header and one page number per page
+    assert stats["chars_in"] == len(text) and stats["chars_out"] == len(result)
+    assert stats["tokens_saved"] == (len(text) - len(result)) // CHARS_PER_TOKEN > 0
+
+
+def test_line_keys_are_stable_and_mask_digits():
+    assert line_key("Page 12") == line_key("page  13")
+    assert line_key("Page 12") != line_key("Chapter 12")
+    # Same value in every process (unlike hash(), which is salted per interpreter)
+    assert line_key("10th Std - English") == 0xdd956cf97aa6c4
+
+
+def test_chunks_of_normalized_text_break_at_page_boundaries():
+    result = TextNormalizer().normalize(lesson(pages=20))
+    pages = result.split(PAGE_BREAK)
+    assert len(pages) == 20
+
+    budget_tokens = (len(pages[0]) * 3) // CHARS_PER_TOKEN  # About three pages per chunk
+    chunks = split_chunks(result, budget_tokens)
+
+    assert len(chunks) > 1
+    # Every chunk is a run of whole pages, and together they are the lesson in order
+    assert [page for chunk in chunks for page in chunk.split(PAGE_BREAK)] == pages
@@ -0,0 +1,46 @@
+"""Page text store: building, range reads, and stores closed only by their last reader"""
+
+import os
+
+import pytest
+from app.services.text_store import PageTextStore
+from tests.helpers import page_lines
+
+BACKEND = "pypdfium2"
+
+
+@pytest.fixture
+def store(book_pdf):
+    store = PageTextStore()
+    assert store.ensure(book_pdf, BACKEND, parallel=False)
+    return store
+
+
+def test_range_reads(store, book_pdf, tmp_path):
+    text = store.read_range(book_pdf, 2, 3, BACKEND)
+    assert page_lines(2)[1] in text and page_lines(3)[1] in text
+    assert page_lines(4)[1] not in text
+
+    output = tmp_path / "lesson.txt"
+    assert store.write_range(book_pdf, 2, 3, output, BACKEND)
+    assert output.read_text(encoding='utf-8') == text
+
+
+def test_invalidate_waits_for_readers(store, book_pdf):
+    with store._reading(book_pdf, BACKEND) as reading:
+        store.invalidate(book_pdf)
+        begin, end = reading.span(1, 1)
+        # Still mapped: the sidecar files are gone, the reader's view is not
+        assert page_lines(1)[1] in reading.view[begin:end].decode('utf-8')
+        assert not reading.view.closed
+    assert reading.view.closed
+    assert store.read_range(book_pdf, 1, 1, BACKEND) is None
+
+
+def test_changed_book_retires_the_open_store(store, book_pdf):
+    with store._reading(book_pdf, BACKEND) as reading:
+        stat = book_pdf.stat()
+        os.utime(book_pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert store.read_range(book_pdf, 1, 1, BACKEND) is None  # Stale: not served
+        assert not reading.view.closed
+    assert reading.view.closed
@@ -0,0 +1,113 @@
+"""Warmup: request history, plan order, /ready and low-priority text store builds"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from app import main, processor as processor_module
+from app.config import settings
+from app.main import app
+from app.processor import processor
+from app.services import warmup as warmup_module
+from app.services.warmup import Warmup
+from app.services.worker_pool import WorkerPool
+
+CATALOG = {f"class-{n}-term0-english.pdf": f"drive-{n}" for n in (6, 7, 8, 9, 10)}
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Request history file under tmp_path"""
+    path = tmp_path / "request_history.json"
+    monkeypatch.setattr(warmup_module, "HISTORY_PATH", path)
+    return path
+
+
+def record_and_return(book_key):
+    warmup_module.warmup.record(book_key)
+    return {"error": False}
+
+
+def test_batch_counts_each_item_once(book_pdf, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(warmup_module.warmup, "record", lambda key, count=1: recorded.append((key, count)))
+    monkeypatch.setattr(processor, "_fetch_book", lambda book_key, subject, medium: (book_pdf, None))
+    item = {"class_num": 10, "subject": "english", "mode": "full_book", "output_format": "pdf"}
+
+    results = processor.process_batch([dict(item) for _ in range(3)])
+
+    assert [result["error"] for result in results] == [False] * 3
+    assert sum(count for _, count in recorded) == 3
+
+
+def test_text_store_is_built_serially(book_pdf, monkeypatch):
+    calls = []
+    monkeypatch.setattr(settings, "TEXT_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "WARMUP_TEXT_STORES", True)
+    monkeypatch.setattr(settings, "PARALLEL_FULL_BOOK", True)
+    monkeypatch.setattr(warmup_module.book_cache, "ensure", lambda book_key, drive_id: book_pdf)
+    monkeypatch.setattr(
+        warmup_module.text_store, "ensure",
+        lambda path, backend, parallel=None: calls.append((path, parallel)) or True
+    )
+
+    assert Warmup()._warm(book_pdf.name, "drive-id", "english")
+
+    assert calls == [(book_pdf, False)]
+
+
+def test_plan_puts_pinned_books_first_then_the_most_requested(history, tmp_path, monkeypatch):
+    monkeypatch.setattr(warmup_module.registry, "catalogs", lambda: {tmp_path / "english.json": CATALOG})
+    monkeypatch.setattr(warmup_module, "storage_manager", SimpleNamespace(pinned={"class-6-term0-english.pdf"}))
+    monkeypatch.setattr(settings, "WARMUP_BOOKS", 3)
+    warmup = Warmup()
+    for book_key, count in (("class-7-term0-english.pdf", 2), ("class-9-term0-english.pdf", 5),
+                            ("class-10-term0-english.pdf", 1), ("not-in-a-catalog.pdf", 9)):
+        warmup.record(book_key, count)
+
+    plan = warmup.plan()
+
+    # Unrequested class 8 is never planned; the WARMUP_BOOKS cap drops class 10
+    assert plan == [
+        ("class-6-term0-english.pdf", "drive-6", "english"),
+        ("class-9-term0-english.pdf", "drive-9", "english"),
+        ("class-7-term0-english.pdf", "drive-7", "english"),
+    ]
+
+
+@pytest.mark.parametrize("target,mid_pass", [(100, 503), (50, 200)])
+def test_ready_follows_the_first_pass(monkeypatch, target, mid_pass):
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(settings, "WARMUP_READY_PERCENT", target)
+    warmup = Warmup()
+    monkeypatch.setattr(main, "warmup", warmup)
+    monkeypatch.setattr(warmup, "plan", lambda: [("a.pdf", "drive-a", "english"), ("b.pdf", "drive-b", "english")])
+    client = TestClient(app)
+    seen = []
+
+    def warm(book_key, drive_id, subject):
+        seen.append(client.get("/ready").status_code)
+        return book_key == "a.pdf"
+    monkeypatch.setattr(warmup, "_warm", warm)
+
+    assert client.get("/ready").status_code == 503
+    warmup._pass()
+
+    assert seen == [503, mid_pass]
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["warmed"] == ["a.pdf"] and response.json()["failed"] == ["b.pdf"]
+
+
+def test_process_pool_workers_flush_after_each_job(history, monkeypatch):
+    # Pool workers exit without running atexit hooks: the count must be on disk already
+    monkeypatch.setattr(processor, "process_request", lambda request, progress=None, stream=None: record_and_return(request["book"]))
+    pool = WorkerPool("process", 1, 0)
+    try:
+        result = pool._get_executor().submit(processor_module.run_process_request, {"book": "class-9-term0-english.pdf"}).result()
+    finally:
+        pool.shutdown()
+
+    assert result == {"error": False}
+    assert json.loads(history.read_text())["class-9-term0-english.pdf"][0] == 1
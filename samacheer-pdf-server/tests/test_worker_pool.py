@@ -0,0 +1,61 @@
+"""Worker pool admission: a job counts as active until it really finishes"""
+
+import asyncio
+import threading
+
+import pytest
+from app.services.worker_pool import WorkerPool, WorkerPoolBusy
+
+
+def test_cancelled_await_keeps_the_running_job_counted():
+    pool = WorkerPool("thread", size=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_job():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        task = asyncio.create_task(pool.run(blocking_job))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The thread is still working: it must still hold its slot
+        assert pool.stats()["active"] == 1
+
+        queued = asyncio.create_task(pool.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["active"] == 2
+        with pytest.raises(WorkerPoolBusy):
+            await pool.run(lambda: "rejected")
+
+        release.set()
+        assert await queued == "queued"
+        for _ in range(50):
+            if pool.stats()["active"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.stats()["active"] == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_failing_job_frees_its_slot():
+    pool = WorkerPool("thread", size=1, max_pending=0)
+
+    def failing_job():
+        raise ValueError("boom")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await pool.run(failing_job)
+
+    asyncio.run(scenario())
+    assert pool.stats()["active"] == 0
+    pool.shutdown()
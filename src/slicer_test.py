@@ -1,17 +1,21 @@
 import PyPDF2
 
-def split_pdf(source_pdf, start_page, end_page, output_name):
+def split_book(source_pdf, subjects):
+    """Write every subject split of one book from a single read of the source"""
     with open(source_pdf, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        writer = PyPDF2.PdfWriter()
 
-        for page_num in range(start_page - 1, end_page):
-            writer.add_page(reader.pages[page_num])
+        for subject, (start_page, end_page) in subjects.items():
+            output_name = source_pdf.replace(".pdf", f"-{subject}.pdf")
+            writer = PyPDF2.PdfWriter()
 
-        with open(output_name, 'wb') as output_file:
-            writer.write(output_file)
+            for page_num in range(start_page - 1, end_page):
+                writer.add_page(reader.pages[page_num])
 
-    print(f"✅ Created: {output_name}")
+            with open(output_name, 'wb') as output_file:
+                writer.write(output_file)
+
+            print(f"✅ Created: {output_name}")
 
 # ---- CONFIGURATION (EDIT ONLY THIS PART) ----
 books = {
@@ -43,6 +47,4 @@ books = {
 # --------------------------------------------
 
 for source_pdf, subjects in books.items():
-    for subject, (start, end) in subjects.items():
-        output_name = source_pdf.replace(".pdf", f"-{subject}.pdf")
-        split_pdf(source_pdf, start, end, output_name)
+    split_book(source_pdf, subjects)